@@ -1,11 +1,22 @@
 # Import required libraries
 import streamlit as st
-import pickle
-import pandas as pd
-import requests
 import os
 import base64
+import cProfile
+import io
+import pstats
+import time
+import requests
+from functools import partial
 from dotenv import load_dotenv
+from src import api_handler, metrics
+from src.artifacts import current_version, open_artifacts
+from src.engine import Recommender
+from src.genres import GENRE_MAP
+from src.poster_cache import PosterCache
+from src.query_cache import QueryCache
+from src.recommender import build_lookup, option_labels
+from src.service import ServiceClient, ServiceError
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +25,38 @@ load_dotenv()
 # Get API key
 API_KEY = os.getenv("API_KEY")
 
+# TMDB API base URL (override to point at a local stub)
+TMDB_API_URL = os.getenv("TMDB_API_URL", api_handler.TMDB_API_URL)
+
+# Poster cache file (shared by every worker on this host)
+POSTER_CACHE_PATH = os.getenv("POSTER_CACHE_PATH", "poster_cache.sqlite3")
+
+# Serving artifacts (build with: python utils/build_neighbors.py)
+ARTIFACTS_PATH = os.getenv("ARTIFACTS_PATH", "artifacts")
+
+# Matches offered by the movie search
+SEARCH_RESULTS = 20
+
+# Movies shown per page of the genre view
+GENRE_PAGE_SIZE = 10
+
+# Neighbor backend: precomputed (default), exact, ivf or embedding
+RECOMMENDER_BACKEND = os.getenv("RECOMMENDER_BACKEND", "precomputed")
+
+# Recommendation results kept in the in-process query cache
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+
+# Recommendation service (python -m src.service); unset to compute in-process
+RECOMMENDER_SERVICE_URL = os.getenv("RECOMMENDER_SERVICE_URL")
+
+# Metrics (recorded with METRICS_ENABLED=1): Prometheus endpoint on METRICS_PORT and/or a textfile
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_FILE_INTERVAL = 10
+
+# Per-rerun profiling: METRICS_PROFILE=1 for every rerun, or ?profile=1 in the URL
+METRICS_PROFILE = os.getenv("METRICS_PROFILE", "").lower() in ("1", "true", "yes")
+
 # Stop app if API key not found
 if not API_KEY:
     st.error("API_KEY not found. Please check your .env file.")
@@ -23,35 +66,61 @@ if not API_KEY:
 
 st.set_page_config(page_title="Movie Recommender System", page_icon="🎬", layout="wide")
 
-
-# Initialize Dark Mode State
-if 'dark_mode' not in st.session_state:
-    st.session_state.dark_mode = True
-
-# Define Colors based on Mode
-if st.session_state.dark_mode:
-    bg_color = "#333333"
-    text_color = "#ffffff"
-    navbar_bg = "#444444"
-    card_bg = "#444444"
-    input_bg = "#555555"
-    input_text = "#ffffff"
-    secondary_text = "#cccccc"
-    border_color = "#555555"
-    toggle_color = "#ffffff" # White in Dark Mode
-else:
-    bg_color = "#eeeeee" # Light Grey
-    text_color = "#121212" # Almost Black for best contrast
-    navbar_bg = "#e0e0e0" # Slightly darker grey for sidebar/nav
-    card_bg = "#ffffff"
-    input_bg = "#ffffff"
-    input_text = "#121212"
-    secondary_text = "#444444"
-    border_color = "#cccccc"
-    toggle_color = "#000000" # Black in Light Mode
-
-# Custom CSS for Theme
-st.markdown(f"""
+# Time the whole rerun; in profile mode also record its spans and a cProfile
+rerun_start = time.perf_counter()
+profile_token = None
+profiler = None
+if METRICS_PROFILE or st.query_params.get("profile") == "1":
+    profile_token = metrics.start_profile()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Only one cProfile can run per process (another session is profiling)
+        profiler = None
+
+# Function to end this rerun's profile and stop its cProfile; returns the recorded spans
+def end_rerun_profile():
+    global profile_token
+    spans = metrics.end_profile(profile_token)
+    profile_token = None
+    if profiler is not None:
+        profiler.disable()
+    return spans
+
+
+# The finally ends the profile on every exit: a raising rerun, st.rerun() and st.stop() included
+try:
+    # Initialize Dark Mode State
+    if 'dark_mode' not in st.session_state:
+        st.session_state.dark_mode = True
+
+    # Define Colors based on Mode
+    if st.session_state.dark_mode:
+        bg_color = "#333333"
+        text_color = "#ffffff"
+        navbar_bg = "#444444"
+        card_bg = "#444444"
+        input_bg = "#555555"
+        input_text = "#ffffff"
+        secondary_text = "#cccccc"
+        border_color = "#555555"
+        toggle_color = "#ffffff" # White in Dark Mode
+    else:
+        bg_color = "#eeeeee" # Light Grey
+        text_color = "#121212" # Almost Black for best contrast
+        navbar_bg = "#e0e0e0" # Slightly darker grey for sidebar/nav
+        card_bg = "#ffffff"
+        input_bg = "#ffffff"
+        input_text = "#121212"
+        secondary_text = "#444444"
+        border_color = "#cccccc"
+        toggle_color = "#000000" # Black in Light Mode
+
+    # Custom CSS for Theme (built once per color scheme, then served from cache)
+    @st.cache_data(show_spinner=False)
+    def theme_css(bg_color, text_color, navbar_bg, card_bg, input_bg, input_text, secondary_text, border_color, toggle_color):
+        return f"""
 <style>
 /* Import Google Fonts - Inter */
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap');
@@ -336,123 +405,183 @@ div[data-testid="stSidebar"] .stToggle div[data-testid="stCheckbox"] div[data-ch
 }}
 </style>
 
-""", unsafe_allow_html=True)
+"""
+
+    st.markdown(
+        theme_css(bg_color, text_color, navbar_bg, card_bg, input_bg, input_text, secondary_text, border_color, toggle_color),
+        unsafe_allow_html=True
+    )
+
+    # Open the memory-mapped artifacts once per published version (no column is read yet);
+    # a catalog update is picked up on the next rerun, existing rows keep their meaning
+    @st.cache_resource(max_entries=2)
+    def load_catalog(version):
+        directory = os.path.join(ARTIFACTS_PATH, version)
+        artifacts = open_artifacts(directory if os.path.isdir(directory) else ARTIFACTS_PATH)
+        return artifacts, artifacts['title'].tolist(), artifacts['movie_id']
+
+    artifacts, titles, movie_ids = load_catalog(current_version(ARTIFACTS_PATH))
+    build_id = artifacts['manifest']['build_id']
+
+    # Title / movie_id lookups and picker labels (recommender view only)
+    @st.cache_resource(max_entries=2)
+    def load_title_lookup(build_id):
+        with metrics.timer('title_lookup_build_seconds'):
+            title_rows, id_rows = build_lookup(titles, movie_ids)
+            return title_rows, id_rows, option_labels(titles, title_rows)
+
+    # Logo as a base64 data URI, read and encoded once per process
+    @st.cache_resource
+    def load_logo():
+        try:
+            with open("logo.jpg", "rb") as f:
+                return base64.b64encode(f.read()).decode("utf-8")
+        except FileNotFoundError:
+            return None
 
-# Load movie data
-movies = pickle.load(open('movies_df.pkl', 'rb'))
-similarity = pickle.load(open('similarity.pkl', 'rb'))
 
 
+    # Function to fetch poster from TMDB
 
-# Function to fetch poster from TMDB
+    # Function to get a cached session
+    @st.cache_resource
+    def get_session():
+        return api_handler.create_session()
 
-# Function to get a cached session
-@st.cache_resource
-def get_session():
-    session = requests.Session()
-    retry = requests.adapters.Retry(total=5, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
+    # Function to get the poster cache shared by all app processes
+    @st.cache_resource
+    def get_poster_cache():
+        return PosterCache(POSTER_CACHE_PATH)
 
-# Function to fetch movie poster
-@st.cache_data(show_spinner=False)
-def fetch_poster(movie_id):
-    try:
-        url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={API_KEY}&language=en-US"
-        
-        # Use cached session
-        session = get_session()
-        response = session.get(url, timeout=10)
-
-        # If API request fails
-        if response.status_code != 200:
-            return None
+    # Function to fetch movie poster (session resolved up front, safe in worker threads)
+    def fetch_poster_with(session):
+        return partial(api_handler.fetch_poster, api_key=API_KEY, session=session, base_url=TMDB_API_URL,
+                       raise_errors=True)
 
-        data = response.json()
+    # Function to fetch a whole grid of posters concurrently (disk cache first)
+    def fetch_posters(movie_ids):
+        return api_handler.fetch_posters_cached(movie_ids, get_poster_cache(), fetch_poster_with(get_session()))
 
-        # Get poster path
-        poster_path = data.get('poster_path')
 
-        if poster_path:
-            return "https://image.tmdb.org/t/p/w500/" + poster_path
-        else:
-            return None
+    # Function to get the query cache shared by every catalog version (cleared when the version changes)
+    @st.cache_resource
+    def get_query_cache():
+        return QueryCache(QUERY_CACHE_SIZE)
 
-    except Exception as e:
-        print(f"Error fetching poster for movie_id {movie_id}: {e}")
-        return None
 
+    # Function to get the in-process recommendation engine
+    # (backend, genre and search indexes load on first use; results share one query cache)
+    @st.cache_resource(max_entries=2)
+    def get_local_engine(build_id):
+        return Recommender(artifacts, RECOMMENDER_BACKEND, get_query_cache(), fetch_posters=fetch_posters)
 
 
+    # Function to get the recommendation engine: the HTTP service when configured, else in-process
+    @st.cache_resource(max_entries=2)
+    def get_engine(build_id):
+        if RECOMMENDER_SERVICE_URL:
+            return ServiceClient(RECOMMENDER_SERVICE_URL, build_id=build_id)
+        return get_local_engine(build_id)
 
-# Recommendation function
-def recommend(movie):
 
-    # Get index of selected movie
-    movie_index = movies[movies['title'] == movie].index[0]
+    # Function to call the engine; answered in-process while the service is unreachable, failing (5xx) or still
+    # serves another build (it refreshes as soon as it sees a client on a newer one, so that only covers a lagging service)
+    def call_engine(method, *args):
+        try:
+            return getattr(get_engine(build_id), method)(*args)
+        except requests.RequestException:
+            return getattr(get_local_engine(build_id), method)(*args)
+        except ServiceError as e:
+            if e.status != 409 and e.status < 500:
+                raise
+            return getattr(get_local_engine(build_id), method)(*args)
 
-    # Get similarity scores
-    distances = similarity[movie_index]
 
-    # Get top 5 similar movies
-    movies_list = sorted(
-        list(enumerate(distances)),
-        reverse=True,
-        key=lambda x: x[1]
-    )[1:6]
+    # Function to start the metrics exporters once per process (query cache counters read as gauges)
+    @st.cache_resource
+    def start_metrics_export():
+        query_cache = get_query_cache()
+        metrics.REGISTRY.add_collector(lambda: {(f"query_cache_{name}", ()): v for name, v in query_cache.stats().items()})
+        if METRICS_PORT:
+            metrics.start_metrics_server(METRICS_PORT)
+        return {'written_at': 0.0}
 
-    recommended_movies = []
-    recommended_posters = []
+    metrics_export = start_metrics_export()
 
-    for i in movies_list:
-        movie_id = movies.iloc[i[0]].movie_id
-        recommended_movies.append(movies.iloc[i[0]].title)
-        recommended_posters.append(fetch_poster(movie_id))
 
-    return recommended_movies, recommended_posters
+    # Recommendation function
+    def recommend(movie_index, k=5, diversity=0.0):
 
+        # Get top k similar movies (sorted, self excluded)
+        movies_list, _ = call_engine('recommend', movie_index, k, diversity)
 
+        recommended_movies = [titles[i] for i in movies_list]
+        recommended_posters = call_engine('posters', movies_list)
 
+        return recommended_movies, recommended_posters
 
-# ---------------- UI ---------------- #
 
-# Sidebar Logic - RELOCATED & PERSISTENT
-if 'show_settings' not in st.session_state:
-    st.session_state.show_settings = False
+    # Taste profile recommendation from several selected movies
+    def recommend_profile(movie_indices, k=5, diversity=0.0):
+
+        # Score every movie against the blend of the selected ones
+        movies_list, _ = call_engine('recommend_profile', movie_indices, k, diversity)
+
+        recommended_movies = [titles[i] for i in movies_list]
+        recommended_posters = call_engine('posters', movies_list)
+
+        return recommended_movies, recommended_posters
+
+
+
+
+    # ---------------- UI ---------------- #
+
+    # Sidebar Logic - RELOCATED & PERSISTENT
+    if 'show_settings' not in st.session_state:
+        st.session_state.show_settings = False
+    if 'diversity' not in st.session_state:
+        st.session_state.diversity = 0.0
+
+    with st.sidebar:
+        st.header("🌗 Appearance")
+        # Centers the toggle and icons
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.markdown('<div style="text-align: right; font-size: 1.2rem; margin-top: 5px;">☀️</div>', unsafe_allow_html=True)
+        with col2:
+            dark_mode_val = st.toggle(" ", value=st.session_state.dark_mode, label_visibility="collapsed")
+            if dark_mode_val != st.session_state.dark_mode:
+                st.session_state.dark_mode = dark_mode_val
+                st.rerun()
+        with col3:
+            st.markdown('<div style="text-align: left; font-size: 1.2rem; margin-top: 5px;">🌙</div>', unsafe_allow_html=True)
+
+        st.divider()
+
+        if st.session_state.show_settings:
+            st.header("⚙️ Settings")
+            st.checkbox("Show Ratings (Coming Soon)", value=False, disabled=True)
+            st.session_state.diversity = st.slider(
+                "Diversity", 0.0, 1.0, value=st.session_state.diversity, step=0.1,
+                help="Higher values trade similarity for variety (fewer sequels and near-duplicates)"
+            )
+            cache_stats = call_engine('stats')
+            st.caption(
+                f"Recommendation cache: {cache_stats['entries']} entries, "
+                f"{cache_stats['hit_rate']:.0%} hit rate, {cache_stats['evictions']} evictions"
+            )
+            st.write("More settings coming soon!")
+
+    # Top Navigation Bar Layout
+    col1, col2, col3 = st.columns([5, 2, 1])
 
-with st.sidebar:
-    st.header("🌗 Appearance")
-    # Centers the toggle and icons
-    col1, col2, col3 = st.columns([1, 2, 1])
     with col1:
-        st.markdown('<div style="text-align: right; font-size: 1.2rem; margin-top: 5px;">☀️</div>', unsafe_allow_html=True)
-    with col2:
-        dark_mode_val = st.toggle(" ", value=st.session_state.dark_mode, label_visibility="collapsed")
-        if dark_mode_val != st.session_state.dark_mode:
-            st.session_state.dark_mode = dark_mode_val
-            st.rerun()
-    with col3:
-        st.markdown('<div style="text-align: left; font-size: 1.2rem; margin-top: 5px;">🌙</div>', unsafe_allow_html=True)
-    
-    st.divider()
-    
-    if st.session_state.show_settings:
-        st.header("⚙️ Settings")
-        st.checkbox("Show Ratings (Coming Soon)", value=False, disabled=True)
-        st.write("More settings coming soon!")
-
-# Top Navigation Bar Layout
-col1, col2, col3 = st.columns([5, 2, 1])
-
-with col1:
-    # Read logo
-    try:
-        with open("logo.jpg", "rb") as f:
-            data = base64.b64encode(f.read()).decode("utf-8")
-        st.markdown(
-            f"""
+        # Read logo
+        data = load_logo()
+        if data:
+            st.markdown(
+                f"""
             <div style="display: flex; align-items: center; cursor: default;">
                 <a href="https://rudra-portfolio-liart.vercel.app/" target="_blank">
                     <img src="data:image/jpeg;base64,{data}" class="logo-img">
@@ -463,11 +592,11 @@ with col1:
                 </div>
             </div>
             """,
-            unsafe_allow_html=True
-        )
-    except FileNotFoundError:
-        st.markdown(
-            """
+                unsafe_allow_html=True
+            )
+        else:
+            st.markdown(
+                """
             <div style="display: flex; align-items: center; cursor: default;">
                 <img src="https://cdn-icons-png.flaticon.com/512/2503/2503508.png" class="logo-img">
                 <div style="display: flex; align-items: center; margin-left: 10px;">
@@ -476,115 +605,171 @@ with col1:
                 </div>
             </div>
             """,
-            unsafe_allow_html=True
-        )
-
-# Genre Mapping
-genre_map = {
-    "All": None,
-    "Action": "action",
-    "Adventure": "adventur",
-    "Animation": "anim",
-    "Comedy": "comedi",
-    "Crime": "crime",
-    "Drama": "drama",
-    "Fantasy": "fantasi",
-    "Horror": "horror",
-    "Romance": "romanc",
-    "Science Fiction": "sciencefict",
-    "Thriller": "thriller"
-}
-
-with col2:
-    selected_genre = st.selectbox("Genre", list(genre_map.keys()), label_visibility="collapsed")
-
-with col3:
-    if st.button("⚙️ Settings"):
-        st.session_state.show_settings = not st.session_state.show_settings
-        st.rerun()
-
-
-# Main Content Logic
-if selected_genre != "All":
-    st.subheader(f"Top 10 {selected_genre} Movies")
-    
-    # Filter movies by genre keyword
-    keyword = genre_map[selected_genre]
-    try:
-        # Check if 'tags' column exists and filter
-        if 'tags' in movies.columns:
-            filtered_movies = movies[movies['tags'].apply(lambda x: keyword in x if isinstance(x, str) else False)]
-        else:
-            st.error("Data error: 'tags' column missing.")
-            filtered_movies = pd.DataFrame()
-            
-        if not filtered_movies.empty:
-            # Display top 10 (or fewer if less available)
-            top_movies = filtered_movies.head(10)
-            
-
-            # Create a grid layout for results
-            # Rows of 5 movies each
-            for i in range(0, len(top_movies), 5):
-                cols = st.columns(5)
-                batch = top_movies.iloc[i:i+5]
-                
-                for idx, (col, (_, row)) in enumerate(zip(cols, batch.iterrows())):
-                    with col:
-                        poster = fetch_poster(row.movie_id)
-                        # Staggered animation delay (0.2s * index in batch) + base delay for row
-                        delay = (i // 5) * 1.0 + (idx * 0.2) 
-                        
-                        poster_html = f'<img src="{poster}" style="width:100%; border-radius:12px;">' if poster else f'<div style="height:350px; background:{navbar_bg}; border-radius:12px; display:flex; flex-direction:column; align-items:center; justify-content:center; border: 1px dashed {border_color}; color:{secondary_text};"><span>🎬</span><br>No Poster Available</div>'
-                        
-                        st.markdown(
-                            f"""
-                            <div class="movie-card" style="animation-delay: {delay}s;">
-                                <div class="movie-title">{row.title}</div>
-                                {poster_html}
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-        else:
-            st.info(f"No movies found for genre: {selected_genre}")
-
-    except Exception as e:
-        st.error(f"Error filtering movies: {e}")
+                unsafe_allow_html=True
+            )
 
-else:
-    # Default Recommender View
-    st.subheader("Discover Movies Like...")
+    # Genre Mapping
+    genre_map = GENRE_MAP
 
+    with col2:
+        selected_genre = st.selectbox("Genre", list(genre_map.keys()), label_visibility="collapsed")
 
-    # Dropdown to select movie
-    selected_movie = st.selectbox(
-        "Select a movie",
-        movies['title'].values
-    )
-
-    # Recommend button
-    if st.button("Recommend"):
-
-        names, posters = recommend(selected_movie)
-
-        # Create columns
-        cols = st.columns(5)
+    with col3:
+        if st.button("⚙️ Settings"):
+            st.session_state.show_settings = not st.session_state.show_settings
+            st.rerun()
 
-        for idx, (col, name, poster) in enumerate(zip(cols, names, posters)):
-            with col:
-                delay = idx * 0.2 # 0.2s staggered delay
-                
-                poster_html = f'<img src="{poster}" style="width:100%; border-radius:12px;">' if poster else f'<div style="height:350px; background:{navbar_bg}; border-radius:12px; display:flex; flex-direction:column; align-items:center; justify-content:center; border: 1px dashed {border_color}; color:{secondary_text};"><span>🎬</span><br>No Poster Available</div>'
 
-                st.markdown(
-                    f"""
+    # Main Content Logic
+    if selected_genre != "All":
+        # Start from the first page whenever the genre changes
+        if st.session_state.get("genre_page_for") != selected_genre:
+            st.session_state.genre_page_for = selected_genre
+            st.session_state.genre_page = 0
+        page = st.session_state.genre_page
+
+        try:
+            # Slice the build-time ranking for this genre (best rated first)
+            top_movies, total = call_engine('genre_page', selected_genre, page, GENRE_PAGE_SIZE)
+
+            if page == 0:
+                st.subheader(f"Top {GENRE_PAGE_SIZE} {selected_genre} Movies")
+            else:
+                first = page * GENRE_PAGE_SIZE + 1
+                st.subheader(f"{selected_genre} Movies {first}-{first + len(top_movies) - 1} of {total}")
+
+            if len(top_movies) > 0:
+                # Resolve all posters for the grid in one concurrent batch
+                top_posters = call_engine('posters', top_movies)
+
+                # Create a grid layout for results
+                # Rows of 5 movies each
+                render_start = time.perf_counter()
+                for i in range(0, len(top_movies), 5):
+                    cols = st.columns(5)
+                    batch = top_movies[i:i+5]
+
+                    for idx, (col, row) in enumerate(zip(cols, batch)):
+                        with col:
+                            poster = top_posters[i + idx]
+                            # Staggered animation delay (0.2s * index in batch) + base delay for row
+                            delay = (i // 5) * 1.0 + (idx * 0.2) 
+
+                            poster_html = f'<img src="{poster}" style="width:100%; border-radius:12px;">' if poster else f'<div style="height:350px; background:{navbar_bg}; border-radius:12px; display:flex; flex-direction:column; align-items:center; justify-content:center; border: 1px dashed {border_color}; color:{secondary_text};"><span>🎬</span><br>No Poster Available</div>'
+
+                            st.markdown(
+                                f"""
+                            <div class="movie-card" style="animation-delay: {delay}s;">
+                                <div class="movie-title">{titles[row]}</div>
+                                {poster_html}
+                            </div>
+                            """,
+                                unsafe_allow_html=True
+                            )
+
+                metrics.observe('render_seconds', time.perf_counter() - render_start, view='genre')
+
+                # Page through the rest of the ranking
+                prev_col, _, next_col = st.columns([1, 3, 1])
+                with prev_col:
+                    if page > 0 and st.button("← Previous"):
+                        st.session_state.genre_page -= 1
+                        st.rerun()
+                with next_col:
+                    if (page + 1) * GENRE_PAGE_SIZE < total and st.button("Next →"):
+                        st.session_state.genre_page += 1
+                        st.rerun()
+            else:
+                st.info(f"No movies found for genre: {selected_genre}")
+
+        except Exception as e:
+            st.error(f"Error filtering movies: {e}")
+
+    else:
+        # Default Recommender View
+        st.subheader("Discover Movies Like...")
+
+
+        # Pick one movie, or blend several into a taste profile
+        profile_mode = st.checkbox("Blend several movies into a taste profile")
+
+        # Search the titles server-side; only the matches are sent to the browser
+        title_rows, id_rows, movie_labels = load_title_lookup(build_id)
+        query = st.text_input("Search for a movie", placeholder="Start typing a title...")
+        matches = call_engine('search', query, SEARCH_RESULTS).tolist()
+
+        # Dropdown over the matches (keyed by row position, so duplicate titles stay distinct)
+        if profile_mode:
+            # Keep earlier picks selectable while the search moves on
+            picked = st.session_state.get("profile_movies", [])
+            selected_movies = st.multiselect(
+                "Select movies you like",
+                list(dict.fromkeys(picked + matches)),
+                format_func=movie_labels.__getitem__,
+                max_selections=10,
+                key="profile_movies"
+            )
+        else:
+            selected_movie = st.selectbox(
+                "Select a movie",
+                matches,
+                format_func=movie_labels.__getitem__
+            )
+            if selected_movie is None:
+                st.info(f"No movies match: {query}")
+
+        # Recommend button
+        if st.button("Recommend", disabled=not profile_mode and selected_movie is None):
+
+            if profile_mode:
+                if not selected_movies:
+                    st.info("Select at least one movie to build your profile.")
+                    st.stop()
+                names, posters = recommend_profile(selected_movies, diversity=st.session_state.diversity)
+            else:
+                names, posters = recommend(selected_movie, diversity=st.session_state.diversity)
+
+            # Create columns
+            render_start = time.perf_counter()
+            cols = st.columns(5)
+
+            for idx, (col, name, poster) in enumerate(zip(cols, names, posters)):
+                with col:
+                    delay = idx * 0.2 # 0.2s staggered delay
+
+                    poster_html = f'<img src="{poster}" style="width:100%; border-radius:12px;">' if poster else f'<div style="height:350px; background:{navbar_bg}; border-radius:12px; display:flex; flex-direction:column; align-items:center; justify-content:center; border: 1px dashed {border_color}; color:{secondary_text};"><span>🎬</span><br>No Poster Available</div>'
+
+                    st.markdown(
+                        f"""
                     <div class="movie-card" style="animation-delay: {delay}s;">
                         <div class="movie-title">{name}</div>
                         {poster_html}
                     </div>
                     """,
-                    unsafe_allow_html=True
-                )
+                        unsafe_allow_html=True
+                    )
+            metrics.observe('render_seconds', time.perf_counter() - render_start, view='recommend')
+
+
+    # ---------------- Metrics ---------------- #
+
+    metrics.observe('rerun_seconds', time.perf_counter() - rerun_start)
+
+    # Profile mode: where this rerun's time went
+    if profile_token is not None:
+        spans = end_rerun_profile()
+        with st.expander(f"Profile: {(time.perf_counter() - rerun_start) * 1e3:.1f} ms this rerun"):
+            st.table([{'span': name, 'labels': ', '.join(f"{k}={v}" for k, v in labels.items()),
+                       'ms': round(seconds * 1e3, 3)} for name, labels, seconds in spans])
+            if profiler is not None:
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(25)
+                st.code(stream.getvalue())
+finally:
+    if profile_token is not None:
+        end_rerun_profile()
 
 
+if METRICS_FILE and time.time() - metrics_export['written_at'] > METRICS_FILE_INTERVAL:
+    metrics_export['written_at'] = time.time()
+    metrics.write_metrics_file(METRICS_FILE)
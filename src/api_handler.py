@@ -0,0 +1,132 @@
+# TMDB API calls: pooled session, single and batched poster lookups
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+from src import metrics
+
+# TMDB endpoints (the API base can be pointed at a local stub)
+TMDB_API_URL = "https://api.themoviedb.org/3"
+POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500/"
+
+# Concurrency and deadline for one grid of posters
+MAX_WORKERS = 10
+BATCH_DEADLINE = 3.0
+
+
+# Spaces out requests so no more than `rate` start per second across threads
+class RateLimiter:
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Function to create a pooled session with retry logic
+def create_session(pool_size=MAX_WORKERS):
+    session = requests.Session()
+    retry = requests.adapters.Retry(total=5, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Function to fetch movie poster
+#   raise_errors: raise on failures that may pass (timeouts, 5xx, 429, ...) instead of returning None,
+#   so callers can tell them from a definitive "no poster" (200 without poster_path, or 404)
+def fetch_poster(movie_id, api_key, session, base_url=TMDB_API_URL, timeout=10, raise_errors=False):
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        url = f"{base_url}/movie/{movie_id}?api_key={api_key}&language=en-US"
+        response = session.get(url, timeout=timeout)
+        status = response.status_code
+
+        # Retries done by the session's Retry policy before this response
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            metrics.inc('tmdb_retries_total', len(retries.history))
+
+        # If API request fails
+        if response.status_code != 200:
+            if raise_errors and response.status_code != 404:
+                raise requests.HTTPError(f"TMDB returned {response.status_code}", response=response)
+            return None
+
+        data = response.json()
+
+        # Get poster path
+        poster_path = data.get('poster_path')
+
+        if poster_path:
+            return POSTER_BASE_URL + poster_path
+        else:
+            return None
+
+    except Exception as e:
+        metrics.inc('tmdb_errors_total', error=type(e).__name__)
+        print(f"Error fetching poster for movie_id {movie_id}: {e}")
+        if raise_errors:
+            raise
+        return None
+
+    finally:
+        metrics.observe('tmdb_request_seconds', time.perf_counter() - start)
+        metrics.inc('tmdb_requests_total', status=status)
+
+
+# Function to resolve a grid of posters concurrently
+def fetch_posters(movie_ids, fetch, max_workers=MAX_WORKERS, deadline=BATCH_DEADLINE):
+    movie_ids = list(movie_ids)
+    posters = [None] * len(movie_ids)
+    if not movie_ids:
+        return posters
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(movie_ids)))
+    futures = {executor.submit(fetch, movie_id): pos for pos, movie_id in enumerate(movie_ids)}
+
+    # Stragglers past the deadline keep their None placeholder
+    done, _ = wait(futures, timeout=deadline)
+    for future in done:
+        try:
+            posters[futures[future]] = future.result()
+        except Exception as e:
+            print(f"Error fetching poster for movie_id {movie_ids[futures[future]]}: {e}")
+
+    executor.shutdown(wait=False, cancel_futures=True)
+    return posters
+
+
+# Function to resolve a grid of posters through the persistent cache
+#   fetch must raise when the answer may change on retry (fetch_poster with raise_errors=True):
+#   those ids get a None placeholder but are not cached, only a definitive "no poster" is
+def fetch_posters_cached(movie_ids, cache, fetch, max_workers=MAX_WORKERS, deadline=BATCH_DEADLINE):
+    movie_ids = [int(m) for m in movie_ids]
+    cached = cache.get_many(movie_ids)
+    missing = list(dict.fromkeys(m for m in movie_ids if m not in cached))
+    hits = sum(m in cached for m in movie_ids)
+    metrics.inc('poster_cache_hits_total', hits)
+    metrics.inc('poster_cache_misses_total', len(movie_ids) - hits)
+
+    # Workers store their own result, so stragglers still fill the cache (a raised error stores nothing)
+    def fetch_and_store(movie_id):
+        poster = fetch(movie_id)
+        cache.set(movie_id, poster)
+        return poster
+
+    fetched = dict(zip(missing, fetch_posters(missing, fetch_and_store, max_workers, deadline)))
+    return [cached[m] if m in cached else fetched[m] for m in movie_ids]
@@ -0,0 +1,390 @@
+# Versioned, memory-mapped serving artifacts
+#
+# An artifact directory holds one .npy file per column plus manifest.json.
+# Columns are opened with np.load(mmap_mode='r'), so every app process shares
+# one page-cached copy and columns a view never touches are never read.
+#
+# Each build is written to its own version directory and published by
+# atomically replacing the CURRENT pointer, so running processes can switch
+# to a new version between requests (directories without CURRENT are read
+# as a single version, the pre-versioning layout):
+#
+#   artifacts/
+#     CURRENT                   name of the published version directory
+#     <build_id>/
+#       manifest.json           format, version, build id, column schema
+#       movie_id.npy            int64   (N,)
+#       title.offsets.npy       int64   (N+1,)   strings: UTF-8 bytes + offsets
+#       title.data.npy          uint8
+#       tags.offsets.npy / tags.data.npy
+#       neighbor_ids.npy        int32   (N, K)
+#       neighbor_scores.npy     float32 (N, K)  (or float16 / uint8, see src/quantize.py)
+#       vectors.{data,indices,indptr}.npy      normalized tag matrix (CSR)
+#       ivf_*.npy               IVF lists
+#       segment_vectors.*.npy   rows added or changed since the last compaction
+#       embed_*.npy             optional SVD embeddings: codes, per-row scales, components
+#       term_idf.npy            float32 (V,)    IDF of the weighting scheme (see src/weighting.py)
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import scipy.sparse as sp
+
+from src import metrics
+from src.quantize import quantize_scores
+
+# Default artifact directory
+ARTIFACTS_PATH = 'artifacts'
+
+# Bump when the on-disk layout changes incompatibly
+ARTIFACT_FORMAT = 'movie-recommender-artifacts'
+ARTIFACT_VERSION = 1
+
+# Columns every artifact directory must provide
+REQUIRED_COLUMNS = ('movie_id', 'title', 'neighbor_ids', 'neighbor_scores')
+
+# Published versions kept on disk (older ones are deleted after a publish)
+KEEP_VERSIONS = 3
+
+
+class ArtifactError(ValueError):
+    pass
+
+
+# Read-only view of a string column stored as UTF-8 bytes plus offsets
+class StringColumn:
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            return bytes(self.data[start:stop]).decode('utf-8')
+        return [self[int(j)] for j in np.arange(len(self))[i]]
+
+    def __iter__(self):
+        # Decode the whole column at once instead of one slice per row
+        blob = bytes(self.data)
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets[:-1], offsets[1:]):
+            yield blob[start:stop].decode('utf-8')
+
+    def tolist(self):
+        return list(self)
+
+
+# Function to encode strings as (offsets, UTF-8 bytes)
+def encode_strings(values):
+    encoded = [("" if v is None else str(v)).encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, data
+
+
+# Function to write one .npy file and record it in the schema
+def _write_array(directory, name, array, schema):
+    array = np.ascontiguousarray(array)
+    np.save(os.path.join(directory, f"{name}.npy"), array)
+    schema[name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+
+# Function to get the directory of the published version (the path itself for the flat layout)
+def version_dir(path=ARTIFACTS_PATH):
+    try:
+        with open(os.path.join(path, 'CURRENT')) as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return path
+
+
+# Function to get the published version name cheaply (polled by running processes)
+def current_version(path=ARTIFACTS_PATH):
+    try:
+        with open(os.path.join(path, 'CURRENT')) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return read_manifest(path)['build_id']
+
+
+# Function to link (or copy) columns of an existing version into a new one unchanged
+def _reuse_columns(directory, source, names, columns, files):
+    source_dir = version_dir(source)
+    manifest = read_manifest(source_dir)
+    for name in names:
+        if name not in manifest['columns']:
+            continue
+        columns[name] = manifest['columns'][name]
+        for file_name, schema in manifest['files'].items():
+            if file_name == name or file_name.startswith(f"{name}."):
+                src = os.path.join(source_dir, f"{file_name}.npy")
+                dst = os.path.join(directory, f"{file_name}.npy")
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copyfile(src, dst)
+                files[file_name] = schema
+
+
+# Function to point CURRENT at a finished version directory and drop old versions
+def _publish(path, name):
+    pointer = os.path.join(path, f"CURRENT.tmp-{os.getpid()}")
+    with open(pointer, 'w') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(path, 'CURRENT'))
+
+    # Files of the pre-versioning flat layout are superseded by the first publish
+    for entry in os.listdir(path):
+        if entry == 'manifest.json' or entry.endswith('.npy'):
+            os.remove(os.path.join(path, entry))
+
+    # Processes still on an old version keep their open memory maps after the delete
+    versions = [e for e in os.listdir(path) if os.path.isfile(os.path.join(path, e, 'manifest.json'))]
+    versions.sort(key=lambda e: os.path.getmtime(os.path.join(path, e, 'manifest.json')), reverse=True)
+    for old in versions[KEEP_VERSIONS:]:
+        if old != name:
+            shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+
+# Function to write a complete artifact version and publish it
+#   reuse=(source path, column names) links those columns from another version unchanged
+#   (pass the version directory the source was opened from, not the artifacts root)
+def write_artifacts(path, movie_ids, titles, neighbor_ids, neighbor_scores, tags=None,
+                    vectors=None, ivf=None, stats=None, genre_rankings=None,
+                    search_index=None, vocabulary=None, segment=None, embeddings=None, score_dtype='float32',
+                    weighting=None, reuse=None, extra=None):
+    build_id = uuid.uuid4().hex
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, f".tmp-{build_id}")
+    os.makedirs(tmp)
+
+    files = {}
+    columns = {}
+
+    if reuse is not None:
+        _reuse_columns(tmp, *reuse, columns, files)
+
+    _write_array(tmp, 'movie_id', np.asarray(movie_ids, dtype=np.int64), files)
+    columns['movie_id'] = {'kind': 'array'}
+
+    for name, values in (('title', titles), ('tags', tags), ('vocabulary', vocabulary)):
+        if values is None:
+            continue
+        offsets, data = encode_strings(values)
+        _write_array(tmp, f"{name}.offsets", offsets, files)
+        _write_array(tmp, f"{name}.data", data, files)
+        columns[name] = {'kind': 'string'}
+
+    _write_array(tmp, 'neighbor_ids', np.asarray(neighbor_ids, dtype=np.int32), files)
+    _write_array(tmp, 'neighbor_scores', quantize_scores(neighbor_scores, score_dtype), files)
+    columns['neighbor_ids'] = {'kind': 'array'}
+    columns['neighbor_scores'] = {'kind': 'array'}
+
+    csr_columns = {}
+    if vectors is not None:
+        csr_columns['vectors'] = vectors
+    if ivf is not None:
+        centroids, list_rows, list_offsets, sorted_vectors = ivf
+        _write_array(tmp, 'ivf_centroids', centroids.astype(np.float32), files)
+        _write_array(tmp, 'ivf_list_rows', list_rows.astype(np.int32), files)
+        _write_array(tmp, 'ivf_list_offsets', list_offsets.astype(np.int64), files)
+        for name in ('ivf_centroids', 'ivf_list_rows', 'ivf_list_offsets'):
+            columns[name] = {'kind': 'array'}
+        csr_columns['ivf_vectors'] = sorted_vectors
+    if segment is not None:
+        segment_vectors, segment_rows = segment
+        _write_array(tmp, 'segment_rows', np.asarray(segment_rows, dtype=np.int32), files)
+        columns['segment_rows'] = {'kind': 'array'}
+        csr_columns['segment_vectors'] = segment_vectors
+
+    for name, matrix in csr_columns.items():
+        matrix = sp.csr_matrix(matrix, dtype=np.float32)
+        _write_array(tmp, f"{name}.data", matrix.data, files)
+        _write_array(tmp, f"{name}.indices", matrix.indices.astype(np.int32), files)
+        _write_array(tmp, f"{name}.indptr", matrix.indptr.astype(np.int64), files)
+        columns[name] = {'kind': 'csr', 'shape': list(matrix.shape)}
+
+    # Row-aligned popularity / rating columns and the global rank derived from them
+    for name, values in (stats or {}).items():
+        _write_array(tmp, name, np.asarray(values), files)
+        columns[name] = {'kind': 'array'}
+
+    if genre_rankings is not None:
+        keys, offsets, rows = genre_rankings
+        key_offsets, key_data = encode_strings(keys)
+        _write_array(tmp, 'genre_keys.offsets', key_offsets, files)
+        _write_array(tmp, 'genre_keys.data', key_data, files)
+        _write_array(tmp, 'genre_offsets', offsets.astype(np.int64), files)
+        _write_array(tmp, 'genre_rows', rows.astype(np.int32), files)
+        columns['genre_keys'] = {'kind': 'string'}
+        columns['genre_offsets'] = {'kind': 'array'}
+        columns['genre_rows'] = {'kind': 'array'}
+
+    # Title search arrays (see src/search.py) and embedding columns (see src/quantize.py)
+    for name, values in {**(search_index or {}), **(embeddings or {})}.items():
+        _write_array(tmp, name, values, files)
+        columns[name] = {'kind': 'array'}
+
+    # Term weighting model: IDF as a column, the scheme and its parameters in the manifest
+    if weighting is not None and weighting.get('idf') is not None:
+        _write_array(tmp, 'term_idf', np.asarray(weighting['idf'], dtype=np.float32), files)
+        columns['term_idf'] = {'kind': 'array'}
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'version': ARTIFACT_VERSION,
+        'build_id': build_id,
+        'created_at': time.time(),
+        'n_movies': len(movie_ids),
+        'k': int(np.shape(neighbor_ids)[1]),
+        'columns': columns,
+        'files': files,
+    }
+    if weighting is not None:
+        manifest['weighting'] = {key: value for key, value in weighting.items() if key != 'idf'}
+    manifest.update(extra or {})
+    with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Move the finished version into place, then publish it
+    os.rename(tmp, os.path.join(path, build_id))
+    _publish(path, build_id)
+    return manifest
+
+
+# Function to read and validate manifest.json
+def read_manifest(path=ARTIFACTS_PATH):
+    manifest_path = os.path.join(version_dir(path), 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ArtifactError(f"No artifacts at {path}: run python utils/build_neighbors.py")
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ArtifactError(f"{manifest_path} is not a {ARTIFACT_FORMAT} manifest")
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ArtifactError(
+            f"Artifact version {manifest.get('version')} at {path} is not supported "
+            f"(expected {ARTIFACT_VERSION}); rebuild the artifacts"
+        )
+    missing = [c for c in REQUIRED_COLUMNS if c not in manifest.get('columns', {})]
+    if missing:
+        raise ArtifactError(f"Artifacts at {path} are missing columns: {', '.join(missing)}")
+    return manifest
+
+
+# Function to open one .npy file and check it against the schema
+def _open_array(path, name, manifest, mmap_mode):
+    expected = manifest['files'][name]
+    try:
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+    except FileNotFoundError:
+        raise ArtifactError(f"Artifact file {name}.npy missing from {path}")
+    if array.dtype.str != expected['dtype'] or list(array.shape) != expected['shape']:
+        raise ArtifactError(
+            f"{name}.npy has {array.dtype.str} {list(array.shape)}, "
+            f"manifest says {expected['dtype']} {expected['shape']}"
+        )
+    return array
+
+
+# Function to open every column of an artifact directory (memory-mapped by default)
+def open_artifacts(path=ARTIFACTS_PATH, mmap=True):
+    with metrics.timer('artifacts_open_seconds'):
+        return _open_artifacts(path, mmap)
+
+
+def _open_artifacts(path, mmap):
+    # CURRENT is read once, so a version published meanwhile cannot mix into this one
+    path = version_dir(path)
+    manifest = read_manifest(path)
+    mmap_mode = 'r' if mmap else None
+    artifacts = {'manifest': manifest}
+
+    for name, column in manifest['columns'].items():
+        kind = column['kind']
+        if kind == 'array':
+            artifacts[name] = _open_array(path, name, manifest, mmap_mode)
+        elif kind == 'string':
+            artifacts[name] = StringColumn(
+                _open_array(path, f"{name}.offsets", manifest, mmap_mode),
+                _open_array(path, f"{name}.data", manifest, mmap_mode),
+            )
+        elif kind == 'csr':
+            parts = [_open_array(path, f"{name}.{p}", manifest, mmap_mode) for p in ('data', 'indices', 'indptr')]
+            artifacts[name] = sp.csr_matrix(tuple(parts), shape=tuple(column['shape']), copy=False)
+        else:
+            raise ArtifactError(f"Unknown column kind {kind!r} for {name}")
+
+    # Rows added or changed since the last compaction replace / extend the base matrix (overlaid per query)
+    if 'segment_vectors' in artifacts:
+        artifacts['vectors'] = SegmentedVectors(artifacts['vectors'], artifacts['segment_vectors'],
+                                                artifacts['segment_rows'], manifest['n_movies'])
+
+    # Row-aligned columns must all describe the same movies
+    n_movies = manifest['n_movies']
+    for name in ('movie_id', 'title', 'neighbor_ids', 'neighbor_scores', 'tags', 'vectors', 'popularity',
+                 'vote_average', 'vote_count', 'rank', 'embed_codes', 'embed_scales'):
+        if name in artifacts:
+            rows = artifacts[name].shape[0] if hasattr(artifacts[name], 'shape') else len(artifacts[name])
+            if rows != n_movies:
+                raise ArtifactError(f"Column {name} has {rows} rows, manifest says {n_movies}")
+
+    return artifacts
+
+
+# Catalog tag matrix seen through the segment overlay, without copying the memory-mapped base
+#   supports what the backends need: row lookup (vectors[rows]) and products with dense queries (vectors @ q);
+#   tocsr() merges the two into one matrix (updates and compaction)
+class SegmentedVectors:
+
+    def __init__(self, base, segment, segment_rows, n_movies):
+        self.base = base
+        self.segment = segment
+        self.segment_rows = segment_rows
+        self.shape = (n_movies, base.shape[1])
+
+        # Catalog row -> segment row holding its current vector (-1: the base row; later segment rows win)
+        self.segment_of = np.full(n_movies, -1, dtype=np.int64)
+        self.segment_of[np.asarray(segment_rows, dtype=np.int64)] = np.arange(len(segment_rows))
+        self.overlaid = np.flatnonzero(self.segment_of >= 0)
+
+    def __getitem__(self, rows):
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        source = self.segment_of[rows]
+        from_segment = source >= 0
+        n_base_rows = int((~from_segment).sum())
+
+        stacked = sp.vstack([self.base[rows[~from_segment]], self.segment[source[from_segment]]], format='csr')
+        order = np.empty(len(rows), dtype=np.int64)
+        order[~from_segment] = np.arange(n_base_rows)
+        order[from_segment] = n_base_rows + np.arange(len(rows) - n_base_rows)
+        return stacked[order]
+
+    def __matmul__(self, queries):
+        base_scores = self.base @ queries
+        scores = np.zeros((self.shape[0],) + base_scores.shape[1:], dtype=base_scores.dtype)
+        scores[:self.base.shape[0]] = base_scores
+        scores[self.overlaid] = (self.segment @ queries)[self.segment_of[self.overlaid]]
+        return scores
+
+    def tocsr(self):
+        return apply_segment(self.base, self.segment, self.segment_rows, self.shape[0])
+
+
+# Function to overlay segment rows on a base matrix (later segment rows win)
+#   segment_rows[i] is the catalog row of segment row i; rows past the base are appended
+def apply_segment(base, segment, segment_rows, n_movies):
+    n_base = base.shape[0]
+    source = np.arange(n_movies, dtype=np.int64)
+    source[np.asarray(segment_rows, dtype=np.int64)] = n_base + np.arange(len(segment_rows))
+    return sp.vstack([base, segment], format='csr')[source]
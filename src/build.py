@@ -0,0 +1,125 @@
+# Model build pipeline: raw TMDB CSVs -> serving artifacts
+#
+# Reproduces Movie_rec.ipynb without Colab paths, keeping the tag matrix
+# sparse end to end. The raw dumps are streamed in chunks by src/ingest.py.
+# Run from the repository root:
+#   python -m src.build --movies-csv tmdb_5000_movies.csv --credits-csv tmdb_5000_credits.csv
+import argparse
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.artifacts import ARTIFACTS_PATH, write_artifacts
+from src.genres import (
+    build_genre_rankings, flatten_tag_index, genre_lists, genres_from_lists, rank_movies
+)
+from src.ingest import CHUNK_ROWS, ingest
+from src.neighbors import build_ivf
+from src.quantize import EMBEDDING_DTYPES, SCORE_DTYPES, embedding_arrays
+from src.recommender import DEFAULT_K
+from src.search import build_search_index
+from src.similarity import build_neighbor_index, normalize_rows
+from src.weighting import SCHEMES, fit_weighting, parse_field_weights
+
+# Popularity / rating columns carried through to movies_df.pkl and the artifacts
+STAT_COLUMNS = ['popularity', 'vote_average', 'vote_count']
+
+
+# Context manager to time one build stage
+@contextmanager
+def stage(name, timings, log=print):
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+    log(f"{name:<12} {timings[name]:8.2f}s")
+
+
+# Function to write the artifact directory for a movies dataframe and its neighbors
+#   score_dtype / embedding_dims / embedding_dtype: quantized storage (see src/quantize.py)
+#   weighting: the model vectors was weighted with (see src/weighting.py)
+def write_serving_artifacts(path, movies, vectors, ids, scores, vocabulary=None, extra=None, score_dtype='float32',
+                            embedding_dims=0, embedding_dtype='int8', weighting=None):
+    vectors = normalize_rows(vectors)
+
+    # Rank by weighted rating where the dataframe still has the vote columns
+    stats = {c: movies[c].values.astype(np.float32) for c in STAT_COLUMNS if c in movies}
+    if 'vote_count' in stats:
+        stats['vote_count'] = movies['vote_count'].values.astype(np.int32)
+    stats['rank'] = rank_movies(len(movies), **stats)
+
+    # Genre rankings come from each movie's own genre list, never from matching tag tokens
+    genres = genres_from_lists(genre_lists(movies))
+    genre_rankings = flatten_tag_index(build_genre_rankings(genres, stats['rank']))
+
+    return write_artifacts(
+        path,
+        movie_ids=movies['movie_id'].values,
+        titles=movies['title'].values,
+        neighbor_ids=ids,
+        neighbor_scores=scores,
+        tags=movies['tags'].values,
+        vectors=vectors,
+        ivf=build_ivf(vectors),
+        stats=stats,
+        genre_rankings=genre_rankings,
+        search_index=build_search_index(movies['title'].values, stats['rank']),
+        vocabulary=vocabulary,
+        embeddings=embedding_arrays(vectors, embedding_dims, embedding_dtype) if embedding_dims else None,
+        score_dtype=score_dtype,
+        weighting=weighting,
+        extra=extra,
+    )
+
+
+# Function to run every stage and write the serving artifacts
+def build(movies_csv, credits_csv, movies_out='movies_df.pkl', artifacts_out=ARTIFACTS_PATH,
+          k=DEFAULT_K, max_features=5000, workers=None, score_dtype='float32', embedding_dims=0,
+          embedding_dtype='int8', chunk_rows=CHUNK_ROWS, weighting='count', field_weights=None, log=print):
+    timings = {}
+
+    # Load, join, tag and stem in one streaming pass (credits_csv=None: credits embedded in a JSONL dump)
+    with stage('ingest', timings, log):
+        movies = ingest(movies_csv, credits_csv, chunk_rows, workers)
+
+    with stage('vectorize', timings, log):
+        vectors, vocabulary, model = fit_weighting(movies['tags'], weighting, max_features, movies['field_tags'],
+                                                   field_weights)
+
+    with stage('neighbors', timings, log):
+        ids, scores = build_neighbor_index(vectors, k, workers=workers)
+
+    with stage('write', timings, log):
+        movies.to_pickle(movies_out)
+        write_serving_artifacts(artifacts_out, movies, vectors, ids, scores, vocabulary, score_dtype=score_dtype,
+                                embedding_dims=embedding_dims, embedding_dtype=embedding_dtype, weighting=model)
+
+    log(f"{'total':<12} {sum(timings.values()):8.2f}s  ({len(movies)} movies)")
+    return movies, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the recommender artifacts from raw TMDB CSVs.")
+    parser.add_argument('--movies-csv', default='tmdb_5000_movies.csv', help="Raw TMDB movies CSV or JSONL")
+    parser.add_argument('--credits-csv', default='tmdb_5000_credits.csv',
+                        help="Raw TMDB credits CSV or JSONL ('' when the movies JSONL embeds its credits)")
+    parser.add_argument('--movies-out', default='movies_df.pkl', help="Output movies dataframe")
+    parser.add_argument('--artifacts-out', default=ARTIFACTS_PATH, help="Output artifact directory")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="Neighbors kept per movie")
+    parser.add_argument('--max-features', type=int, default=5000, help="Vocabulary size (0: no cap)")
+    parser.add_argument('--weighting', default='count', choices=SCHEMES, help="Term weighting scheme")
+    parser.add_argument('--field-weights', help="Per-field weights, e.g. genres=2,keywords=1.5,overview=0.5")
+    parser.add_argument('--workers', type=int, help="Ingest / similarity worker processes (default: all cores)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Raw rows per ingest chunk")
+    parser.add_argument('--score-dtype', default='float32', choices=SCORE_DTYPES, help="Neighbor score storage")
+    parser.add_argument('--embedding-dims', type=int, default=0, help="SVD embedding size (0: no embeddings)")
+    parser.add_argument('--embedding-dtype', default='int8', choices=EMBEDDING_DTYPES, help="Embedding storage")
+    args = parser.parse_args()
+
+    build(args.movies_csv, args.credits_csv or None, args.movies_out, args.artifacts_out, args.k,
+          args.max_features, args.workers, args.score_dtype, args.embedding_dims, args.embedding_dtype,
+          args.chunk_rows, args.weighting, parse_field_weights(args.field_weights))
+
+
+if __name__ == '__main__':
+    main()
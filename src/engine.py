@@ -0,0 +1,120 @@
+# Recommendation engine over one artifact directory, shared by app.py and the HTTP service
+#
+# Everything is addressed by catalog row; callers map rows to titles, movie ids
+# and posters. Each index is loaded the first time it is needed. Every call is
+# timed into src.metrics (a no-op unless metrics or profiling are on).
+from functools import cached_property
+
+import numpy as np
+
+from src import metrics
+from src.genres import GenreRanking
+from src.neighbors import load_backend, mmr_rerank, profile_neighbors, recommend_batch
+from src.query_cache import QueryCache
+from src.search import TitleSearch
+
+# Candidates re-ranked for diversity (MMR) when diversity is on
+RERANK_CANDIDATES = 20
+
+
+class Recommender:
+
+    def __init__(self, artifacts, backend='precomputed', cache=None, fetch_posters=None,
+                 rerank_candidates=RERANK_CANDIDATES):
+        self.artifacts = artifacts
+        self.build_id = artifacts['manifest']['build_id']
+        self.backend_name = backend
+        self.cache = cache if cache is not None else QueryCache()
+        self.fetch_posters = fetch_posters
+        self.rerank_candidates = rerank_candidates
+
+    @cached_property
+    def backend(self):
+        return load_backend(self.backend_name, self.artifacts)
+
+    @cached_property
+    def genre_ranking(self):
+        a = self.artifacts
+        return GenreRanking(a['genre_keys'], a['genre_offsets'], a['genre_rows'], a['rank'])
+
+    @cached_property
+    def title_search(self):
+        return TitleSearch(self.artifacts, self.artifacts['rank'])
+
+    # Function to re-rank candidates for diversity (0 keeps the similarity order, 1 is the most varied)
+    def diversify(self, candidates, scores, k, diversity):
+        if not 0.0 <= diversity <= 1.0:
+            raise ValueError(f"diversity must be between 0 and 1, got {diversity}")
+        if diversity == 0:
+            return candidates[:k], scores[:k]
+        return mmr_rerank(candidates, scores, self.artifacts['vectors'], k, lam=1 - diversity)
+
+    # Function to get the number of candidates to score before re-ranking
+    def _candidates(self, k, diversity):
+        return max(k, self.rerank_candidates) if diversity > 0 else k
+
+    # Function to get the (rows, scores) most similar to one movie
+    @metrics.timed('recommend_seconds', kind='movie')
+    def recommend(self, row, k=5, diversity=0.0):
+        def compute():
+            with metrics.timer('neighbors_seconds', backend=self.backend_name):
+                candidates, scores = self.backend.neighbors(row, self._candidates(k, diversity))
+                # Lists shorter than k are padded with -1 (IVF, patched neighbor lists)
+                valid = candidates >= 0
+                return self.diversify(candidates[valid], scores[valid], k, diversity)
+
+        key = ('movie', int(row), k, self.backend_name, diversity)
+        return self.cache.get_or_compute(key, compute, self.build_id)
+
+    # Function to get (rows, scores) for many seeds, scoring the cache misses in one batch
+    def recommend_many(self, rows, k=5, diversity=0.0):
+        rows = [int(r) for r in rows]
+        results = [self.cache.get(('movie', r, k, self.backend_name, diversity), self.build_id) for r in rows]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        seeds = [rows[i] for i in missing]
+        with metrics.timer('neighbors_seconds', backend=self.backend_name):
+            ids, scores = recommend_batch(self.backend, seeds, self._candidates(k, diversity))
+        for i, seed, seed_ids, seed_scores in zip(missing, seeds, ids, scores):
+            valid = seed_ids >= 0
+            picked = self.diversify(seed_ids[valid], seed_scores[valid], k, diversity)
+            results[i] = self.cache.set(('movie', seed, k, self.backend_name, diversity), *picked,
+                                        version=self.build_id)
+        return results
+
+    # Function to get the (rows, scores) closest to the blend of several movies
+    @metrics.timed('recommend_seconds', kind='profile')
+    def recommend_profile(self, rows, k=5, diversity=0.0):
+        rows = sorted(int(r) for r in rows)
+
+        def compute():
+            candidates, scores = profile_neighbors(self.artifacts['vectors'], rows, self._candidates(k, diversity))
+            return self.diversify(candidates, scores, k, diversity)
+
+        return self.cache.get_or_compute(('profile', tuple(rows), k, diversity), compute, self.build_id)
+
+    # Function to get one page of a genre (or genre combination) ranking, plus the total
+    @metrics.timed('genre_page_seconds')
+    def genre_page(self, genres, page=0, page_size=10):
+        return self.genre_ranking.page(genres, page, page_size)
+
+    # Function to get the rows of the best title matches for a typeahead query
+    @metrics.timed('search_seconds')
+    def search(self, query, k=10):
+        return self.title_search.search(query, k)
+
+    # Function to get the poster URL (or None) of every row
+    @metrics.timed('poster_grid_seconds')
+    def posters(self, rows):
+        if self.fetch_posters is None:
+            return [None] * len(rows)
+        return self.fetch_posters(self.artifacts['movie_id'][np.asarray(rows, dtype=np.int64)].tolist())
+
+    # Function to get the query cache counters as metric gauges (for metrics.REGISTRY.add_collector)
+    def metric_gauges(self):
+        return {(f"query_cache_{name}", ()): value for name, value in self.cache.stats().items()}
+
+    def stats(self):
+        return self.cache.stats()
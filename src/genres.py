@@ -0,0 +1,220 @@
+# Inverted token index over the stemmed tags, and ranked genre lists for the genre browse view
+import re
+
+import numpy as np
+
+# Genre label -> stemmed tag token
+GENRE_MAP = {
+    "All": None,
+    "Action": "action",
+    "Adventure": "adventur",
+    "Animation": "anim",
+    "Comedy": "comedi",
+    "Crime": "crime",
+    "Drama": "drama",
+    "Fantasy": "fantasi",
+    "Horror": "horror",
+    "Romance": "romanc",
+    "Science Fiction": "sciencefict",
+    "Thriller": "thriller"
+}
+
+# Same token pattern as the CountVectorizer used to build the model
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# Stemmed TMDB genre names (as the notebook writes them into the tags) -> genre name
+TAG_GENRES = {
+    "action": "Action", "adventur": "Adventure", "anim": "Animation", "comedi": "Comedy",
+    "crime": "Crime", "documentari": "Documentary", "drama": "Drama", "famili": "Family",
+    "fantasi": "Fantasy", "foreign": "Foreign", "histori": "History", "horror": "Horror",
+    "music": "Music", "mysteri": "Mystery", "romanc": "Romance", "sciencefict": "Science Fiction",
+    "thriller": "Thriller", "tvmovi": "TV Movie", "war": "War", "western": "Western",
+}
+
+
+# Function to build token -> sorted row positions (posting lists)
+def build_tag_index(tags):
+    postings = {}
+    for pos, text in enumerate(tags):
+        if not isinstance(text, str):
+            continue
+        for token in set(TOKEN_PATTERN.findall(text)):
+            postings.setdefault(token, []).append(pos)
+
+    # Rows are visited in order, so every posting list is already sorted
+    return {token: np.array(rows, dtype=np.int32) for token, rows in postings.items()}
+
+
+# Function to flatten an index into (sorted tokens, offsets, rows) for storage
+def flatten_tag_index(index):
+    tokens = sorted(index)
+    sizes = [len(index[t]) for t in tokens]
+    offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    rows = np.concatenate([index[t] for t in tokens]) if tokens else np.empty(0, dtype=np.int32)
+    return tokens, offsets, rows.astype(np.int32)
+
+
+# Token index over flattened (possibly memory-mapped) posting lists
+class PostingIndex:
+
+    def __init__(self, tokens, offsets, rows):
+        self.tokens = tokens
+        self.offsets = offsets
+        self.rows = rows
+
+    def get(self, token, default=None):
+        # Binary search over the sorted tokens
+        lo, hi = 0, len(self.tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.tokens[mid] < token:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.tokens) and self.tokens[lo] == token:
+            return self.rows[self.offsets[lo]:self.offsets[lo + 1]]
+        return default
+
+
+# Function to get the rows tagged with an exact token
+def rows_for_token(index, token):
+    return index.get(token, np.empty(0, dtype=np.int32))
+
+
+# Function to combine posting lists: mode 'and' intersects, 'or' unions
+def query_tags(index, tokens, mode='and'):
+    if mode not in ('and', 'or'):
+        raise ValueError(f"Unknown mode: {mode}")
+
+    postings = sorted((rows_for_token(index, t) for t in tokens), key=len)
+    if not postings:
+        return np.empty(0, dtype=np.int32)
+
+    result = postings[0]
+    for rows in postings[1:]:
+        if mode == 'and':
+            result = np.intersect1d(result, rows, assume_unique=True)
+        else:
+            result = np.union1d(result, rows)
+    return result
+
+
+# Function to score movies by IMDb-style weighted rating (vote average shrunk towards the mean)
+def weighted_rating(vote_average, vote_count, quantile=0.9):
+    vote_average = np.asarray(vote_average, dtype=np.float64)
+    vote_count = np.asarray(vote_count, dtype=np.float64)
+    if len(vote_count) == 0:
+        return vote_average
+    m = max(np.quantile(vote_count, quantile), 1.0)
+    c = vote_average.mean()
+    return (vote_count * vote_average + m * c) / (vote_count + m)
+
+
+# Function to get every movie's global rank (0 = best) from the columns available
+def rank_movies(n, popularity=None, vote_average=None, vote_count=None):
+    rows = np.arange(n)
+    popularity = np.zeros(n) if popularity is None else np.asarray(popularity, dtype=np.float64)
+    if vote_average is not None and vote_count is not None:
+        score = weighted_rating(vote_average, vote_count)
+    else:
+        score = popularity
+
+    # Highest score first, then most popular, then file order
+    order = np.lexsort((rows, -popularity, -score))
+    rank = np.empty(n, dtype=np.int32)
+    rank[order] = rows
+    return rank
+
+
+# Function to read the genre field back out of one stemmed tag string (when genre names were not kept)
+#   tags are overview words + genres + keywords + cast + director, so the genres are the run of genre
+#   tokens right after the overview, whose last word keeps its punctuation; the same stems elsewhere
+#   ('anim' from "animals" in a plot) are not genres. Without such a run, the longest run is taken.
+def tag_genres(text):
+    if not isinstance(text, str):
+        return []
+    words = text.split()
+    runs = []
+    start = None
+    for pos, word in enumerate(words + ['']):
+        if word in TAG_GENRES:
+            start = pos if start is None else start
+        elif start is not None:
+            runs.append((start, pos))
+            start = None
+    if not runs:
+        return []
+
+    after_overview = [(a, b) for a, b in runs if a == 0 or not words[a - 1][-1].isalnum()]
+    a, b = after_overview[-1] if after_overview else max(reversed(runs), key=lambda run: run[1] - run[0])
+    return [TAG_GENRES[word] for word in dict.fromkeys(words[a:b])]
+
+
+# Function to get each movie's genre names: the TMDB genre field when kept, otherwise read from its tags
+def genre_lists(movies):
+    if 'genres' in movies:
+        return list(movies['genres'].values)
+    return [tag_genres(text) for text in movies['tags'].values]
+
+
+# Function to get genre label -> rows from per-movie genre name lists
+def genres_from_lists(genre_lists):
+    genres = {}
+    for pos, names in enumerate(genre_lists):
+        for name in set(names):
+            genres.setdefault(name, []).append(pos)
+    return {name: np.array(rows, dtype=np.int32) for name, rows in genres.items()}
+
+
+# Function to get the key a genre combination is stored under
+def combo_key(labels):
+    return "|".join(sorted(set(labels)))
+
+
+# Function to rank every genre and every pair of genres by global rank
+def build_genre_rankings(genres, rank):
+    def ranked(rows):
+        return rows[np.argsort(rank[rows], kind='stable')].astype(np.int32)
+
+    rankings = {label: ranked(rows) for label, rows in genres.items() if len(rows)}
+    labels = sorted(rankings)
+    for i, first in enumerate(labels):
+        for second in labels[i + 1:]:
+            rows = np.intersect1d(genres[first], genres[second], assume_unique=True)
+            if len(rows):
+                rankings[combo_key((first, second))] = ranked(rows)
+    return rankings
+
+
+# Ranked genre lists over flattened (possibly memory-mapped) arrays
+class GenreRanking:
+
+    def __init__(self, keys, offsets, rows, rank):
+        self.index = PostingIndex(keys, offsets, rows)
+        self.rank = rank
+
+    # Function to get the ranked rows for one genre or a combination of genres
+    def rows(self, labels):
+        if isinstance(labels, str):
+            labels = [labels]
+        labels = sorted(set(labels))
+        empty = np.empty(0, dtype=np.int32)
+
+        stored = self.index.get(combo_key(labels))
+        if stored is not None or len(labels) <= 2:
+            return empty if stored is None else stored
+
+        # Three or more genres: intersect the single-genre lists and re-rank
+        rows = None
+        for label in labels:
+            postings = self.index.get(label, empty)
+            rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+        if rows is None:
+            return empty
+        return rows[np.argsort(self.rank[rows], kind='stable')].astype(np.int32)
+
+    # Function to get one page of ranked rows, plus the total number of matches
+    def page(self, labels, page=0, page_size=10):
+        rows = self.rows(labels)
+        return rows[page * page_size:(page + 1) * page_size], len(rows)
@@ -0,0 +1,244 @@
+# Streaming ingest of raw TMDB dumps: movies + credits -> catalog rows (movie_id, title, stemmed tags, stats, genres)
+#
+# Reads CSV dumps (tmdb_5000_*.csv layout) in chunks, or line-delimited JSON
+# (one movie per line, optionally with its credits embedded), and joins on
+# movie_id. Credits are indexed first: each chunk's cast / crew blobs are cut
+# down to the top 10 cast and the director in a worker and spilled to a
+# temporary SQLite file. Movie chunks then go through the same process pool,
+# where each worker looks up its credits, extracts the JSON fields it needs,
+# builds the tag string and stems it. At most 2 chunks per worker are in
+# flight, so peak memory depends on the chunk size, not the dump size (only
+# the compact output rows accumulate).
+#
+#   python -m src.build --movies-csv movies.jsonl --credits-csv credits.csv --chunk-rows 5000
+import json
+import math
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional: orjson parses the large cast / crew blobs several times faster
+    _loads = json.loads
+
+# Raw rows read (and handed to a worker) at a time
+CHUNK_ROWS = 2000
+
+# Fields every movie needs (rows missing one are dropped)
+MOVIE_FIELDS = ('movie_id', 'title', 'overview', 'genres', 'keywords', 'popularity', 'vote_average', 'vote_count')
+CREDIT_FIELDS = ('movie_id', 'cast', 'crew')
+
+# Cast members kept in the tags
+CAST_LIMIT = 10
+
+# Columns of the catalog rows produced (the movies dataframe of src.build)
+#   field_tags: the stemmed tags split by field (overview, genres, keywords, cast, director; see src/weighting.py)
+COLUMNS = ['movie_id', 'title', 'tags', 'popularity', 'vote_average', 'vote_count', 'genres', 'field_tags']
+
+# Worker state: credits index (path, lazily opened connection) and stemmer cache
+_credits_path = None
+_credits_conn = None
+_stemmer = None
+_stems = {}
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+# Function to get a JSON field as Python objects (CSV dumps hold JSON strings, JSONL dumps the objects)
+def _parse(value):
+    if isinstance(value, (str, bytes)):
+        return _loads(value)
+    return value
+
+
+# Function to get the 'name' of every object in a JSON list (first `limit` only)
+def _names(value, limit=None):
+    data = _parse(value)
+    if isinstance(data, dict):
+        # TMDB API responses wrap keywords: {"keywords": [...]}
+        data = next(iter(data.values()), [])
+    if len(data) > 0 and isinstance(data[0], list):
+        data = data[0]
+    return [item['name'] for item in data[:limit]]
+
+
+# Function to get the director from a crew list (blobs without one are never parsed)
+def _director(value):
+    if isinstance(value, str) and '"Director"' not in value:
+        return []
+    for member in _parse(value):
+        if member.get('job') == 'Director':
+            return [member['name']]
+    return []
+
+
+def _squash(values):
+    return [v.replace(" ", "") for v in values]
+
+
+# Function to cut one credits record down to (movie_id, cast tokens, director tokens)
+def _credit_row(record):
+    if any(_missing(record.get(f)) for f in CREDIT_FIELDS):
+        return None
+    return (int(record['movie_id']), " ".join(_squash(_names(record['cast'], CAST_LIMIT))),
+            " ".join(_squash(_director(record['crew']))))
+
+
+def _stem_text(text):
+    global _stemmer
+    if _stemmer is None:
+        from nltk.stem.porter import PorterStemmer
+
+        _stemmer = PorterStemmer()
+    words = []
+    for word in text.split():
+        stemmed = _stems.get(word)
+        if stemmed is None:
+            stemmed = _stems[word] = _stemmer.stem(word)
+        words.append(stemmed)
+    return " ".join(words)
+
+
+# Function to get the (cast, director) tokens of a movie: embedded in the record, else from the credits index
+def _credits_for(record):
+    global _credits_conn
+    credits = record.get('credits')
+    if isinstance(credits, dict):
+        record = {**record, **credits}
+    if 'cast' in record and 'crew' in record:
+        row = _credit_row(record)
+        return [] if row is None else [row[1:]]
+    if _credits_path is None:
+        return []
+    if _credits_conn is None:
+        _credits_conn = sqlite3.connect(f"file:{_credits_path}?mode=ro", uri=True)
+    return _credits_conn.execute(
+        "SELECT cast_tokens, director_tokens FROM credits WHERE movie_id = ? ORDER BY rowid", (record['movie_id'],)
+    ).fetchall()
+
+
+# Function to turn raw movie records into catalog rows (one per matching credits row)
+def _movie_rows(records):
+    rows = []
+    for record in records:
+        if isinstance(record, (str, bytes)):
+            record = _loads(record)
+        if 'movie_id' not in record:
+            record['movie_id'] = record.get('id')
+        if any(_missing(record.get(f)) for f in MOVIE_FIELDS):
+            continue
+        record['movie_id'] = int(record['movie_id'])
+
+        # Same tokens as the notebook: overview words, genres, keywords, top cast, director
+        genres = _names(record['genres'])
+        fields = [_stem_text(" ".join(tokens).lower()) for tokens in
+                  (record['overview'].split(), _squash(genres), _squash(_names(record['keywords'])))]
+        for cast, director in _credits_for(record):
+            field_tags = fields + [_stem_text(cast.lower()), _stem_text(director.lower())]
+            tags = " ".join(filter(None, field_tags))
+            rows.append((record['movie_id'], record['title'], tags, float(record['popularity']),
+                         float(record['vote_average']), int(record['vote_count']), genres, field_tags))
+    return rows
+
+
+def _credit_rows(records):
+    rows = []
+    for record in records:
+        if isinstance(record, (str, bytes)):
+            record = _loads(record)
+            record.setdefault('movie_id', record.get('id'))
+        row = _credit_row(record)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def _init_worker(credits_path):
+    global _credits_path, _credits_conn
+    _credits_path, _credits_conn = credits_path, None
+
+
+# Function to read a dump in chunks: lists of records (CSV rows as dicts, JSONL lines unparsed)
+def read_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    if path.endswith(('.jsonl', '.ndjson', '.json')):
+        with open(path, 'rb') as f:
+            while True:
+                lines = [line for line in islice(f, chunk_rows) if line.strip()]
+                if not lines:
+                    return
+                yield lines
+    else:
+        wanted = set(columns) | {'id'}
+        for chunk in pd.read_csv(path, usecols=lambda c: c in wanted, chunksize=chunk_rows):
+            chunk = chunk.rename(columns={'id': 'movie_id'})
+            yield chunk.to_dict('records')
+
+
+# Function to map fn over chunks in a pool, in order, with at most `window` chunks in flight
+def _bounded_map(pool, fn, chunks, window):
+    pending = []
+    for chunk in chunks:
+        pending.append(pool.submit(fn, chunk))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+# Function to spill the compact credits of a dump to a SQLite file
+def index_credits(credits_path, db_path, chunk_rows=CHUNK_ROWS, pool=None, window=1):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE credits (movie_id INTEGER, cast_tokens TEXT, director_tokens TEXT)")
+    chunks = read_chunks(credits_path, CREDIT_FIELDS, chunk_rows)
+    results = map(_credit_rows, chunks) if pool is None else _bounded_map(pool, _credit_rows, chunks, window)
+    for rows in results:
+        conn.executemany("INSERT INTO credits VALUES (?, ?, ?)", rows)
+    conn.execute("CREATE INDEX credits_movie_id ON credits (movie_id)")
+    conn.commit()
+    conn.close()
+
+
+# Function to stream catalog rows chunk by chunk as dataframes (same columns as src.build's movies)
+def iter_movies(movies_path, credits_path=None, chunk_rows=CHUNK_ROWS, workers=None):
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Workers open the credits index lazily, after it has been written
+        db_path = os.path.join(tmp, 'credits.sqlite3') if credits_path else None
+        pool = None
+        try:
+            if workers > 1:
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,))
+            else:
+                _init_worker(db_path)
+            if credits_path:
+                index_credits(credits_path, db_path, chunk_rows, pool, window)
+
+            chunks = read_chunks(movies_path, MOVIE_FIELDS + CREDIT_FIELDS + ('credits',), chunk_rows)
+            if pool is None:
+                results = map(_movie_rows, chunks)
+            else:
+                results = _bounded_map(pool, _movie_rows, chunks, window)
+            for rows in results:
+                yield pd.DataFrame(rows, columns=COLUMNS)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            _init_worker(None)
+
+
+# Function to ingest a whole dump into one movies dataframe
+def ingest(movies_path, credits_path=None, chunk_rows=CHUNK_ROWS, workers=None):
+    frames = list(iter_movies(movies_path, credits_path, chunk_rows, workers))
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,233 @@
+# Lightweight in-process metrics: counters, gauges and latency histograms
+#
+# Off unless METRICS_ENABLED=1 (or enable() is called); while off, inc(),
+# observe() and timer() return at once, so hot paths can call them freely.
+# Metrics render in the Prometheus text format, served by the recommendation
+# service at GET /metrics, or by the app on METRICS_PORT / written to METRICS_FILE.
+#
+# Profiling is opt-in per request: between start_profile() and end_profile()
+# every timer also records a (name, seconds) span for that request only,
+# whether or not metrics are enabled.
+import contextvars
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets (seconds) shared by every latency metric
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Spans of the request being profiled (None when not profiling)
+_profile = contextvars.ContextVar('metrics_profile', default=None)
+
+# Requests being profiled in this process (lets disabled timers skip the context lookup)
+_profiling = 0
+_profiling_lock = threading.Lock()
+
+
+class Registry:
+
+    def __init__(self):
+        self.enabled = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    # Function to register fn() -> {(name, labels): value}, read as gauges at export time
+    def add_collector(self, fn):
+        self._collectors.append(fn)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # Function to render every metric in the Prometheus text exposition format
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: ([*h[0]], h[1], h[2]) for key, h in self._histograms.items()}
+        gauges = {}
+        for collector in self._collectors:
+            gauges.update(collector())
+
+        lines = []
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, buckets):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+# Process-wide registry used by the helpers below
+REGISTRY = Registry()
+
+
+def enable(on=True):
+    REGISTRY.enabled = on
+
+
+def enabled():
+    return REGISTRY.enabled
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# Function to add to a counter (labels as keyword arguments)
+def inc(name, value=1, **labels):
+    if REGISTRY.enabled:
+        REGISTRY.inc(name, value, _label_key(labels))
+
+
+# Function to record one latency (seconds) in a histogram
+def observe(name, seconds, **labels):
+    if REGISTRY.enabled:
+        REGISTRY.observe(name, seconds, _label_key(labels))
+    spans = _profile.get()
+    if spans is not None:
+        spans.append((name, dict(labels), seconds))
+
+
+class _Timer:
+
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class _NullTimer:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# Function to time a block into a histogram: with metrics.timer('recommend_seconds', backend='exact'): ...
+def timer(name, **labels):
+    if not REGISTRY.enabled and not _profiling:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+# Decorator to time every call of a function (cheaper than timer() on hot paths while disabled)
+def timed(name, **labels):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled and not _profiling:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorate
+
+
+# Function to start recording the spans of the current request; returns the token for end_profile()
+def start_profile():
+    global _profiling
+    with _profiling_lock:
+        _profiling += 1
+    return _profile.set([])
+
+
+# Function to stop profiling: the request's spans as (name, labels, seconds), in completion order
+def end_profile(token):
+    global _profiling
+    spans = _profile.get()
+    _profile.reset(token)
+    with _profiling_lock:
+        _profiling -= 1
+    return spans or []
+
+
+# Function to write the metrics to a file atomically (for a node exporter textfile collector)
+def write_metrics_file(path):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to serve the metrics on http://host:port/metrics from a background thread
+def start_metrics_server(port, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,242 @@
+# Pluggable neighbor backends behind recommend()
+#
+#   precomputed  top-K neighbor rows from the artifacts (default, smallest and fastest)
+#   exact        brute-force cosine over the normalized tag matrix at query time
+#   ivf          inverted-file ANN: probe the nprobe closest k-means lists only
+#   embedding    brute-force cosine over low-rank (SVD) embeddings, scored on the stored int8 / float16 codes
+#
+# Every backend exposes neighbors(movie_index, k) -> (row ids, scores), best first,
+# and neighbors_batch(rows, k) -> (len(rows) x k ids, scores) for many seeds at once.
+import warnings
+
+import numpy as np
+
+from src.quantize import dequantize_embeddings, dequantize_scores
+from src.recommender import top_n
+from src.similarity import DENSE_BLOCK_BYTES, merge_top_k, normalize_rows
+
+# Lists probed per query by the IVF backend
+DEFAULT_NPROBE = 8
+
+
+class PrecomputedBackend:
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    # Scores may be stored as float16 / uint8; only the k returned ones are converted
+    def neighbors(self, movie_index, k):
+        return self.ids[movie_index, :k], dequantize_scores(self.scores[movie_index, :k])
+
+    def neighbors_batch(self, rows, k):
+        return self.ids[rows, :k], dequantize_scores(self.scores[rows, :k])
+
+
+class ExactBackend:
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def neighbors(self, movie_index, k):
+        query = self.vectors[movie_index].toarray().ravel()
+        scores = self.vectors @ query
+        ids = top_n(scores, k, exclude=movie_index)
+        return ids, scores[ids]
+
+    def neighbors_batch(self, rows, k):
+        # One sparse x dense product scores every seed against the catalog
+        seeds = self.vectors[rows].toarray().T
+        scores = np.ascontiguousarray((self.vectors @ seeds).T).astype(np.float32, copy=False)
+        scores[np.arange(len(rows)), rows] = -np.inf
+
+        ids = np.broadcast_to(np.arange(scores.shape[1], dtype=np.int32), scores.shape)
+        return merge_top_k(ids, scores, k)
+
+
+class EmbeddingBackend:
+
+    def __init__(self, codes, scales=None):
+        self.codes = codes
+        self.scales = scales
+        # Rows converted to float32 per block, so the scratch space stays bounded
+        self.block_rows = max(1, DENSE_BLOCK_BYTES // (codes.shape[1] * 4))
+
+    # Function to score every row against queries (dims x m): codes @ queries, times the row scales
+    def score(self, queries):
+        n_movies = self.codes.shape[0]
+        scores = np.empty((n_movies, queries.shape[1]), dtype=np.float32)
+        for start in range(0, n_movies, self.block_rows):
+            stop = min(start + self.block_rows, n_movies)
+            np.matmul(np.asarray(self.codes[start:stop], dtype=np.float32), queries, out=scores[start:stop])
+        if self.scales is not None:
+            scores *= np.asarray(self.scales)[:, None]
+        return scores
+
+    def queries(self, rows):
+        scales = None if self.scales is None else self.scales[rows]
+        return dequantize_embeddings(self.codes[rows], scales).T
+
+    def neighbors(self, movie_index, k):
+        scores = self.score(self.queries([movie_index]))[:, 0]
+        ids = top_n(scores, k, exclude=movie_index)
+        return ids, scores[ids]
+
+    def neighbors_batch(self, rows, k):
+        scores = np.ascontiguousarray(self.score(self.queries(rows)).T)
+        scores[np.arange(len(rows)), rows] = -np.inf
+
+        ids = np.broadcast_to(np.arange(scores.shape[1], dtype=np.int32), scores.shape)
+        return merge_top_k(ids, scores, k)
+
+
+class IVFBackend:
+
+    def __init__(self, sorted_vectors, centroids, list_rows, list_offsets, nprobe=DEFAULT_NPROBE):
+        self.centroids = centroids
+        self.list_rows = list_rows
+        self.list_offsets = list_offsets
+        self.nprobe = nprobe
+
+        # Rows are stored list by list; row_position maps a movie to its slot
+        self.sorted_vectors = sorted_vectors
+        self.row_position = np.empty_like(list_rows)
+        self.row_position[list_rows] = np.arange(len(list_rows), dtype=list_rows.dtype)
+
+    def neighbors(self, movie_index, k):
+        query = self.sorted_vectors[self.row_position[movie_index]].toarray().ravel()
+        lists = top_n(self.centroids @ query, self.nprobe)
+
+        # Positions in sorted_vectors of every row in the probed lists
+        starts = self.list_offsets[lists]
+        sizes = self.list_offsets[lists + 1] - starts
+        positions = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        candidates = self.list_rows[positions]
+
+        scores = self.sorted_vectors[positions] @ query
+
+        best = top_n(scores, k, exclude=np.flatnonzero(candidates == movie_index))
+        return candidates[best], scores[best]
+
+    def neighbors_batch(self, rows, k):
+        # Probed lists differ per seed, so queries run one by one
+        ids = np.full((len(rows), k), -1, dtype=np.int32)
+        scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        for i, row in enumerate(rows):
+            row_ids, row_scores = self.neighbors(row, k)
+            ids[i, :len(row_ids)] = row_ids
+            scores[i, :len(row_ids)] = row_scores
+        return ids, scores
+
+
+# Function to score the catalog against a weighted centroid of several seed movies
+def profile_neighbors(vectors, rows, k, weights=None):
+    rows = np.asarray(rows, dtype=np.int64)
+    if weights is None:
+        weights = np.ones(len(rows), dtype=np.float32)
+    weights = np.asarray(weights, dtype=np.float32)
+
+    # Centroid of the (unit-length) seed vectors, renormalized for cosine scores
+    centroid = np.asarray(vectors[rows].T @ weights, dtype=np.float32).ravel()
+    norm = np.linalg.norm(centroid)
+    if norm > 0:
+        centroid /= norm
+
+    # One sparse mat-vec scores the whole catalog; seeds are never recommended
+    scores = vectors @ centroid
+    ids = top_n(scores, k, exclude=rows)
+    return ids, scores[ids]
+
+
+# Function to re-rank candidates with maximal marginal relevance (MMR)
+#   lam=1 keeps the relevance order, lower values trade relevance for diversity
+def mmr_rerank(candidates, relevance, vectors, k, lam=0.7):
+    # Outside [0, 1] the trade-off inverts (lam < 0 prefers the least relevant candidates)
+    if not 0.0 <= lam <= 1.0:
+        raise ValueError(f"lam must be between 0 and 1, got {lam}")
+    candidates = np.asarray(candidates)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    k = min(k, len(candidates))
+    if k == 0:
+        return candidates[:0], relevance[:0]
+
+    # Pairwise cosine similarities of the candidates: one K x K block
+    block = vectors[candidates]
+    pairwise = (block @ block.T).toarray().astype(np.float32, copy=False)
+
+    chosen = np.empty(k, dtype=np.int64)
+    available = np.ones(len(candidates), dtype=bool)
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    for step in range(k):
+        gain = lam * relevance - (1 - lam) * redundancy
+        gain[~available] = -np.inf
+        pick = int(np.argmax(gain))
+        chosen[step] = pick
+        available[pick] = False
+
+        # Redundancy is the max similarity to anything already chosen
+        if step == 0:
+            redundancy = pairwise[pick].copy()
+        else:
+            np.maximum(redundancy, pairwise[pick], out=redundancy)
+
+    return candidates[chosen], relevance[chosen]
+
+
+# Function to get neighbors for many seed rows, chunk by chunk to bound memory
+def recommend_batch(backend, rows, k=5, chunk_size=512):
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return np.empty((0, k), dtype=np.int32), np.empty((0, k), dtype=np.float32)
+
+    ids = []
+    scores = []
+    for start in range(0, len(rows), chunk_size):
+        chunk_ids, chunk_scores = backend.neighbors_batch(rows[start:start + chunk_size], k)
+        ids.append(chunk_ids)
+        scores.append(chunk_scores)
+    return np.vstack(ids), np.vstack(scores)
+
+
+# Function to cluster normalized vectors into n_lists inverted lists
+#   returns (centroids, list_rows, list_offsets, vectors reordered list by list)
+def build_ivf(vectors, n_lists=None, seed=0):
+    from sklearn.cluster import MiniBatchKMeans
+
+    vectors = normalize_rows(vectors)
+    n_movies = vectors.shape[0]
+    n_lists = n_lists or max(1, int(np.sqrt(n_movies)))
+
+    kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, batch_size=4096, n_init=3)
+    assignment = kmeans.fit_predict(vectors)
+
+    # Unit-length centroids so list selection is by cosine, like the scoring
+    centroids = kmeans.cluster_centers_.astype(np.float32)
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    centroids /= np.where(norms > 0, norms, 1)
+
+    list_rows = np.argsort(assignment, kind='stable').astype(np.int32)
+    list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assignment, minlength=n_lists), out=list_offsets[1:])
+    return centroids, list_rows, list_offsets, vectors[list_rows]
+
+
+# Function to create a backend by name from opened artifacts
+def load_backend(name, artifacts, nprobe=DEFAULT_NPROBE):
+    if name == 'precomputed':
+        return PrecomputedBackend(artifacts['neighbor_ids'], artifacts['neighbor_scores'])
+    if name == 'exact':
+        return ExactBackend(artifacts['vectors'])
+    if name == 'ivf':
+        if 'ivf_centroids' not in artifacts:
+            # Incremental updates drop the IVF lists until the next compaction
+            warnings.warn("Artifacts have no IVF lists (updated since the last compaction); using exact search")
+            return ExactBackend(artifacts['vectors'])
+        return IVFBackend(artifacts['ivf_vectors'], artifacts['ivf_centroids'], artifacts['ivf_list_rows'],
+                          artifacts['ivf_list_offsets'], nprobe=nprobe)
+    if name == 'embedding':
+        if 'embed_codes' not in artifacts:
+            warnings.warn("Artifacts have no embeddings (build with --embedding-dims); using exact search")
+            return ExactBackend(artifacts['vectors'])
+        return EmbeddingBackend(artifacts['embed_codes'], artifacts.get('embed_scales'))
+    raise ValueError(f"Unknown recommender backend: {name}")
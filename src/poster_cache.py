@@ -0,0 +1,156 @@
+# Disk-backed poster cache shared by every app process (SQLite, WAL mode)
+import sqlite3
+import threading
+import time
+
+# Default cache file and policy
+POSTER_CACHE_PATH = 'poster_cache.sqlite3'
+HIT_TTL = 30 * 24 * 3600      # poster found: keep for 30 days
+MISS_TTL = 3600               # no poster on TMDB: retry after an hour (failed lookups are not cached)
+MAX_ENTRIES = 100_000
+
+# Evict at most once per this many writes
+EVICT_EVERY = 100
+
+
+class PosterCache:
+
+    def __init__(self, path=POSTER_CACHE_PATH, hit_ttl=HIT_TTL, miss_ttl=MISS_TTL, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        # One connection per cache object, shared by the poster worker threads
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posters ("
+            " movie_id INTEGER PRIMARY KEY,"
+            " poster TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS posters_accessed ON posters (accessed_at)")
+
+    # Function to check whether a stored entry is still fresh
+    def _fresh(self, poster, fetched_at, now):
+        ttl = self.hit_ttl if poster is not None else self.miss_ttl
+        return now - fetched_at < ttl
+
+    # Function to look up one movie; returns (found, poster)
+    def get(self, movie_id):
+        result = self.get_many([movie_id])
+        if movie_id in result:
+            return True, result[movie_id]
+        return False, None
+
+    # Function to look up many movies; returns {movie_id: poster} for fresh entries
+    def get_many(self, movie_ids):
+        movie_ids = [int(m) for m in movie_ids]
+        if not movie_ids:
+            return {}
+
+        now = time.time()
+        placeholders = ",".join("?" * len(movie_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT movie_id, poster, fetched_at FROM posters WHERE movie_id IN ({placeholders})",
+                movie_ids,
+            ).fetchall()
+
+            found = {}
+            for movie_id, poster, fetched_at in rows:
+                if self._fresh(poster, fetched_at, now):
+                    found[movie_id] = poster
+                else:
+                    self.expired += 1
+
+            # Touch entries for LRU eviction
+            if found:
+                self._conn.executemany(
+                    "UPDATE posters SET accessed_at = ? WHERE movie_id = ?",
+                    [(now, movie_id) for movie_id in found],
+                )
+
+            self.hits += len(found)
+            self.misses += len(set(movie_ids)) - len(found)
+        return found
+
+    # Function to list ids that are missing or stale (does not touch counters)
+    def stale_ids(self, movie_ids, max_age=None):
+        movie_ids = list(dict.fromkeys(int(m) for m in movie_ids))
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute("SELECT movie_id, poster, fetched_at FROM posters").fetchall()
+
+        fresh = set()
+        for movie_id, poster, fetched_at in rows:
+            if max_age is not None and now - fetched_at >= max_age:
+                continue
+            if self._fresh(poster, fetched_at, now):
+                fresh.add(movie_id)
+        return [m for m in movie_ids if m not in fresh]
+
+    # Function to store a lookup result (None is cached with the shorter TTL)
+    def set(self, movie_id, poster):
+        self.set_many([(movie_id, poster)])
+
+    # Function to store many (movie_id, poster) results in one transaction
+    def set_many(self, items, fetched_at=None):
+        now = time.time()
+        fetched_at = now if fetched_at is None else fetched_at
+        rows = [(int(movie_id), poster, fetched_at, now) for movie_id, poster in items]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO posters (movie_id, poster, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+
+            self._writes += len(rows)
+            if self._writes >= EVICT_EVERY:
+                self._writes = 0
+                self._evict()
+
+    # Function to drop the least recently used entries above max_entries
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM posters").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM posters WHERE movie_id IN "
+                "(SELECT movie_id FROM posters ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    # Function to report cache counters for this process
+    def stats(self):
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM posters").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,90 @@
+# Quantized storage for neighbor scores and low-rank movie embeddings
+#
+# Neighbor scores are cosines in [0, 1]: stored as float32 (default), float16 or
+# uint8 (score x 255). Only the K scores a query returns are ever dequantized.
+#
+# Embeddings are a truncated SVD of the normalized tag matrix, stored as float32,
+# float16 or int8 codes with one float32 scale per row (row = codes x scale).
+# Rows are not renormalized, so a dot product approximates the full cosine.
+# The embedding backend scores directly on the codes.
+import numpy as np
+
+from src.similarity import normalize_rows
+
+# Storage types accepted for neighbor scores and embeddings
+SCORE_DTYPES = ('float32', 'float16', 'uint8')
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+# Default embedding size
+EMBEDDING_DIMS = 128
+
+
+# Function to store neighbor scores as `dtype` (padding -inf becomes 0 in uint8; its id is -1)
+def quantize_scores(scores, dtype='float32'):
+    if dtype not in SCORE_DTYPES:
+        raise ValueError(f"Unknown score dtype {dtype!r}, expected one of {SCORE_DTYPES}")
+    scores = np.asarray(scores, dtype=np.float32)
+    if dtype == 'uint8':
+        return np.round(np.clip(np.nan_to_num(scores, neginf=0.0), 0.0, 1.0) * 255).astype(np.uint8)
+    return scores.astype(dtype)
+
+
+# Function to turn stored neighbor scores back into float32 cosines
+def dequantize_scores(scores):
+    scores = np.asarray(scores)
+    if scores.dtype == np.uint8:
+        return scores.astype(np.float32) / 255
+    return scores.astype(np.float32, copy=False)
+
+
+# Function to project (normalized) tag vectors onto the SVD components
+def project(vectors, components):
+    return np.asarray(normalize_rows(vectors) @ components.T, dtype=np.float32)
+
+
+# Function to fit a truncated SVD of the tag matrix: (embeddings, components)
+def fit_embeddings(vectors, dims=EMBEDDING_DIMS, seed=0):
+    from sklearn.decomposition import TruncatedSVD
+
+    vectors = normalize_rows(vectors)
+    dims = max(1, min(dims, vectors.shape[0] - 1, vectors.shape[1] - 1))
+    svd = TruncatedSVD(n_components=dims, random_state=seed).fit(vectors)
+    components = svd.components_.astype(np.float32)
+    return project(vectors, components), components
+
+
+# Function to store embeddings as `dtype`: (codes, per-row scales or None)
+def quantize_embeddings(embeddings, dtype='int8'):
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unknown embedding dtype {dtype!r}, expected one of {EMBEDDING_DTYPES}")
+    if dtype != 'int8':
+        return embeddings.astype(dtype), None
+
+    # Symmetric per-row scale: the largest component maps to +-127
+    peak = np.abs(embeddings).max(axis=1)
+    scales = np.where(peak > 0, peak / 127, 1).astype(np.float32)
+    codes = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+# Function to build the embedding columns of an artifact version
+def embedding_arrays(vectors, dims=EMBEDDING_DIMS, dtype='int8'):
+    embeddings, components = fit_embeddings(vectors, dims)
+    return embedding_columns(embeddings, components, dtype)
+
+
+# Function to lay out quantized embeddings and their components as artifact columns
+def embedding_columns(embeddings, components, dtype='int8'):
+    codes, scales = quantize_embeddings(embeddings, dtype)
+    arrays = {'embed_codes': codes, 'embed_components': components}
+    if scales is not None:
+        arrays['embed_scales'] = scales
+    return arrays
+
+
+# Function to get float32 embeddings back from stored codes (and scales)
+def dequantize_embeddings(codes, scales=None):
+    embeddings = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        embeddings = embeddings * np.asarray(scales)[..., None]
+    return embeddings
@@ -0,0 +1,82 @@
+# In-process LRU cache of recommendation results, shared by every session
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Default number of cached queries (each entry is two small arrays)
+MAX_ENTRIES = 10_000
+
+
+class QueryCache:
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # Function to drop every entry if the artifacts were rebuilt since they were cached
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    # Function to get the cached (rows, scores) for a key, or None
+    def get(self, key, version=None):
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # Function to store (rows, scores) as compact read-only arrays, evicting the least recently used
+    def set(self, key, rows, scores, version=None):
+        rows = np.array(rows, dtype=np.int32)
+        scores = np.array(scores, dtype=np.float32)
+        rows.flags.writeable = False
+        scores.flags.writeable = False
+
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (rows, scores)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return rows, scores
+
+    # Function to get a cached result, computing and storing it on a miss
+    def get_or_compute(self, key, compute, version=None):
+        value = self.get(key, version)
+        if value is None:
+            # Computed outside the lock; concurrent misses on one key just compute it twice
+            value = self.set(key, *compute(), version=version)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
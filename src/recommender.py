@@ -0,0 +1,109 @@
+# Recommendation engine shared by app.py and the utils/ scripts
+import numpy as np
+
+# Number of neighbors stored per movie
+DEFAULT_K = 20
+
+
+# Function to vectorize the stemmed tags (same settings as Movie_rec.ipynb)
+#   with a vocabulary the columns are fixed instead of fitted (incremental updates)
+def vectorize_tags(tags, max_features=5000, vocabulary=None):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    if vocabulary is not None:
+        return CountVectorizer(vocabulary=list(vocabulary), stop_words='english').transform(tags)
+    return fit_vectorizer(tags, max_features)[0]
+
+
+# Function to fit the tag vocabulary; returns (vectors, vocabulary in column order)
+def fit_vectorizer(tags, max_features=5000):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    cv = CountVectorizer(max_features=max_features, stop_words='english')
+    vectors = cv.fit_transform(tags)
+    return vectors, cv.get_feature_names_out().tolist()
+
+
+# Function to select the k best entries of one score row, best first
+def top_n(scores, k, exclude=None):
+    scores = np.asarray(scores)
+
+    # Skip the query movie by position, not by assuming it sorts first
+    if exclude is not None:
+        scores = scores.astype(np.float32, copy=True)
+        scores[exclude] = -np.inf
+        k = min(k, scores.shape[0] - np.size(exclude))
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    # O(N) partition, then sort only the k survivors (ties by position)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.lexsort((part, -scores[part]))]
+
+
+# Function to keep the k best columns of every row in a block of scores
+def top_k_rows(scores, k, offset=0):
+    scores = np.array(scores, dtype=np.float32)
+    n_rows, n_cols = scores.shape
+
+    # A movie is never its own neighbor, even when another row ties with it
+    rows = np.arange(n_rows)
+    self_cols = rows + offset
+    in_block = self_cols < n_cols
+    scores[rows[in_block], self_cols[in_block]] = -np.inf
+
+    k = min(k, n_cols - 1)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+
+    # Sort the partition by score, breaking ties by row position
+    order = np.lexsort((part, -part_scores), axis=1)
+    ids = np.take_along_axis(part, order, axis=1).astype(np.int32)
+    top_scores = np.take_along_axis(part_scores, order, axis=1).astype(np.float32)
+    return ids, top_scores
+
+
+# Function to convert a legacy dense similarity matrix (similarity.pkl)
+def neighbor_index_from_similarity(similarity, k=DEFAULT_K, block_size=1024):
+    n_movies = similarity.shape[0]
+    k = min(k, n_movies - 1)
+
+    ids = np.empty((n_movies, k), dtype=np.int32)
+    scores = np.empty((n_movies, k), dtype=np.float32)
+
+    for start in range(0, n_movies, block_size):
+        stop = min(start + block_size, n_movies)
+        ids[start:stop], scores[start:stop] = top_k_rows(similarity[start:stop], k, offset=start)
+
+    return ids, scores
+
+
+# Function to build title / movie_id -> row position lookups in one pass
+def build_lookup(titles, movie_ids):
+    title_rows = {}
+    id_rows = {}
+    for pos, (title, movie_id) in enumerate(zip(titles, movie_ids)):
+        title_rows.setdefault(title, []).append(pos)
+        id_rows.setdefault(int(movie_id), []).append(pos)
+    return title_rows, id_rows
+
+
+# Function to map TMDB movie_ids to row positions (first row for each id)
+def rows_for_movie_ids(id_rows, movie_ids):
+    try:
+        return np.array([id_rows[int(m)][0] for m in movie_ids], dtype=np.int64)
+    except KeyError as e:
+        raise KeyError(f"Unknown movie_id: {e.args[0]}") from None
+
+
+# Function to label every row for the movie picker
+def option_labels(titles, title_rows):
+    labels = list(titles)
+
+    # Duplicate titles get an ordinal so each option maps to exactly one row
+    for title, rows in title_rows.items():
+        if len(rows) > 1:
+            for n, pos in enumerate(rows, start=1):
+                labels[pos] = f"{title} ({n})"
+    return labels
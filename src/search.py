@@ -0,0 +1,183 @@
+# Typeahead title search: word-prefix and trigram postings over normalized titles
+#
+# Built once with the artifacts and memory-mapped at serving time, so a query
+# is a couple of binary searches plus a small slice instead of a scan over
+# every title.
+import re
+import unicodedata
+from array import array
+
+import numpy as np
+
+# Search keys are stored as fixed-width bytes; longer prefixes are matched on their first KEY_BYTES
+KEY_BYTES = 32
+
+# Prefix ranges larger than this get their best matches precomputed
+HEAVY_RANGE = 1024
+
+# Matches kept per precomputed prefix (the most a query can ask for)
+MAX_RESULTS = 50
+
+# Fuzzy matching reads at most this many (best-ranked) rows of each trigram posting list
+FUZZY_SCAN = 2000
+
+NON_WORD = re.compile(r"[^\w]+")
+
+
+# Function to normalize a title or query: strip accents, casefold, collapse punctuation
+def normalize_title(text):
+    text = unicodedata.normalize('NFKD', str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(NON_WORD.sub(" ", text.casefold()).split())
+
+
+# Function to get the search key for every word start of a normalized title
+def title_keys(normalized):
+    words = normalized.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+# Function to get the set of padded trigrams of a normalized string
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Function to encode strings as fixed-width, truncated utf-8 keys
+def encode_keys(values, width=KEY_BYTES):
+    encoded = [v.encode('utf-8')[:width] for v in values]
+    return np.array(encoded, dtype=f"S{width}") if encoded else np.empty(0, dtype=f"S{width}")
+
+
+# Function to get the best-ranked distinct rows of a candidate array
+def best_rows(rows, rank, k):
+    rows = np.unique(rows)
+    if len(rows) > k:
+        rows = rows[np.argpartition(rank[rows], k - 1)[:k]]
+    return rows[np.argsort(rank[rows], kind='stable')]
+
+
+# Function to build every search array for a list of titles and their global rank
+def build_search_index(titles, rank):
+    rank = np.asarray(rank)
+    keys = []
+    key_rows = array('i')
+    tri_rows = {}
+
+    for row, title in enumerate(titles):
+        normalized = normalize_title(title)
+        for key in title_keys(normalized):
+            keys.append(key)
+            key_rows.append(row)
+        for gram in trigrams(normalized):
+            postings = tri_rows.get(gram)
+            if postings is None:
+                postings = tri_rows[gram] = array('i')
+            postings.append(row)
+
+    # Word-start keys, sorted bytewise so a prefix is one contiguous range
+    keys = encode_keys(keys)
+    key_rows = np.frombuffer(key_rows, dtype=np.int32)
+    order = np.argsort(keys, kind='stable')
+    keys, key_rows = keys[order], key_rows[order]
+
+    # Precompute the best rows of every prefix whose range is too big to rank per query
+    # (width 0 is the empty prefix, i.e. a blank query, which is always precomputed)
+    heavy_keys, heavy_rows = [], []
+    for width in range(0, KEY_BYTES + 1):
+        prefixes = keys.astype(f"S{width}") if width else np.zeros(len(keys), dtype='S1')
+        starts = np.flatnonzero(np.r_[True, prefixes[1:] != prefixes[:-1]])
+        stops = np.r_[starts[1:], len(keys)]
+        heavy = np.flatnonzero(stops - starts > (HEAVY_RANGE if width else 0))
+        if len(heavy) == 0:
+            break
+        for i in heavy:
+            prefix = prefixes[starts[i]]
+            if len(prefix) < width:
+                continue  # whole key shorter than this width: already covered
+            top = best_rows(key_rows[starts[i]:stops[i]], rank, MAX_RESULTS)
+            heavy_keys.append(prefix)
+            heavy_rows.append(np.pad(top, (0, MAX_RESULTS - len(top)), constant_values=-1))
+
+    heavy_keys = np.array(heavy_keys, dtype=f"S{KEY_BYTES}")
+    order = np.argsort(heavy_keys, kind='stable')
+    heavy_keys = heavy_keys[order]
+    heavy_rows = np.array(heavy_rows, dtype=np.int32).reshape(-1, MAX_RESULTS)[order]
+
+    # Trigram posting lists, each sorted best rank first
+    grams = sorted(tri_rows, key=lambda g: g.encode('utf-8'))
+    sizes = [len(tri_rows[g]) for g in grams]
+    tri_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=tri_offsets[1:])
+    postings = []
+    for gram in grams:
+        rows = np.frombuffer(tri_rows[gram], dtype=np.int32)
+        postings.append(rows[np.argsort(rank[rows], kind='stable')])
+    tri_rows_flat = np.concatenate(postings) if postings else np.empty(0, dtype=np.int32)
+
+    return {
+        'search_keys': keys,
+        'search_rows': key_rows,
+        'search_heavy_keys': heavy_keys,
+        'search_heavy_rows': heavy_rows,
+        'trigram_keys': encode_keys(grams, width=12),
+        'trigram_offsets': tri_offsets,
+        'trigram_rows': tri_rows_flat.astype(np.int32),
+    }
+
+
+# Title search over the arrays from build_search_index (plain or memory-mapped)
+class TitleSearch:
+
+    def __init__(self, arrays, rank):
+        self.keys = arrays['search_keys']
+        self.rows = arrays['search_rows']
+        self.heavy_keys = arrays['search_heavy_keys']
+        self.heavy_rows = arrays['search_heavy_rows']
+        self.trigram_keys = arrays['trigram_keys']
+        self.trigram_offsets = arrays['trigram_offsets']
+        self.trigram_rows = arrays['trigram_rows']
+        self.rank = rank
+
+    # Function to get up to k rows whose title has a word starting with the query, best ranked first
+    def prefix(self, query, k=10):
+        key = normalize_title(query).encode('utf-8')[:KEY_BYTES]
+        lo = np.searchsorted(self.keys, key, side='left')
+        hi = np.searchsorted(self.keys, key + b'\xff' if len(key) < KEY_BYTES else key, side='right')
+        if hi - lo > HEAVY_RANGE and k <= MAX_RESULTS:
+            pos = np.searchsorted(self.heavy_keys, key)
+            if pos < len(self.heavy_keys) and self.heavy_keys[pos] == key:
+                top = self.heavy_rows[pos]
+                return top[top >= 0][:k]
+        return best_rows(self.rows[lo:hi], self.rank, k).astype(np.int32)
+
+    # Function to get up to k rows sharing at least half the query's trigrams (typo tolerant)
+    def fuzzy(self, query, k=10):
+        grams = np.array(sorted(g.encode('utf-8') for g in trigrams(normalize_title(query))), dtype='S12')
+        pos = np.searchsorted(self.trigram_keys, grams)
+        found = pos < len(self.trigram_keys)
+        found[found] = self.trigram_keys[pos[found]] == grams[found]
+        pos = pos[found]
+        if len(pos) == 0:
+            return np.empty(0, dtype=np.int32)
+
+        # Common trigrams only contribute their best-ranked rows, which bounds the work per query
+        starts = self.trigram_offsets[pos]
+        stops = np.minimum(self.trigram_offsets[pos + 1], starts + FUZZY_SCAN)
+        candidates = np.concatenate([self.trigram_rows[a:b] for a, b in zip(starts, stops)])
+
+        # Most shared trigrams first, then global rank
+        rows, shared = np.unique(candidates, return_counts=True)
+        close = shared >= max(1, len(grams) // 2)
+        rows, shared = rows[close], shared[close]
+        order = np.lexsort((self.rank[rows], -shared))[:k]
+        return rows[order].astype(np.int32)
+
+    # Function to get up to k rows for a typeahead query: prefix matches, topped up with fuzzy ones
+    def search(self, query, k=10):
+        rows = self.prefix(query, k)
+        if len(rows) < k and len(normalize_title(query)) >= 3:
+            extra = self.fuzzy(query, k + len(rows))
+            extra = extra[~np.isin(extra, rows)]
+            rows = np.concatenate([rows, extra[:k - len(rows)]])
+        return rows.astype(np.int32)
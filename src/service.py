@@ -0,0 +1,429 @@
+# Headless JSON recommendation service, and the client app.py uses to call it
+#
+# Loads the artifacts once and serves every request from a thread pool; a newly
+# published catalog version is picked up within RELOAD_INTERVAL seconds:
+#   python -m src.service --port 8000
+#   RECOMMENDER_SERVICE_URL=http://127.0.0.1:8000 streamlit run app.py
+#
+# Endpoints (movies are addressed by movie_id, or by catalog row with row=):
+#   GET  /health
+#   GET  /recommend?movie_id=19995&k=5&diversity=0.3&posters=1
+#   POST /recommend   {"movie_ids": [...] | "rows": [...], "k": 5, "diversity": 0, "posters": false}
+#   POST /profile     {"movie_ids": [...] | "rows": [...], "k": 5, "diversity": 0, "posters": false}
+#   GET  /genre?genre=Action&genre=Comedy&page=0&page_size=10&posters=1
+#   GET  /search?q=dark+knight&k=10
+#   POST /posters     {"movie_ids": [...] | "rows": [...]}
+#   GET  /metrics     Prometheus text format (METRICS_ENABLED=1 to record)
+import argparse
+import json
+import os
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from src import api_handler, metrics
+from src.artifacts import ARTIFACTS_PATH, ArtifactError, current_version, open_artifacts, version_dir
+from src.engine import Recommender
+from src.poster_cache import POSTER_CACHE_PATH, PosterCache
+from src.query_cache import MAX_ENTRIES, QueryCache
+
+# Most seeds / rows accepted by one request (POST /recommend, /profile, /posters)
+MAX_BATCH = 1000
+
+# Largest genre page and search result list served
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 100
+
+# Seconds between checks for a newly published catalog version
+RELOAD_INTERVAL = 5.0
+
+
+class ServiceError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RecommenderHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') == '/metrics':
+            return self._send_text(200, metrics.REGISTRY.render())
+        params = parse_qs(url.query)
+        routes = {
+            '/health': self.server.app.health,
+            '/recommend': self.server.app.recommend_one,
+            '/genre': self.server.app.genre,
+            '/search': self.server.app.search,
+        }
+        self._dispatch(routes.get(url.path.rstrip('/')), params)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        routes = {
+            '/recommend': self.server.app.recommend_batch,
+            '/profile': self.server.app.profile,
+            '/posters': self.server.app.posters,
+        }
+        handler = routes.get(url.path.rstrip('/'))
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send(400, {'error': 'Request body must be JSON'})
+        self._dispatch(handler, body)
+
+    def _dispatch(self, handler, params):
+        if handler is None:
+            return self._send(404, {'error': f'Unknown endpoint {self.command} {self.path}'})
+        # A client pinned to another build means a new version may be out: check at once
+        expected = self.headers.get('X-Build-Id')
+        self.server.app.refresh(force=expected is not None and expected != self.server.app.build.build_id)
+        endpoint = f"{self.command} {urlparse(self.path).path.rstrip('/')}"
+        with metrics.timer('service_request_seconds', endpoint=endpoint):
+            try:
+                status, payload = 200, handler(params)
+            except ServiceError as e:
+                status, payload = e.status, {'error': str(e)}
+            except (KeyError, ValueError, TypeError, IndexError) as e:
+                status, payload = 400, {'error': f'Bad request: {e}'}
+            except Exception as e:
+                status, payload = 500, {'error': f'Internal error: {type(e).__name__}'}
+            self._send(status, payload)
+        metrics.inc('service_requests_total', endpoint=endpoint, status=status)
+
+    def _send(self, status, payload):
+        self._send_text(status, json.dumps(payload), 'application/json')
+
+    def _send_text(self, status, text, content_type='text/plain; version=0.0.4; charset=utf-8'):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to read one query-string (list) or JSON (scalar) parameter
+def _param(params, name, default=None, cast=str):
+    value = params.get(name, default)
+    if isinstance(value, list):
+        value = value[0] if value else default
+    return default if value is None else cast(value)
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+# Function to read an integer from a query string or JSON value (no floats, booleans or other strings)
+#   text=False: JSON list items, where a string is an error too
+def _as_int(value, name, text=True):
+    if text and isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, np.integer)):
+        raise ServiceError(400, f'{name} must be an integer, got {value!r}')
+    return int(value)
+
+
+# Function to read an integer parameter bounded to [low, high] (high=None: no upper bound)
+def _int_param(params, name, default, low, high=None):
+    value = _as_int(_param(params, name, default), name)
+    if value < low or (high is not None and value > high):
+        bounds = f'between {low} and {high}' if high is not None else f'at least {low}'
+        raise ServiceError(400, f'{name} must be {bounds}')
+    return value
+
+
+# Function to read diversity: 0 (relevance only) to 1
+def _diversity_param(params):
+    diversity = _param(params, 'diversity', 0.0, float)
+    if not 0.0 <= diversity <= 1.0:
+        raise ServiceError(400, 'diversity must be between 0 and 1')
+    return diversity
+
+
+# One served catalog version: the engine and the columns requests are resolved against
+#   never changed once built; a refresh swaps in a new one, so a request that reads it once
+#   validates, scores and labels its answer with the same build
+class ServedBuild:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.build_id = engine.build_id
+        self.titles = engine.artifacts['title']
+        self.movie_ids = engine.artifacts['movie_id']
+        self.n_movies = engine.artifacts['manifest']['n_movies']
+        self.max_k = engine.artifacts['manifest']['k']
+        self._id_rows = None
+        self._lock = threading.Lock()
+
+    # Function to map a movie_id to its first catalog row (built on first use)
+    def row_for_movie_id(self, movie_id):
+        if self._id_rows is None:
+            with self._lock:
+                if self._id_rows is None:
+                    ids = np.asarray(self.movie_ids)
+                    order = np.argsort(ids, kind='stable')
+                    self._id_rows = (ids[order], order)
+        ids, order = self._id_rows
+        pos = np.searchsorted(ids, movie_id)
+        if pos == len(ids) or ids[pos] != movie_id:
+            raise ServiceError(404, f'Unknown movie_id {movie_id}')
+        return int(order[pos])
+
+    # Function to resolve the seed rows of a request (movie_id(s) or row(s))
+    def seed_rows(self, params, single=False):
+        if single:
+            if 'row' in params:
+                rows = [_as_int(_param(params, 'row'), 'row')]
+            else:
+                rows = [self.row_for_movie_id(_as_int(_param(params, 'movie_id'), 'movie_id'))]
+        else:
+            name = 'rows' if 'rows' in params else 'movie_ids'
+            values = params[name]
+            if not isinstance(values, list):
+                raise ServiceError(400, f'{name} must be a list')
+            if len(values) > MAX_BATCH:
+                raise ServiceError(413, f'At most {MAX_BATCH} {name} per request')
+            rows = [_as_int(v, name, text=False) for v in values]
+            if name == 'movie_ids':
+                rows = [self.row_for_movie_id(m) for m in rows]
+        for row in rows:
+            if not 0 <= row < self.n_movies:
+                raise ServiceError(404, f'Unknown row {row}')
+        return rows
+
+    # Function to read k: 1 <= k <= the neighbors stored per movie
+    def k_param(self, params):
+        return _int_param(params, 'k', 5, 1, self.max_k)
+
+    # Function to describe result rows as JSON objects
+    #   poster_urls: posters already fetched for these rows (one grid for a whole batch)
+    def describe(self, rows, scores=None, posters=False, poster_urls=None):
+        rows = [int(r) for r in rows]
+        if poster_urls is None:
+            poster_urls = self.engine.posters(rows) if posters and rows else [None] * len(rows)
+        results = []
+        for i, row in enumerate(rows):
+            item = {'row': row, 'movie_id': int(self.movie_ids[row]), 'title': self.titles[row]}
+            if scores is not None:
+                item['score'] = round(float(scores[i]), 4)
+            if posters:
+                item['poster'] = poster_urls[i]
+            results.append(item)
+        return results
+
+
+# JSON views over one Recommender (swapped for a new one when artifacts_path publishes a new version)
+#   every endpoint reads self.build once and uses only that snapshot
+class RecommenderService:
+
+    def __init__(self, engine, artifacts_path=None, reload_interval=RELOAD_INTERVAL):
+        self.artifacts_path = artifacts_path
+        self.reload_interval = reload_interval
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.build = ServedBuild(engine)
+        metrics.REGISTRY.add_collector(lambda: self.build.engine.metric_gauges())
+
+    # Function to switch to the published version if it changed (checked at most every reload_interval unless forced)
+    def refresh(self, force=False):
+        if self.artifacts_path is None or (not force and time.monotonic() - self._checked_at < self.reload_interval):
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = time.monotonic()
+            old = self.build.engine
+            try:
+                if current_version(self.artifacts_path) == old.build_id:
+                    return
+                engine = Recommender(open_artifacts(version_dir(self.artifacts_path)), old.backend_name, old.cache,
+                                     fetch_posters=old.fetch_posters, rerank_candidates=old.rerank_candidates)
+            except (ArtifactError, OSError) as e:
+                # Keep serving the current build; the next check tries again
+                print(f"Could not load the published artifacts: {e}")
+                return
+            # A single assignment: requests see the old snapshot or the new one, never a mix
+            self.build = ServedBuild(engine)
+
+    def health(self, params):
+        build = self.build
+        return {'build_id': build.build_id, 'n_movies': build.n_movies,
+                'backend': build.engine.backend_name, 'query_cache': build.engine.stats()}
+
+    def recommend_one(self, params):
+        build = self.build
+        row = build.seed_rows(params, single=True)[0]
+        rows, scores = build.engine.recommend(row, build.k_param(params), _diversity_param(params))
+        return {'build_id': build.build_id,
+                'results': build.describe(rows, scores, _param(params, 'posters', False, _flag))}
+
+    def recommend_batch(self, params):
+        build = self.build
+        seeds = build.seed_rows(params)
+        k = build.k_param(params)
+        posters = _param(params, 'posters', False, _flag)
+        results = build.engine.recommend_many(seeds, k, _diversity_param(params))
+
+        # One concurrent poster grid (and deadline) for every seed, split back per seed
+        poster_urls = [None] * len(results)
+        if posters:
+            grid = build.engine.posters([int(r) for rows, _ in results for r in rows])
+            ends = np.cumsum([len(rows) for rows, _ in results])
+            poster_urls = [grid[end - len(rows):end] for (rows, _), end in zip(results, ends)]
+        return {'build_id': build.build_id,
+                'results': [build.describe(rows, scores, posters, urls)
+                            for (rows, scores), urls in zip(results, poster_urls)]}
+
+    def profile(self, params):
+        build = self.build
+        seeds = build.seed_rows(params)
+        if not seeds:
+            raise ServiceError(400, 'Select at least one movie')
+        rows, scores = build.engine.recommend_profile(seeds, build.k_param(params), _diversity_param(params))
+        return {'build_id': build.build_id,
+                'results': build.describe(rows, scores, _param(params, 'posters', False, _flag))}
+
+    def genre(self, params):
+        build = self.build
+        genres = params.get('genre') or []
+        if isinstance(genres, str):
+            genres = [genres]
+        if not genres:
+            raise ServiceError(400, 'At least one genre= is required')
+        page = _int_param(params, 'page', 0, 0)
+        page_size = _int_param(params, 'page_size', 10, 1, MAX_PAGE_SIZE)
+        rows, total = build.engine.genre_page(genres, page, page_size)
+        return {'build_id': build.build_id, 'total': int(total),
+                'results': build.describe(rows, posters=_param(params, 'posters', False, _flag))}
+
+    def search(self, params):
+        build = self.build
+        rows = build.engine.search(_param(params, 'q', ''), _int_param(params, 'k', 10, 1, MAX_SEARCH_RESULTS))
+        return {'build_id': build.build_id, 'results': build.describe(rows)}
+
+    def posters(self, params):
+        build = self.build
+        rows = build.seed_rows(params)
+        return {'build_id': build.build_id, 'posters': build.engine.posters(rows)}
+
+
+# Function to build a Recommender with its own poster session and disk cache
+def make_engine(artifacts_path=ARTIFACTS_PATH, backend='precomputed', cache_size=MAX_ENTRIES,
+                api_key=None, tmdb_url=api_handler.TMDB_API_URL, poster_cache_path=POSTER_CACHE_PATH):
+    artifacts = open_artifacts(artifacts_path)
+    session = api_handler.create_session()
+    poster_cache = PosterCache(poster_cache_path)
+    fetch = partial(api_handler.fetch_poster, api_key=api_key, session=session, base_url=tmdb_url, raise_errors=True)
+    return Recommender(artifacts, backend, QueryCache(cache_size),
+                       fetch_posters=partial(api_handler.fetch_posters_cached, cache=poster_cache, fetch=fetch))
+
+
+# Function to start the service in a background thread; returns (server, base URL)
+def start_server(engine, host='127.0.0.1', port=0, artifacts_path=None):
+    server = ThreadingHTTPServer((host, port), RecommenderHandler)
+    server.daemon_threads = True
+    server.app = RecommenderService(engine, artifacts_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# Client with the same interface as Recommender, for app.py in service mode
+class ServiceClient:
+
+    def __init__(self, base_url, build_id=None, timeout=10, session=None):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.build_id = build_id
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _call(self, method, path, **kwargs):
+        headers = {'X-Build-Id': self.build_id} if self.build_id is not None else None
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, headers=headers,
+                                        **kwargs)
+        # Error bodies from a proxy or load balancer may not be JSON
+        is_json = response.headers.get('Content-Type', '').startswith('application/json')
+        if not response.ok:
+            error = response.json().get('error') if is_json else None
+            raise ServiceError(response.status_code, error or response.reason)
+        if not is_json:
+            raise ServiceError(502, f"Expected JSON from {path}, got {response.headers.get('Content-Type')!r}")
+        payload = response.json()
+
+        # Rows only mean the same movies if both sides serve the same build
+        if self.build_id is not None and payload.get('build_id') != self.build_id:
+            raise ServiceError(409, f"Service serves build {payload.get('build_id')}, expected {self.build_id}")
+        return payload
+
+    def _rows(self, payload):
+        rows = np.array([r['row'] for r in payload['results']], dtype=np.int32)
+        scores = np.array([r.get('score', 0.0) for r in payload['results']], dtype=np.float32)
+        return rows, scores
+
+    def recommend(self, row, k=5, diversity=0.0):
+        return self._rows(self._call('GET', '/recommend', params={'row': int(row), 'k': k, 'diversity': diversity}))
+
+    def recommend_many(self, rows, k=5, diversity=0.0):
+        payload = self._call('POST', '/recommend', json={'rows': [int(r) for r in rows], 'k': k, 'diversity': diversity})
+        return [self._rows({'results': results}) for results in payload['results']]
+
+    def recommend_profile(self, rows, k=5, diversity=0.0):
+        return self._rows(self._call('POST', '/profile', json={'rows': [int(r) for r in rows], 'k': k,
+                                                              'diversity': diversity}))
+
+    def genre_page(self, genres, page=0, page_size=10):
+        genres = [genres] if isinstance(genres, str) else list(genres)
+        payload = self._call('GET', '/genre', params={'genre': genres, 'page': page, 'page_size': page_size})
+        return self._rows(payload)[0], payload['total']
+
+    def search(self, query, k=10):
+        return self._rows(self._call('GET', '/search', params={'q': query, 'k': k}))[0]
+
+    def posters(self, rows):
+        return self._call('POST', '/posters', json={'rows': [int(r) for r in rows]})['posters']
+
+    def stats(self):
+        return self._call('GET', '/health')['query_cache']
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP as JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--artifacts', default=os.getenv('ARTIFACTS_PATH', ARTIFACTS_PATH))
+    parser.add_argument('--backend', default=os.getenv('RECOMMENDER_BACKEND', 'precomputed'))
+    parser.add_argument('--cache-size', type=int, default=int(os.getenv('QUERY_CACHE_SIZE', MAX_ENTRIES)))
+    args = parser.parse_args()
+
+    engine = make_engine(args.artifacts, args.backend, args.cache_size, api_key=os.getenv('API_KEY'),
+                         tmdb_url=os.getenv('TMDB_API_URL', api_handler.TMDB_API_URL),
+                         poster_cache_path=os.getenv('POSTER_CACHE_PATH', POSTER_CACHE_PATH))
+    server = ThreadingHTTPServer((args.host, args.port), RecommenderHandler)
+    server.daemon_threads = True
+    server.app = RecommenderService(engine, args.artifacts)
+    print(f"Serving build {engine.build_id[:8]} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Chunked cosine top-K over the sparse tag matrix (never materializes N x N)
+#
+# Rows are scored in (row block x column block) tiles. Each tile's top-K is
+# merged into a running per-row top-K, and row blocks are spread across a
+# process pool, so memory is bounded by the tile size, not by N.
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.recommender import DEFAULT_K
+
+# Default tile shape: 512 x 32768 float32 scores is 64 MB per worker
+ROW_BLOCK = 512
+COL_BLOCK = 32768
+
+# Row blocks up to this size are densified for a sparse x dense (BLAS-like) product
+DENSE_BLOCK_BYTES = 64 * 1024 * 1024
+
+# Matrix shared with pool workers (inherited on fork, sent once on spawn)
+_vectors = None
+_vectors_t = None
+
+
+# Function to L2-normalize rows so cosine similarity is a dot product
+def normalize_rows(vectors):
+    from sklearn.preprocessing import normalize
+
+    return normalize(vectors.astype(np.float32), norm='l2', axis=1, copy=False).tocsr()
+
+
+# Function to merge candidate (ids, scores) into the best k per row
+def merge_top_k(ids, scores, k):
+    k = min(k, ids.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    ids = np.take_along_axis(ids, part, axis=1)
+    scores = np.take_along_axis(scores, part, axis=1)
+
+    # Best score first, ties broken by row position
+    order = np.lexsort((ids, -scores), axis=1)
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+# Function to compute the top-k neighbors of rows [start, stop)
+def top_k_block(vectors, vectors_t, start, stop, k, col_block=COL_BLOCK):
+    n_movies = vectors.shape[0]
+    rows = vectors[start:stop]
+    n_rows = stop - start
+
+    # sparse x dense is ~3x faster than sparse x sparse when the block fits
+    dense_rows = None
+    if n_rows * vectors.shape[1] * 4 <= DENSE_BLOCK_BYTES:
+        dense_rows = np.ascontiguousarray(rows.toarray().T)
+    best_ids = np.empty((n_rows, 0), dtype=np.int32)
+    best_scores = np.empty((n_rows, 0), dtype=np.float32)
+
+    for col_start in range(0, n_movies, col_block):
+        col_stop = min(col_start + col_block, n_movies)
+        if dense_rows is not None:
+            tile = np.ascontiguousarray((vectors[col_start:col_stop] @ dense_rows).T)
+        else:
+            tile = (rows @ vectors_t[:, col_start:col_stop]).toarray()
+        tile = tile.astype(np.float32, copy=False)
+
+        # A movie is never its own neighbor
+        self_rows = np.arange(max(start, col_start), min(stop, col_stop))
+        tile[self_rows - start, self_rows - col_start] = -np.inf
+
+        tile_ids = np.broadcast_to(np.arange(col_start, col_stop, dtype=np.int32), tile.shape)
+        tile_ids, tile_scores = merge_top_k(tile_ids, tile, k)
+
+        # Streaming merge: only the running k plus this tile's k are kept
+        best_ids, best_scores = merge_top_k(
+            np.hstack([best_ids, tile_ids]), np.hstack([best_scores, tile_scores]), k
+        )
+
+    return best_ids, best_scores
+
+
+def _init_worker(vectors, vectors_t):
+    global _vectors, _vectors_t
+    _vectors, _vectors_t = vectors, vectors_t
+
+
+def _run_block(args):
+    start, stop, k, col_block = args
+    ids, scores = top_k_block(_vectors, _vectors_t, start, stop, k, col_block)
+    return start, ids, scores
+
+
+# Function to build the top-k neighbor index from a sparse count/weight matrix
+def build_neighbor_index(vectors, k=DEFAULT_K, row_block=ROW_BLOCK, col_block=COL_BLOCK, workers=None):
+    vectors = normalize_rows(vectors)
+
+    # The transposed copy is only needed when row blocks are too wide to densify
+    vectors_t = None
+    if row_block * vectors.shape[1] * 4 > DENSE_BLOCK_BYTES:
+        vectors_t = vectors.T.tocsc()
+    n_movies = vectors.shape[0]
+    k = min(k, n_movies - 1)
+    workers = workers or os.cpu_count() or 1
+
+    ids = np.empty((n_movies, k), dtype=np.int32)
+    scores = np.empty((n_movies, k), dtype=np.float32)
+    blocks = [(start, min(start + row_block, n_movies), k, col_block) for start in range(0, n_movies, row_block)]
+
+    if workers == 1 or len(blocks) == 1:
+        _init_worker(vectors, vectors_t)
+        results = map(_run_block, blocks)
+        for start, block_ids, block_scores in results:
+            ids[start:start + len(block_ids)] = block_ids
+            scores[start:start + len(block_ids)] = block_scores
+        _init_worker(None, None)
+        return ids, scores
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectors, vectors_t)) as pool:
+        for start, block_ids, block_scores in pool.map(_run_block, blocks):
+            ids[start:start + len(block_ids)] = block_ids
+            scores[start:start + len(block_ids)] = block_scores
+
+    return ids, scores
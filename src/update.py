@@ -0,0 +1,280 @@
+# Incremental catalog updates: add or change movies without a full rebuild
+#
+# New and changed rows are vectorized against the frozen build vocabulary and
+# term weighting (IDF, field lengths) and scored against the catalog (cost ~ new rows x catalog, not catalog^2). Their
+# own neighbor lists are computed exactly, and every other list is patched
+# where a new row now scores into its top K. Their vectors go to an append-only
+# segment next to the untouched base matrix. The result is published as a new
+# artifact version, which running processes pick up on their next request.
+#
+# Patching cannot see a better candidate that fell just outside a stored top K,
+# so a list that loses a changed movie may be short of its true K-th neighbor
+# until the next compaction. Compaction merges the segment into the base
+# matrix, recomputes every neighbor list exactly and rebuilds the IVF lists.
+#
+#   python -m src.update --movies-csv new_movies.csv --credits-csv new_credits.csv
+#   python -m src.update --compact
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.artifacts import (
+    ARTIFACTS_PATH, ArtifactError, apply_segment, open_artifacts, version_dir, write_artifacts
+)
+from src.build import STAT_COLUMNS, stage, write_serving_artifacts
+from src.genres import (
+    build_genre_rankings, flatten_tag_index, genre_lists, genres_from_lists, rank_movies
+)
+from src.ingest import ingest
+from src.quantize import dequantize_embeddings, dequantize_scores, embedding_columns, project
+from src.search import build_search_index
+from src.similarity import DENSE_BLOCK_BYTES, build_neighbor_index, merge_top_k, normalize_rows
+from src.weighting import transform_weighting, weighting_from
+
+# Compact automatically once the segment holds this fraction of the catalog
+COMPACT_RATIO = 0.1
+
+
+# Function to turn raw TMDB dumps of new / changed movies into the catalog's row format
+#   update batches are small, so they are ingested in-process
+def prepare_movies(movies_csv, credits_csv):
+    return ingest(movies_csv, credits_csv or None, workers=1)
+
+
+# Function to get the ranked single-genre lists of an artifact version as label -> rows
+def genre_memberships(artifacts):
+    keys = artifacts['genre_keys'].tolist()
+    offsets = artifacts['genre_offsets']
+    return {key: np.sort(artifacts['genre_rows'][offsets[i]:offsets[i + 1]])
+            for i, key in enumerate(keys) if '|' not in key}
+
+
+# Function to rebuild the catalog as a movies dataframe (the input format of write_serving_artifacts)
+def catalog_frame(artifacts):
+    n_movies = artifacts['manifest']['n_movies']
+    movies = pd.DataFrame({'movie_id': np.asarray(artifacts['movie_id']), 'title': artifacts['title'].tolist(),
+                           'tags': artifacts['tags'].tolist()})
+    for column in STAT_COLUMNS:
+        if column in artifacts:
+            movies[column] = np.asarray(artifacts[column])
+
+    genres = [[] for _ in range(n_movies)]
+    for label, rows in genre_memberships(artifacts).items():
+        for row in rows:
+            genres[row].append(label)
+    movies['genres'] = genres
+    return movies
+
+
+# Function to patch the neighbor lists for target rows whose vectors changed or were appended
+#   vectors: the updated catalog matrix (normalized); ids / scores: current lists, padded to the new size
+def patch_neighbors(vectors, ids, scores, targets, k):
+    n_movies = vectors.shape[0]
+    target_col = np.full(n_movies, -1, dtype=np.int64)
+    target_col[targets] = np.arange(len(targets))
+    is_target = target_col >= 0
+    others = np.flatnonzero(~is_target)
+
+    own_ids = np.full((len(targets), k), -1, dtype=np.int32)
+    own_scores = np.full((len(targets), k), -np.inf, dtype=np.float32)
+
+    # Score the targets against every row, a column block at a time
+    block = max(1, DENSE_BLOCK_BYTES // (4 * max(n_movies, 1)))
+    for start in range(0, len(targets), block):
+        cols = targets[start:start + block]
+        tile = np.asarray(vectors @ vectors[cols].T.toarray(), dtype=np.float32)
+        tile[cols, np.arange(len(cols))] = -np.inf
+
+        # The targets' own lists, exactly
+        col_ids = np.broadcast_to(np.arange(n_movies, dtype=np.int32), (len(cols), n_movies))
+        block_ids, block_scores = merge_top_k(col_ids, np.ascontiguousarray(tile.T), k)
+        own_ids[start:start + len(cols), :block_ids.shape[1]] = block_ids
+        own_scores[start:start + len(cols), :block_scores.shape[1]] = block_scores
+
+        # Stored entries that point at a changed target get its new score
+        entry_col = np.where(ids[others] >= 0, target_col[np.maximum(ids[others], 0)], -1) - start
+        stale = (entry_col >= 0) & (entry_col < len(cols))
+        r, j = np.nonzero(stale)
+        scores[others[r], j] = tile[others[r], entry_col[r, j]]
+
+        # New candidates: a target scoring above a row's current K-th, not already listed
+        candidates = tile[others]
+        candidates[r, entry_col[r, j]] = -np.inf
+        improves = (candidates > scores[others, -1][:, None]).any(axis=1) | stale.any(axis=1)
+        rows = others[improves]
+        if len(rows):
+            merged_ids = np.hstack([ids[rows], np.broadcast_to(cols.astype(np.int32), (len(rows), len(cols)))])
+            merged_scores = np.hstack([scores[rows], candidates[improves]])
+            ids[rows], scores[rows] = merge_top_k(merged_ids, merged_scores, k)
+
+    ids[targets], scores[targets] = own_ids, own_scores
+    return ids, scores
+
+
+# Function to add or replace movies (matched on movie_id) and publish the new version
+def update_catalog(path, movies, log=print):
+    timings = {}
+    # Resolve the published version once: columns are linked from the version that was read
+    source = version_dir(path)
+    artifacts = open_artifacts(source)
+    manifest = artifacts['manifest']
+    for column in ('vocabulary', 'tags', 'vectors'):
+        if column not in artifacts:
+            raise ArtifactError(f"Artifacts at {path} have no {column} column: rebuild them before updating")
+
+    n_old, k = manifest['n_movies'], manifest['k']
+    movies = movies.drop_duplicates('movie_id', keep='last').reset_index(drop=True)
+
+    weighting = weighting_from(artifacts)
+    with stage('vectorize', timings, log):
+        new_vectors = normalize_rows(transform_weighting(movies['tags'], artifacts['vocabulary'].tolist(), weighting,
+                                                         movies.get('field_tags')))
+
+    # Changed movies keep every row they already have; new ones are appended
+    old_ids = np.asarray(artifacts['movie_id'])
+    order = np.argsort(old_ids, kind='stable')
+    sorted_ids = old_ids[order]
+    targets, sources = [], []
+    n_new = n_old
+    for i, movie_id in enumerate(movies['movie_id'].values):
+        lo, hi = np.searchsorted(sorted_ids, [movie_id, movie_id + 1])
+        rows = order[lo:hi].tolist() or [n_new]
+        n_new += hi == lo
+        targets.extend(rows)
+        sources.extend([i] * len(rows))
+    targets = np.array(targets, dtype=np.int64)
+    sources = np.array(sources, dtype=np.int64)
+    changed = targets[targets < n_old]
+    log(f"{len(changed)} changed rows, {n_new - n_old} new rows")
+
+    with stage('neighbors', timings, log):
+        vectors = apply_segment(artifacts['vectors'].tocsr(), new_vectors[sources], targets, n_new)
+        ids = np.full((n_new, k), -1, dtype=np.int32)
+        scores = np.full((n_new, k), -np.inf, dtype=np.float32)
+        ids[:n_old] = artifacts['neighbor_ids']
+        scores[:n_old] = dequantize_scores(artifacts['neighbor_scores'])
+        ids, scores = patch_neighbors(vectors, ids, scores, targets, k)
+
+    with stage('indexes', timings, log):
+        def column(values, new_values):
+            values = list(values) + [None] * (n_new - n_old)
+            for target, source in zip(targets, sources):
+                values[target] = new_values[source]
+            return values
+
+        titles = column(artifacts['title'], movies['title'].values)
+        tags = column(artifacts['tags'], movies['tags'].values)
+        movie_ids = np.array(column(old_ids, movies['movie_id'].values), dtype=np.int64)
+
+        stats = {}
+        for name in STAT_COLUMNS:
+            if name in artifacts:
+                values = movies[name].values if name in movies else np.zeros(len(movies))
+                stats[name] = np.array(column(artifacts[name], values), dtype=artifacts[name].dtype)
+        if stats:
+            stats['rank'] = rank_movies(n_new, **stats)
+        else:
+            # No popularity / votes: keep the stored order, new movies last
+            stats['rank'] = np.concatenate([artifacts['rank'], np.arange(n_old, n_new)]).astype(np.int32)
+
+        genres = genre_memberships(artifacts)
+        added = genres_from_lists(genre_lists(movies))
+        for label, source_rows in added.items():
+            new_rows = targets[np.isin(sources, source_rows)]
+            kept = genres.get(label, np.empty(0, dtype=np.int32))
+            genres[label] = np.union1d(kept[~np.isin(kept, changed)], new_rows).astype(np.int32)
+        for label in genres:
+            if label not in added:
+                genres[label] = genres[label][~np.isin(genres[label], changed)]
+
+        search_index = build_search_index(titles, stats['rank'])
+
+        # Updated rows are projected onto the stored SVD components, kept in the stored precision
+        embeddings = None
+        if 'embed_codes' in artifacts:
+            components = np.asarray(artifacts['embed_components'])
+            values = np.zeros((n_new, components.shape[0]), dtype=np.float32)
+            values[:n_old] = dequantize_embeddings(artifacts['embed_codes'], artifacts.get('embed_scales'))
+            values[targets] = project(new_vectors[sources], components)
+            embeddings = embedding_columns(values, components, artifacts['embed_codes'].dtype.name)
+
+    with stage('write', timings, log):
+        # The base matrix is linked unchanged; the segment grows by the updated rows
+        if 'segment_vectors' in artifacts:
+            segment = (sp.vstack([artifacts['segment_vectors'], new_vectors[sources]], format='csr'),
+                       np.concatenate([artifacts['segment_rows'], targets]))
+        else:
+            segment = (new_vectors[sources], targets)
+        result = write_artifacts(
+            path, movie_ids, titles, ids, scores, tags=tags, stats=stats,
+            genre_rankings=flatten_tag_index(build_genre_rankings(genres, stats['rank'])),
+            search_index=search_index, vocabulary=artifacts['vocabulary'].tolist(), segment=segment,
+            embeddings=embeddings, score_dtype=artifacts['neighbor_scores'].dtype.name, weighting=weighting,
+            reuse=(source, ['vectors']), extra={'parent': manifest['build_id']},
+        )
+
+    log(f"{'total':<12} {sum(timings.values()):8.2f}s  (build {result['build_id'][:8]}, "
+        f"{len(segment[1])} segment rows)")
+    return result
+
+
+# Function to merge the segment into the base matrix and recompute every neighbor list exactly
+def compact(path, workers=None, log=print):
+    timings = {}
+    artifacts = open_artifacts(path)
+    manifest = artifacts['manifest']
+    movies = catalog_frame(artifacts)
+
+    vectors = artifacts['vectors'].tocsr()
+    with stage('neighbors', timings, log):
+        ids, scores = build_neighbor_index(vectors, manifest['k'], workers=workers)
+
+    # Same storage precision as before; embeddings are refit on the merged matrix
+    codes = artifacts.get('embed_codes')
+    with stage('write', timings, log):
+        result = write_serving_artifacts(path, movies, vectors, ids, scores,
+                                         artifacts['vocabulary'].tolist(), extra={'parent': manifest['build_id']},
+                                         score_dtype=artifacts['neighbor_scores'].dtype.name,
+                                         embedding_dims=0 if codes is None else codes.shape[1],
+                                         embedding_dtype='int8' if codes is None else codes.dtype.name,
+                                         weighting=weighting_from(artifacts))
+
+    log(f"{'total':<12} {sum(timings.values()):8.2f}s  (build {result['build_id'][:8]}, compacted)")
+    return result
+
+
+# Function to tell whether the segment has grown enough to compact
+def needs_compaction(path, ratio=COMPACT_RATIO):
+    artifacts = open_artifacts(path)
+    if 'segment_rows' not in artifacts:
+        return False
+    return len(artifacts['segment_rows']) > ratio * artifacts['manifest']['n_movies']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add or change movies in the published artifacts.")
+    parser.add_argument('--movies-csv', help="Raw TMDB movies CSV with the new / changed movies")
+    parser.add_argument('--credits-csv', help="Matching raw TMDB credits CSV")
+    parser.add_argument('--movies-pkl', help="Or: a dataframe with movie_id, title and stemmed tags")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH)
+    parser.add_argument('--compact', action='store_true', help="Compact now (also done past --compact-ratio)")
+    parser.add_argument('--compact-ratio', type=float, default=COMPACT_RATIO)
+    parser.add_argument('--workers', type=int, help="Worker processes for compaction")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.movies_csv:
+        update_catalog(args.artifacts, prepare_movies(args.movies_csv, args.credits_csv))
+    elif args.movies_pkl:
+        update_catalog(args.artifacts, pd.read_pickle(args.movies_pkl))
+
+    if args.compact or needs_compaction(args.artifacts, args.compact_ratio):
+        compact(args.artifacts, args.workers)
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
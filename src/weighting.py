@@ -0,0 +1,130 @@
+# Term weighting of the tag matrix: raw counts, sublinear TF-IDF or BM25, with optional per-field weights
+#
+# 'count' is the notebook's CountVectorizer model. 'tfidf' replaces every count
+# by 1 + log(count) and scales it by the smoothed IDF, so generic keywords and
+# prolific actors stop dominating the cosine. 'bm25' saturates term frequency
+# (k1) and normalizes it by field length (b), BM25F-style. Everything is done on
+# the CSR data arrays, so the vocabulary cap (max_features) can be raised or
+# dropped (0 / None) without densifying anything.
+#
+# Field weights need the per-field stemmed tokens kept by src/ingest.py
+# (field_tags: one string per FIELDS entry): each field is counted separately,
+# weighted, then summed. Without them the whole tag string is a single field.
+#
+# The fitted model (scheme, field weights, field lengths, IDF) is stored with
+# the artifacts, so incremental updates weigh new rows exactly like the build.
+import numpy as np
+import scipy.sparse as sp
+
+from src.recommender import fit_vectorizer
+
+# Weighting schemes accepted by the build
+SCHEMES = ('count', 'tfidf', 'bm25')
+
+# Tag fields, in the order src/ingest.py keeps them
+FIELDS = ('overview', 'genres', 'keywords', 'cast', 'director')
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+# Function to parse "genres=2,cast=0.5" into {field: weight} (unlisted fields weigh 1)
+def parse_field_weights(text):
+    weights = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        field, _, value = item.partition('=')
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {field!r}, expected one of {FIELDS}")
+        weights[field] = float(value)
+    return weights
+
+
+# Function to count the vocabulary terms of every text as a CSR matrix
+def _counts(texts, vocabulary):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    cv = CountVectorizer(vocabulary=vocabulary, stop_words='english', dtype=np.float32)
+    return cv.transform(texts)
+
+
+# Function to split field_tags rows into one list of texts per field
+def _field_texts(field_tags):
+    return [[row[i] for row in field_tags] for i in range(len(FIELDS))]
+
+
+# Function to combine per-field counts into the weighted tag matrix described by `model`
+def _weigh(matrices, model):
+    scheme = model['scheme']
+    weights = model.get('field_weights') or [1.0] * len(matrices)
+    lengths = model.get('avg_lengths') or [1.0] * len(matrices)
+
+    total = None
+    for matrix, weight, avg_length in zip(matrices, weights, lengths):
+        matrix = sp.csr_matrix(matrix).astype(np.float32)
+        if scheme == 'tfidf':
+            matrix.data = 1 + np.log(matrix.data)
+        elif scheme == 'bm25':
+            # Long fields count each occurrence for less
+            row_lengths = np.asarray(matrix.sum(axis=1), dtype=np.float32).ravel()
+            norm = 1 - model['b'] + model['b'] * row_lengths / max(avg_length, 1e-9)
+            matrix.data /= np.repeat(norm, np.diff(matrix.indptr))
+        matrix = matrix * np.float32(weight)
+        total = matrix if total is None else total + matrix
+
+    if scheme == 'bm25':
+        total.data = total.data * (model['k1'] + 1) / (total.data + model['k1'])
+    if model.get('idf') is not None:
+        total.data *= np.asarray(model['idf'], dtype=np.float32)[total.indices]
+    total.eliminate_zeros()
+    return total.tocsr()
+
+
+# Function to fit the vocabulary and weighting of the tags; returns (vectors, vocabulary, model)
+#   field_tags: per-row sequences of FIELDS strings (needed for field_weights)
+def fit_weighting(tags, scheme='count', max_features=5000, field_tags=None, field_weights=None,
+                  k1=BM25_K1, b=BM25_B):
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown weighting scheme {scheme!r}, expected one of {SCHEMES}")
+    if field_weights and field_tags is None:
+        raise ValueError("Field weights need per-field tags: build from the raw dumps (python -m src.build)")
+
+    counts, vocabulary = fit_vectorizer(tags, max_features=max_features or None)
+    model = {'scheme': scheme}
+    matrices = [counts]
+    if field_weights:
+        model['fields'] = list(FIELDS)
+        model['field_weights'] = [float(field_weights.get(f, 1.0)) for f in FIELDS]
+        matrices = [_counts(texts, vocabulary) for texts in _field_texts(field_tags)]
+
+    n_movies = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1]).astype(np.float64)
+    if scheme == 'tfidf':
+        model['idf'] = np.log((1 + n_movies) / (1 + df)) + 1
+    elif scheme == 'bm25':
+        model['idf'] = np.log(1 + (n_movies - df + 0.5) / (df + 0.5))
+        model['k1'], model['b'] = float(k1), float(b)
+        model['avg_lengths'] = [float(m.sum()) / max(n_movies, 1) for m in matrices]
+    if 'idf' in model:
+        model['idf'] = model['idf'].astype(np.float32)
+
+    return _weigh(matrices, model), vocabulary, model
+
+
+# Function to weigh new tags with a fitted model and vocabulary (incremental updates)
+def transform_weighting(tags, vocabulary, model, field_tags=None):
+    if model.get('fields'):
+        if field_tags is None:
+            raise ValueError("These artifacts use field weights: new movies need per-field tags (src/ingest.py)")
+        matrices = [_counts(texts, vocabulary) for texts in _field_texts(field_tags)]
+    else:
+        matrices = [_counts(tags, vocabulary)]
+    return _weigh(matrices, model)
+
+
+# Function to read the weighting model of an artifact version (raw counts when none was stored)
+def weighting_from(artifacts):
+    model = dict(artifacts['manifest'].get('weighting') or {'scheme': 'count'})
+    if 'term_idf' in artifacts:
+        model['idf'] = np.asarray(artifacts['term_idf'])
+    return model
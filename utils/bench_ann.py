@@ -0,0 +1,79 @@
+# Recall@k vs latency of the neighbor backends against the exact baseline
+#
+# Usage (from the repository root):
+#   python utils/bench_ann.py                      # real catalog (movies_df.pkl)
+#   python utils/bench_ann.py --synthetic 50000    # synthetic catalog
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.neighbors import ExactBackend, IVFBackend, build_ivf
+from src.recommender import vectorize_tags
+from src.similarity import normalize_rows
+from utils.make_synthetic_tmdb import make_catalog
+
+
+# Function to time every query and collect the returned ids
+def run_queries(backend, queries, k):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        ids, _ = backend.neighbors(q, k)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids)
+    return np.array(latencies) * 1000, results
+
+
+# Function to compute mean recall@k of results against the exact answers
+def recall_at_k(results, truth, k):
+    return np.mean([len(set(r[:k]) & set(t[:k])) / k for r, t in zip(results, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of the neighbor backends.")
+    parser.add_argument('--movies', default='movies_df.pkl', help="Processed movies dataframe")
+    parser.add_argument('--synthetic', type=int, help="Use a synthetic catalog of this size instead")
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    if args.synthetic:
+        tags = make_catalog(args.synthetic)['tags']
+    else:
+        with open(args.movies, 'rb') as f:
+            tags = pickle.load(f)['tags']
+
+    vectors = normalize_rows(vectorize_tags(tags))
+    n_movies = vectors.shape[0]
+    queries = np.random.default_rng(0).choice(n_movies, size=min(args.queries, n_movies), replace=False)
+
+    start = time.perf_counter()
+    ivf = build_ivf(vectors)
+    ivf_build_s = time.perf_counter() - start
+    print(f"{n_movies} movies, {len(ivf[0])} IVF lists (built in {ivf_build_s:.1f}s), {len(queries)} queries\n")
+
+    exact_ms, truth = run_queries(ExactBackend(vectors), queries, args.k)
+    print(f"{'backend':<14} {f'recall@{args.k}':>9} {'p50 ms':>8} {'p99 ms':>8} {'scanned':>8}")
+    print(f"{'exact':<14} {1.0:>9.3f} {np.percentile(exact_ms, 50):>8.3f} {np.percentile(exact_ms, 99):>8.3f} {1.0:>8.1%}")
+
+    for nprobe in args.nprobe:
+        if nprobe > len(ivf[0]):
+            break
+        backend = IVFBackend(ivf[3], *ivf[:3], nprobe=nprobe)
+        ms, results = run_queries(backend, queries, args.k)
+        sizes = np.diff(ivf[2])
+        scanned = np.mean([sizes[np.argsort(-(ivf[0] @ vectors[q].toarray().ravel()))[:nprobe]].sum() for q in queries]) / n_movies
+        print(f"{f'ivf nprobe={nprobe}':<14} {recall_at_k(results, truth, args.k):>9.3f} "
+              f"{np.percentile(ms, 50):>8.3f} {np.percentile(ms, 99):>8.3f} {scanned:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Throughput of recommend_batch() vs one neighbors() call per seed
+#
+# Usage (from the repository root):
+#   python utils/bench_batch.py [--seeds 2000]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.neighbors import load_backend, recommend_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs per-seed recommendation throughput.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH)
+    parser.add_argument('--seeds', type=int, default=2000)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    artifacts = open_artifacts(args.artifacts)
+    n_movies = artifacts['manifest']['n_movies']
+    rows = np.random.default_rng(0).choice(n_movies, size=min(args.seeds, n_movies), replace=False)
+
+    print(f"{'backend':<12} {'chunk':>6} {'loop movies/s':>14} {'batch movies/s':>15} {'speedup':>8}")
+    for name in ('precomputed', 'exact', 'ivf'):
+        backend = load_backend(name, artifacts)
+
+        start = time.perf_counter()
+        loop_ids = [backend.neighbors(row, args.k)[0] for row in rows]
+        loop_rate = len(rows) / (time.perf_counter() - start)
+
+        for chunk_size in (64, 512):
+            start = time.perf_counter()
+            ids, _ = recommend_batch(backend, rows, args.k, chunk_size)
+            batch_rate = len(rows) / (time.perf_counter() - start)
+            assert all(np.array_equal(a, b) for a, b in zip(loop_ids, ids))
+            print(f"{name:<12} {chunk_size:>6} {loop_rate:>14,.0f} {batch_rate:>15,.0f} {batch_rate / loop_rate:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# Peak memory and time of the streaming ingest (src/ingest.py) against an in-memory load of the dumps
+#
+# Each run happens in a fresh subprocess so its peak RSS is its own. Modes:
+#   in-memory  load_raw() + build_tags() + stem_tags() below: the notebook's pandas path,
+#              whole dumps as dataframes (the baseline only; the build uses src/ingest.py)
+#   streaming  iter_movies(), each chunk's rows dropped once produced (the memory floor)
+#   ingest     ingest(), i.e. streaming plus the accumulated catalog rows the build keeps
+# Usage (from the repository root):
+#   python utils/bench_ingest.py --movies 5000 20000 80000 [--chunk-rows 2000 --workers 1]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ingest import CHUNK_ROWS
+from utils.make_synthetic_tmdb import make_tmdb
+
+MODES = ('in-memory', 'streaming', 'ingest')
+
+# Columns kept from the raw movies CSV
+MOVIE_COLUMNS = ['movie_id', 'title', 'overview', 'genres', 'keywords', 'popularity', 'vote_average',
+                 'vote_count', 'cast', 'crew']
+
+
+# Function to load and join the raw TMDB CSVs
+def load_raw(movies_csv, credits_csv):
+    movies = pd.read_csv(movies_csv)
+    credits = pd.read_csv(credits_csv)
+
+    # Join on the TMDB id: titles are not unique in the dump
+    movies = movies.rename(columns={'id': 'movie_id'})
+    credits = credits.drop(columns=['title'], errors='ignore')
+    movies = movies.merge(credits, on='movie_id')
+
+    movies = movies[MOVIE_COLUMNS]
+    movies = movies.dropna().reset_index(drop=True)
+    return movies
+
+
+# Function to get the 'name' of every object in a JSON list column
+def names(obj, limit=None):
+    data = json.loads(obj)
+
+    # unwrap extra list if present
+    if len(data) > 0 and isinstance(data[0], list):
+        data = data[0]
+
+    return [item['name'] for item in data[:limit]]
+
+
+# Function to get the director from the JSON crew column
+def director(obj):
+    for member in json.loads(obj):
+        if member['job'] == 'Director':
+            return [member['name']]
+    return []
+
+
+# Function to build the lowercase tag string for every movie
+def build_tags(movies):
+    def squash(values):
+        return [v.replace(" ", "") for v in values]
+
+    tags = []
+    for overview, genres, keywords, cast, crew in zip(
+        movies['overview'], movies['genres'], movies['keywords'], movies['cast'], movies['crew']
+    ):
+        tokens = (
+            overview.split()
+            + squash(names(genres))
+            + squash(names(keywords))
+            + squash(names(cast, limit=10))
+            + squash(director(crew))
+        )
+        tags.append(" ".join(tokens).lower())
+    return tags
+
+
+# Function to Porter-stem every tag string, stemming each unique word once
+def stem_tags(tags):
+    from nltk.stem.porter import PorterStemmer
+
+    ps = PorterStemmer()
+    cache = {}
+
+    def stem_word(word):
+        stemmed = cache.get(word)
+        if stemmed is None:
+            stemmed = cache[word] = ps.stem(word)
+        return stemmed
+
+    return [" ".join(stem_word(w) for w in text.split()) for text in tags]
+
+
+
+# Function to get the peak resident memory (MB) of this process and its workers
+#   VmHWM, not ru_maxrss: on Linux the latter keeps the parent's RSS at fork time
+def peak_rss_mb():
+    with open('/proc/self/status') as f:
+        own = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+# Function to run one mode in this process and print "seconds peak_mb rows"
+def run(mode, movies_csv, credits_csv, chunk_rows, workers):
+    from src.ingest import ingest, iter_movies
+
+    start = time.perf_counter()
+    if mode == 'in-memory':
+        rows = len(stem_tags(build_tags(load_raw(movies_csv, credits_csv))))
+    elif mode == 'streaming':
+        rows = sum(len(frame) for frame in iter_movies(movies_csv, credits_csv, chunk_rows, workers))
+    else:
+        rows = len(ingest(movies_csv, credits_csv, chunk_rows, workers))
+    print(f"{time.perf_counter() - start:.3f} {peak_rss_mb():.1f} {rows}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of streaming vs in-memory ingest.")
+    parser.add_argument('--movies', type=int, nargs='+', default=[5000, 20000, 80000], help="Synthetic dump sizes")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--run', nargs=3, metavar=('MODE', 'MOVIES', 'CREDITS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(*args.run, args.chunk_rows, args.workers)
+        return
+
+    print(f"chunk_rows={args.chunk_rows} workers={args.workers}\n")
+    print(f"{'movies':>8} {'dump MB':>8} {'mode':<10} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_movies in args.movies:
+            movies, credits = make_tmdb(n_movies)
+            movies_csv, credits_csv = os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'credits.csv')
+            movies.to_csv(movies_csv, index=False)
+            credits.to_csv(credits_csv, index=False)
+            del movies, credits
+            dump_mb = (os.path.getsize(movies_csv) + os.path.getsize(credits_csv)) / 1e6
+
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run', mode, movies_csv, credits_csv,
+                     '--chunk-rows', str(args.chunk_rows), '--workers', str(args.workers)],
+                    capture_output=True, text=True, check=True,
+                ).stdout.split()
+                print(f"{n_movies:>8} {dump_mb:>8.1f} {mode:<10} {float(out[0]):>8.2f} {float(out[1]):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
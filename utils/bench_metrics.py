@@ -0,0 +1,69 @@
+# Overhead of the metrics layer: per-call cost of timer() / inc() and of recommend() with metrics off and on
+#
+# Usage (from the repository root):
+#   python utils/bench_metrics.py [--calls 200000]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import metrics
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.engine import Recommender
+from src.query_cache import QueryCache
+
+
+# Function to get the mean cost of fn() in nanoseconds
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def timed_block():
+    with metrics.timer('bench_seconds', kind='block'):
+        pass
+
+
+def counter():
+    metrics.inc('bench_total', kind='counter')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of src.metrics.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    artifacts = open_artifacts(args.artifacts)
+    rows = np.random.default_rng(0).integers(0, artifacts['manifest']['n_movies'], size=args.queries)
+
+    print(f"{'':<28} {'off':>10} {'on':>10}")
+    results = {}
+    for state in (False, True):
+        metrics.enable(state)
+        # Every query misses a zero-size cache, so recommend() does the full work
+        engine = Recommender(artifacts, 'precomputed', QueryCache(0))
+        engine.recommend(0)
+        results[state] = (
+            per_call_ns(timed_block, args.calls),
+            per_call_ns(counter, args.calls),
+            per_call_ns(lambda it=iter(np.resize(rows, args.calls)): engine.recommend(int(next(it))), args.calls),
+        )
+    for i, name in enumerate(('timer() block', 'inc()', 'recommend() precomputed')):
+        print(f"{name:<28} {results[False][i]:>8.0f}ns {results[True][i]:>8.0f}ns")
+
+    # Rendering a realistic registry
+    start = time.perf_counter()
+    text = metrics.REGISTRY.render()
+    print(f"\nrender(): {len(text.splitlines())} lines in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Memory, latency and top-5 overlap of quantized storage against exact float64 recommend()
+#
+# Compares the stored neighbor scores as float32 / float16 / uint8 and the
+# embedding backend (truncated SVD, several sizes) as float32 / float16 / int8
+# codes with per-row scales. Overlap is against brute-force float64 cosine over
+# the tag matrix, i.e. what the original similarity.pkl recommend() returned;
+# "score err" is the mean gap between a returned score and the true cosine.
+# Usage (from the repository root):
+#   python utils/bench_quantization.py                      # real catalog (movies_df.pkl)
+#   python utils/bench_quantization.py --synthetic 50000    # synthetic catalog
+#   python utils/bench_quantization.py --dims 64 128 256
+import argparse
+import os
+import pickle
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.neighbors import EmbeddingBackend, ExactBackend, PrecomputedBackend
+from src.quantize import EMBEDDING_DTYPES, SCORE_DTYPES, embedding_columns, fit_embeddings, quantize_scores
+from src.recommender import DEFAULT_K, vectorize_tags
+from src.similarity import build_neighbor_index, normalize_rows
+from utils.bench_ann import recall_at_k, run_queries
+from utils.make_synthetic_tmdb import make_catalog
+
+
+# Function to get the bytes taken by arrays / sparse matrices
+def nbytes(*arrays):
+    total = 0
+    for a in arrays:
+        if hasattr(a, 'indptr'):
+            total += a.data.nbytes + a.indices.nbytes + a.indptr.nbytes
+        elif a is not None:
+            total += a.nbytes
+    return total
+
+
+# Function to get the mean gap between returned scores and the true cosine of the same pairs
+def score_error(backend, vectors, queries, k):
+    errors = []
+    for q in queries:
+        ids, scores = backend.neighbors(q, k)
+        valid = np.asarray(ids) >= 0
+        true = (vectors[np.asarray(ids)[valid]] @ vectors[q].toarray().ravel()).ravel()
+        errors.extend(np.abs(np.asarray(scores, dtype=np.float64)[valid] - true))
+    return float(np.mean(errors))
+
+
+def report(name, backend, size, vectors, queries, truth, k):
+    ms, results = run_queries(backend, queries, k)
+    print(f"{name:<22} {size / 1e6:>9.2f} {np.percentile(ms, 50):>8.3f} {np.percentile(ms, 99):>8.3f} "
+          f"{recall_at_k(results, truth, k):>9.3f} {score_error(backend, vectors, queries, k):>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory, latency and top-k overlap of quantized storage.")
+    parser.add_argument('--movies', default='movies_df.pkl', help="Processed movies dataframe")
+    parser.add_argument('--synthetic', type=int, help="Use a synthetic catalog of this size instead")
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--dims', type=int, nargs='+', default=[32, 64, 128, 256], help="Embedding sizes")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        tags = make_catalog(args.synthetic)['tags']
+    else:
+        with open(args.movies, 'rb') as f:
+            tags = pickle.load(f)['tags']
+
+    counts = vectorize_tags(tags)
+    vectors64 = normalize_rows(counts).astype(np.float64)
+    vectors = normalize_rows(counts)
+    n_movies = vectors.shape[0]
+    queries = np.random.default_rng(0).choice(n_movies, size=min(args.queries, n_movies), replace=False)
+
+    # Reference: brute-force float64 cosine
+    _, truth = run_queries(ExactBackend(vectors64), queries, args.k)
+    print(f"{n_movies} movies, {len(queries)} queries, top-{args.k} overlap vs exact float64\n")
+    print(f"{'storage':<22} {'MB':>9} {'p50 ms':>8} {'p99 ms':>8} {'overlap':>9} {'score err':>10}")
+    report('exact float64', ExactBackend(vectors64), nbytes(vectors64), vectors64, queries, truth, args.k)
+    report('exact float32', ExactBackend(vectors), nbytes(vectors), vectors64, queries, truth, args.k)
+
+    # Precomputed lists: ids are exact, only the stored scores lose precision
+    ids, scores = build_neighbor_index(vectors, DEFAULT_K)
+    for dtype in SCORE_DTYPES:
+        stored = quantize_scores(scores, dtype)
+        report(f"precomputed {dtype}", PrecomputedBackend(ids, stored), nbytes(ids, stored),
+               vectors64, queries, truth, args.k)
+
+    # Embeddings: SVD components are only needed to add movies, so they are not counted
+    for dims in args.dims:
+        embeddings, components = fit_embeddings(vectors, dims)
+        for dtype in EMBEDDING_DTYPES:
+            columns = embedding_columns(embeddings, components, dtype)
+            backend = EmbeddingBackend(columns['embed_codes'], columns.get('embed_scales'))
+            report(f"embedding {embeddings.shape[1]} {dtype}", backend,
+                   nbytes(columns['embed_codes'], columns.get('embed_scales')), vectors64, queries, truth, args.k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Recommendation latency with and without the query cache under a Zipf seed workload
+#
+# Usage (from the repository root):
+#   python utils/bench_query_cache.py [--queries 20000] [--zipf 1.1] [--cache-size 1000] [--threads 4]
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.neighbors import load_backend, mmr_rerank
+from src.query_cache import QueryCache
+
+
+# Function to draw seeds whose popularity follows a Zipf law over a shuffled catalog
+def zipf_seeds(n_movies, n_queries, a, rng):
+    ranks = rng.zipf(a, size=n_queries * 2)
+    ranks = ranks[ranks <= n_movies][:n_queries] - 1
+    return rng.permutation(n_movies)[ranks]
+
+
+# Function to run every query on a thread pool, returning per-query latencies in microseconds
+def run(seeds, query, threads):
+    def timed(seed):
+        start = time.perf_counter()
+        query(seed)
+        return (time.perf_counter() - start) * 1e6
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return np.array(list(pool.map(timed, seeds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query cache load test.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH)
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of seed popularity")
+    parser.add_argument('--cache-size', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    artifacts = open_artifacts(args.artifacts)
+    version = artifacts['manifest']['build_id']
+    n_movies = artifacts['manifest']['n_movies']
+    seeds = zipf_seeds(n_movies, args.queries, args.zipf, np.random.default_rng(0))
+    print(f"{len(seeds)} queries over {len(np.unique(seeds))} distinct seeds (zipf a={args.zipf}), "
+          f"cache {args.cache_size} entries, {args.threads} threads\n")
+
+    print(f"{'backend':<12} {'rerank':>6} {'cache':>6} {'p50 us':>8} {'p99 us':>9} {'hit rate':>9} {'evictions':>10}")
+    for name in ('precomputed', 'exact'):
+        backend = load_backend(name, artifacts)
+        for diversity in (0.0, 0.3):
+            def compute(seed):
+                candidates, scores = backend.neighbors(seed, 20 if diversity > 0 else args.k)
+                if diversity > 0:
+                    return mmr_rerank(candidates, scores, artifacts['vectors'], args.k, lam=1 - diversity)
+                return candidates[:args.k], scores[:args.k]
+
+            cache = QueryCache(args.cache_size)
+
+            def cached(seed):
+                return cache.get_or_compute((int(seed), args.k, name, diversity), lambda: compute(seed), version)
+
+            for label, query in (('off', compute), ('on', cached)):
+                lat = run(seeds, query, args.threads)
+                stats = cache.stats() if label == 'on' else None
+                hit_rate = f"{stats['hit_rate']:.1%}" if stats else '-'
+                evictions = stats['evictions'] if stats else '-'
+                print(f"{name:<12} {diversity:>6.1f} {label:>6} {np.percentile(lat, 50):>8.1f} "
+                      f"{np.percentile(lat, 99):>9.1f} {hit_rate:>9} {evictions:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Added latency and effect of MMR diversity re-ranking
+#
+# Usage (from the repository root):
+#   python utils/bench_rerank.py [--candidates 20]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.neighbors import load_backend, mmr_rerank
+
+
+# Function to compute the mean pairwise similarity inside one result list
+def intra_list_similarity(vectors, ids):
+    block = vectors[ids]
+    pairwise = (block @ block.T).toarray()
+    n = len(ids)
+    return (pairwise.sum() - np.trace(pairwise)) / (n * (n - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMR re-ranking latency and diversity.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH)
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    artifacts = open_artifacts(args.artifacts)
+    vectors = artifacts['vectors']
+    backend = load_backend('precomputed', artifacts)
+    n_movies = artifacts['manifest']['n_movies']
+    queries = np.random.default_rng(0).choice(n_movies, size=min(args.queries, n_movies), replace=False)
+
+    print(f"{args.candidates} candidates -> top {args.k}, {len(queries)} queries\n")
+    print(f"{'lambda':>6} {'added p50 ms':>13} {'added p99 ms':>13} {'mean score':>11} {'intra-list sim':>15}")
+    for lam in (1.0, 0.9, 0.7, 0.5, 0.3):
+        added = []
+        relevance = []
+        similarity = []
+        for q in queries:
+            candidates, scores = backend.neighbors(q, args.candidates)
+            start = time.perf_counter()
+            ids, kept = mmr_rerank(candidates, scores, vectors, args.k, lam)
+            added.append((time.perf_counter() - start) * 1000)
+            relevance.append(kept.mean())
+            similarity.append(intra_list_similarity(vectors, ids))
+        print(f"{lam:>6.1f} {np.percentile(added, 50):>13.3f} {np.percentile(added, 99):>13.3f} "
+              f"{np.mean(relevance):>11.3f} {np.mean(similarity):>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
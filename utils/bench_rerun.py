@@ -0,0 +1,63 @@
+# Time Streamlit reruns of app.py (cold start, plain rerun, theme toggle, views)
+#
+# Runs the app headless with streamlit's AppTest against the local TMDB stub.
+# Usage (from the repository root):
+#   python utils/bench_rerun.py --runs 20
+#   python utils/bench_rerun.py --app /tmp/app_before.py   # compare another revision
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.stub_tmdb import start_stub_server
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Streamlit reruns of app.py.")
+    parser.add_argument('--app', default='app.py', help="Streamlit script to run")
+    parser.add_argument('--runs', type=int, default=20, help="Reruns per interaction")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server()
+    os.environ['TMDB_API_URL'] = base_url
+    os.environ.setdefault('API_KEY', 'stub')
+    os.environ['POSTER_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'posters.sqlite3')
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(args.app), default_timeout=120)
+    results = {'cold start': [timed(at.run)]}
+
+    def record(name, fn):
+        results.setdefault(name, []).append(timed(fn))
+        if at.exception:
+            sys.exit(f"{name}: {at.exception[0].message}")
+
+    for _ in range(args.runs):
+        record('rerun', at.run)
+    for _ in range(args.runs):
+        record('dark mode toggle', lambda: at.toggle[0].set_value(not at.toggle[0].value).run())
+    for _ in range(args.runs):
+        record('recommend click', lambda: at.button[-1].click().run())
+    for n in range(args.runs):
+        genre = ['Action', 'Comedy', 'Drama', 'Horror'][n % 4]
+        record('genre view', lambda: at.selectbox[0].set_value(genre).run())
+
+    print(f"{'interaction':<18} {'runs':>5} {'mean ms':>9} {'p50 ms':>8} {'max ms':>8}")
+    for name, times in results.items():
+        print(f"{name:<18} {len(times):>5} {statistics.mean(times):>9.1f} {statistics.median(times):>8.1f} {max(times):>8.1f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Typeahead latency of the title search index at several catalog sizes
+#
+# Catalogs beyond the real dump are synthesized from the vocabulary of its titles.
+# Usage (from the repository root):
+#   python utils/bench_search.py [--sizes 5000 100000 1000000] [--queries 2000]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.search import TitleSearch, build_search_index, normalize_title
+
+
+# Function to make n titles from the words of the real ones
+def synthetic_titles(words, n, rng):
+    lengths = rng.integers(1, 5, size=n)
+    picks = rng.integers(0, len(words), size=lengths.sum())
+    sequels = rng.integers(2, 9, size=n)
+    titles, start = [], 0
+    for i, length in enumerate(lengths):
+        title = " ".join(words[p].title() for p in picks[start:start + length])
+        titles.append(f"{title} {sequels[i]}" if i % 10 == 0 else title)
+        start += length
+    return titles
+
+
+# Function to make a typo (drop, swap or replace one character)
+def typo(text, rng):
+    if len(text) < 4:
+        return text
+    i = int(rng.integers(1, len(text) - 1))
+    kind = rng.integers(0, 3)
+    if kind == 0:
+        return text[:i] + text[i + 1:]
+    if kind == 1:
+        return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+    return text[:i] + "x" + text[i + 1:]
+
+
+# Function to time every query, returning latencies in microseconds
+def time_queries(search, queries, k):
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        search(query, k)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Title search latency at several catalog sizes.")
+    parser.add_argument('--movies', default='movies_df.pkl', help="Source of real titles")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    import pandas as pd
+    real = [str(t) for t in pd.read_pickle(args.movies)['title'].values]
+    words = sorted({w for t in real for w in normalize_title(t).split()})
+    rng = np.random.default_rng(0)
+
+    print(f"{'titles':>9} {'build s':>8} {'MB':>7} {'kind':>7} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+    for size in args.sizes:
+        titles = real[:size] + synthetic_titles(words, max(0, size - len(real)), rng)
+        rank = rng.permutation(len(titles)).astype(np.int32)
+
+        start = time.perf_counter()
+        arrays = build_search_index(titles, rank)
+        build_time = time.perf_counter() - start
+        size_mb = sum(a.nbytes for a in arrays.values()) / 1e6
+        index = TitleSearch(arrays, rank)
+
+        # Typeahead prefixes (1-8 characters) of random titles, and misspelled full titles
+        sample = [titles[i] for i in rng.integers(0, len(titles), size=args.queries)]
+        prefixes = [t[:int(rng.integers(1, 9))] for t in sample]
+        typos = [typo(t, rng) for t in sample]
+
+        for kind, search, queries in (('prefix', index.prefix, prefixes), ('search', index.search, typos)):
+            lat = time_queries(search, queries, args.k)
+            print(f"{len(titles):>9} {build_time:>8.2f} {size_mb:>7.1f} {kind:>7} {np.percentile(lat, 50):>8.0f} "
+                  f"{np.percentile(lat, 99):>8.0f} {lat.max():>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
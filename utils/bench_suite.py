@@ -0,0 +1,250 @@
+# Benchmark suite for the serving hot paths at 1x, 10x and 100x the real catalog
+#
+# Times artifact load, title lookup and search, recommend(), the genre view and
+# poster fetching (against the local TMDB stub with injected latency). Each scale
+# runs in a fresh subprocess so peak RSS is per scale. Results are written as
+# JSON; --compare flags regressions against an earlier run.
+#
+# Scaled catalogs tile the real artifacts (new movie ids, neighbors kept within
+# each copy) and are cached under --work-dir between runs.
+# Usage (from the repository root):
+#   python utils/bench_suite.py [--scales 1 10 100] [--output bench_results.json]
+#   python utils/bench_suite.py --compare bench_results_before.json
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, open_artifacts, read_manifest, write_artifacts
+from src.genres import GENRE_MAP, build_genre_rankings, flatten_tag_index
+from src.search import build_search_index
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative slowdown (or RSS growth) reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.2
+
+
+# Function to summarize latencies (seconds) as milliseconds
+def summarize(latencies):
+    ms = np.asarray(latencies) * 1e3
+    return {'n': len(ms), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p99_ms': float(np.percentile(ms, 99))}
+
+
+# Function to time fn(arg) for every arg
+def time_each(fn, args):
+    latencies = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Function to write the real artifacts tiled `factor` times (skipped if already built)
+def scale_artifacts(source, factor, path):
+    source_manifest = read_manifest(source)
+    if os.path.exists(path):
+        manifest = read_manifest(path)
+        if manifest.get('source_build_id') == source_manifest['build_id'] and manifest.get('scale') == factor:
+            return path
+
+    import scipy.sparse as sp
+
+    a = open_artifacts(source, mmap=False)
+    n = source_manifest['n_movies']
+    copies = np.repeat(np.arange(factor), n)
+
+    titles = a['title'].tolist()
+    titles = [t if c == 0 else f"{t} {c + 1}" for c in range(factor) for t in titles]
+    movie_ids = np.tile(a['movie_id'], factor) + copies.astype(np.int64) * 10_000_000
+
+    # Each copy's neighbors point into the same copy
+    offsets = (copies * n).astype(np.int32)[:, None]
+    neighbor_ids = np.tile(a['neighbor_ids'], (factor, 1))
+    neighbor_ids = np.where(neighbor_ids >= 0, neighbor_ids + offsets, -1)
+    neighbor_scores = np.tile(a['neighbor_scores'], (factor, 1))
+    vectors = sp.vstack([a['vectors']] * factor, format='csr')
+
+    # Copies rank right after their original (best first), so every copy keeps the real ordering
+    stats = {name: np.tile(a[name], factor) for name in ('popularity', 'vote_average', 'vote_count') if name in a}
+    order = np.argsort(np.tile(a['rank'], factor).astype(np.int64) * factor + copies, kind='stable')
+    stats['rank'] = np.empty(len(titles), dtype=np.int32)
+    stats['rank'][order] = np.arange(len(titles), dtype=np.int32)
+
+    # Genre membership of every copy follows the original rows
+    genres = {}
+    keys = a['genre_keys'].tolist()
+    for i, key in enumerate(keys):
+        if '|' not in key:
+            rows = a['genre_rows'][a['genre_offsets'][i]:a['genre_offsets'][i + 1]].astype(np.int64)
+            genres[key] = np.sort((rows[None, :] + np.arange(factor)[:, None] * n).ravel()).astype(np.int32)
+
+    write_artifacts(
+        path, movie_ids, titles, neighbor_ids, neighbor_scores, vectors=vectors, stats=stats,
+        genre_rankings=flatten_tag_index(build_genre_rankings(genres, stats['rank'])),
+        search_index=build_search_index(titles, stats['rank']),
+        extra={'source_build_id': source_manifest['build_id'], 'scale': factor},
+    )
+    return path
+
+
+# Function to run every measurement against one artifact directory (in this process)
+def run_scale(path, queries, poster_latency):
+    from functools import partial
+
+    from src import api_handler
+    from src.engine import Recommender
+    from src.poster_cache import PosterCache
+    from src.query_cache import QueryCache
+    from src.recommender import build_lookup, option_labels
+    from utils.stub_tmdb import start_stub_server
+
+    results = {}
+    rng = np.random.default_rng(0)
+
+    # Artifact load: what app.py's load_catalog() does
+    start = time.perf_counter()
+    artifacts = open_artifacts(path)
+    titles = artifacts['title'].tolist()
+    movie_ids = artifacts['movie_id']
+    results['load'] = {'seconds': time.perf_counter() - start, 'n_movies': len(titles),
+                       'build_id': artifacts['manifest']['build_id']}
+
+    # Title lookup: picker labels, movie_id -> row and typeahead queries
+    start = time.perf_counter()
+    title_rows, id_rows = build_lookup(titles, movie_ids)
+    option_labels(titles, title_rows)
+    results['title_lookup_build'] = {'seconds': time.perf_counter() - start}
+    sample = rng.integers(0, len(titles), size=queries)
+    results['movie_id_lookup'] = time_each(lambda i: id_rows[int(movie_ids[i])], sample)
+
+    # Every query misses a zero-size cache, so recommend() does the full work
+    for backend in ('precomputed', 'exact'):
+        engine = Recommender(artifacts, backend, QueryCache(0))
+        engine.search('warm up')
+        engine.recommend(0)
+        results[f'recommend_{backend}'] = time_each(engine.recommend, sample)
+    results['search'] = time_each(engine.search, [titles[i][:int(rng.integers(1, 8))] for i in sample])
+
+    # Genre view: one page of a genre ranking, paging through the first 5 pages
+    genres = [g for g, token in GENRE_MAP.items() if token]
+    pages = [(genres[int(rng.integers(len(genres)))], int(rng.integers(5))) for _ in range(queries)]
+    results['genre_page'] = time_each(lambda gp: engine.genre_page(gp[0], gp[1], 10), pages)
+
+    # Posters: a 10-poster grid against the stub (cold: every id fetched; warm: disk cache)
+    server, base_url = start_stub_server(latency=poster_latency)
+    session = api_handler.create_session()
+    fetch = partial(api_handler.fetch_poster, api_key='stub', session=session, base_url=base_url, raise_errors=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PosterCache(os.path.join(tmp, 'posters.sqlite3'))
+        grids = [movie_ids[rng.integers(0, len(titles), size=10)].tolist() for _ in range(20)]
+        results['fetch_poster'] = time_each(fetch, [g[0] for g in grids])
+        results['poster_grid_cold'] = time_each(lambda g: api_handler.fetch_posters_cached(g, cache, fetch), grids)
+        results['poster_grid_warm'] = time_each(lambda g: api_handler.fetch_posters_cached(g, cache, fetch), grids)
+        cache.close()
+    server.shutdown()
+
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+# Function to print the regressions of `current` against an earlier results file
+def compare(previous, current):
+    print(f"\nCompared with {previous['meta'].get('commit', '?')[:10]} "
+          f"(regression = more than {REGRESSION_THRESHOLD:.0%} slower or larger):")
+    found = False
+    for scale, metrics in current['scales'].items():
+        before_metrics = previous['scales'].get(scale, {})
+        for name, value in metrics.items():
+            before = before_metrics.get(name)
+            if before is None:
+                continue
+            for field in ('p50_ms', 'seconds'):
+                if isinstance(value, dict) and field in value and field in before:
+                    old, new = before[field], value[field]
+                    break
+            else:
+                if name != 'peak_rss_mb':
+                    continue
+                old, new = before, value
+            if old > 0 and (new - old) / old > REGRESSION_THRESHOLD:
+                found = True
+                print(f"  {scale:>5} {name:<20} {old:10.3f} -> {new:10.3f} ({(new - old) / old:+.0%})")
+    if not found:
+        print("  none")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serving hot paths at several scales.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH, help="Real (1x) artifacts")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--queries', type=int, default=500, help="Queries per timed path")
+    parser.add_argument('--poster-latency', type=float, default=0.05, help="Stub TMDB latency (s)")
+    parser.add_argument('--work-dir', default='bench_data', help="Where scaled catalogs are kept")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="Earlier results file to check for regressions")
+    parser.add_argument('--run-scale', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: measure one artifact directory and print JSON
+    if args.run_scale:
+        print(json.dumps(run_scale(args.run_scale, args.queries, args.poster_latency)))
+        return
+
+    commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    report = {
+        'meta': {'commit': commit, 'created_at': time.time(), 'python': platform.python_version(),
+                 'numpy': np.__version__, 'cpus': os.cpu_count(), 'queries': args.queries,
+                 'poster_latency': args.poster_latency},
+        'scales': {},
+    }
+
+    for factor in args.scales:
+        if factor == 1:
+            path = args.artifacts
+        else:
+            start = time.perf_counter()
+            path = scale_artifacts(args.artifacts, factor, os.path.join(args.work_dir, f"x{factor}"))
+            print(f"x{factor}: catalog ready in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-scale', path, '--queries', str(args.queries),
+             '--poster-latency', str(args.poster_latency)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        report['scales'][f"x{factor}"] = results
+
+        print(f"\nx{factor}: {results['load']['n_movies']} movies, load {results['load']['seconds'] * 1e3:.1f} ms, "
+              f"title lookup build {results['title_lookup_build']['seconds'] * 1e3:.0f} ms, "
+              f"peak RSS {results['peak_rss_mb']:.0f} MB")
+        for name, value in results.items():
+            if isinstance(value, dict) and 'p50_ms' in value:
+                print(f"  {name:<22} p50 {value['p50_ms']:9.3f} ms   p99 {value['p99_ms']:9.3f} ms")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Micro-benchmark: sorted() over enumerate() vs argpartition top-n selection
+#
+# Usage (from the repository root):
+#   python utils/bench_top_n.py
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.recommender import top_n
+
+
+# Selection as done by the original recommend()
+def sorted_top_n(distances, k):
+    return sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])[1:k + 1]
+
+
+def bench(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    k = 5
+
+    print(f"{'movies':>8} {'sorted (ms)':>12} {'top_n (ms)':>12} {'speedup':>8}")
+    for n_movies in (5_000, 50_000, 500_000):
+        distances = rng.random(n_movies, dtype=np.float32)
+        query = int(rng.integers(n_movies))
+        distances[query] = 1.0
+
+        # Both paths must agree on the neighbors
+        expected = [i for i, _ in sorted_top_n(distances, k)]
+        assert list(top_n(distances, k, exclude=query)) == expected
+
+        repeat = 5 if n_movies > 50_000 else 20
+        slow = bench(lambda: sorted_top_n(distances, k), repeat)
+        fast = bench(lambda: top_n(distances, k, exclude=query), repeat)
+        print(f"{n_movies:>8} {slow:>12.3f} {fast:>12.3f} {slow / fast:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
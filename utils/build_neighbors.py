@@ -0,0 +1,66 @@
+# Build the serving artifacts (artifacts/) used by app.py from movies_df.pkl
+#
+# Usage (from the repository root):
+#   python utils/build_neighbors.py
+#   python utils/build_neighbors.py --similarity similarity.pkl   # convert a legacy matrix
+#   python utils/build_neighbors.py --score-dtype uint8 --embedding-dims 128   # quantized storage
+#   python utils/build_neighbors.py --weighting tfidf --max-features 0         # TF-IDF, full vocabulary
+import argparse
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, version_dir
+from src.build import write_serving_artifacts
+from src.quantize import EMBEDDING_DTYPES, SCORE_DTYPES
+from src.recommender import DEFAULT_K, neighbor_index_from_similarity
+from src.similarity import build_neighbor_index
+from src.weighting import SCHEMES, fit_weighting, parse_field_weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the serving artifacts.")
+    parser.add_argument('--movies', default='movies_df.pkl', help="Processed movies dataframe")
+    parser.add_argument('--similarity', help="Convert an existing similarity.pkl instead of rebuilding")
+    parser.add_argument('--output', default=ARTIFACTS_PATH, help="Output artifact directory")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="Neighbors kept per movie")
+    parser.add_argument('--block-size', type=int, default=1024, help="Rows scored per block")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: all cores)")
+    parser.add_argument('--score-dtype', default='float32', choices=SCORE_DTYPES, help="Neighbor score storage")
+    parser.add_argument('--embedding-dims', type=int, default=0, help="SVD embedding size (0: no embeddings)")
+    parser.add_argument('--embedding-dtype', default='int8', choices=EMBEDDING_DTYPES, help="Embedding storage")
+    parser.add_argument('--max-features', type=int, default=5000, help="Vocabulary size (0: no cap)")
+    parser.add_argument('--weighting', default='count', choices=SCHEMES, help="Term weighting scheme")
+    parser.add_argument('--field-weights', help="Per-field weights (needs a dataframe built by src.build)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    with open(args.movies, 'rb') as f:
+        movies = pickle.load(f)
+    vectors, vocabulary, model = fit_weighting(movies['tags'], args.weighting, args.max_features,
+                                               movies.get('field_tags'), parse_field_weights(args.field_weights))
+
+    if args.similarity:
+        with open(args.similarity, 'rb') as f:
+            similarity = pickle.load(f)
+        ids, scores = neighbor_index_from_similarity(similarity, args.k, args.block_size)
+    else:
+        ids, scores = build_neighbor_index(vectors, args.k, args.block_size, workers=args.workers)
+
+    manifest = write_serving_artifacts(args.output, movies, vectors, ids, scores, vocabulary,
+                                       score_dtype=args.score_dtype, embedding_dims=args.embedding_dims,
+                                       embedding_dtype=args.embedding_dtype, weighting=model)
+
+    elapsed = time.perf_counter() - start
+    directory = version_dir(args.output)
+    size_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+    print(f"Wrote {args.output} (build {manifest['build_id'][:8]}): {ids.shape[0]} movies x {ids.shape[1]} "
+          f"neighbors, {size_mb:.2f} MB in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
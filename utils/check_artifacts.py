@@ -0,0 +1,37 @@
+# Validate an artifact directory and show what opening it costs
+#
+# Usage (from the repository root):
+#   python utils/check_artifacts.py [artifacts]
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ArtifactError, open_artifacts, version_dir
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'artifacts'
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    try:
+        artifacts = open_artifacts(path)
+    except ArtifactError as e:
+        sys.exit(f"Invalid artifacts: {e}")
+    elapsed = (time.perf_counter() - start) * 1000
+
+    manifest = artifacts['manifest']
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    directory = version_dir(path)
+    size_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+
+    print(f"{path}: format v{manifest['version']}, build {manifest['build_id']}")
+    print(f"{manifest['n_movies']} movies, k={manifest['k']}, columns: {', '.join(manifest['columns'])}")
+    print(f"opened in {elapsed:.1f} ms, {size_mb:.2f} MB on disk, peak RSS grew {(rss_after - rss_before) / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
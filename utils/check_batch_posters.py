@@ -0,0 +1,69 @@
+# Check the concurrent poster resolver against the local TMDB stub
+#
+# Usage (from the repository root):
+#   python utils/check_batch_posters.py
+import os
+import sys
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api_handler import POSTER_BASE_URL, create_session, fetch_poster, fetch_posters
+from utils.stub_tmdb import start_stub_server
+
+
+def run(label, movie_ids, fetch, deadline):
+    start = time.perf_counter()
+    serial = [fetch(movie_id) for movie_id in movie_ids]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = fetch_posters(movie_ids, fetch, deadline=deadline)
+    batch_time = time.perf_counter() - start
+
+    found = sum(p is not None for p in batch)
+    print(f"{label:<28} serial {serial_time:6.2f}s   batch {batch_time:6.2f}s   {found}/{len(movie_ids)} posters")
+    return serial, batch
+
+
+def main():
+    movie_ids = list(range(100, 110))
+    session = create_session()
+
+    # Every response takes ~200 ms: the batch should take about one round trip
+    server, base_url = start_stub_server(latency=0.2)
+    fetch = partial(fetch_poster, api_key='stub', session=session, base_url=base_url)
+    serial, batch = run("200 ms latency", movie_ids, fetch, deadline=3.0)
+    assert batch == serial == [f"{POSTER_BASE_URL}/{i}.jpg" for i in movie_ids]
+    server.shutdown()
+
+    # One very slow id must not hold up the grid: it gets a placeholder
+    server, base_url = start_stub_server(latency=0.05, slow_ids={105}, slow_latency=2.0)
+    fetch = partial(fetch_poster, api_key='stub', session=session, base_url=base_url)
+    _, batch = run("straggler past deadline", movie_ids, fetch, deadline=0.5)
+    assert batch[5] is None and all(p is not None for i, p in enumerate(batch) if i != 5)
+    server.shutdown()
+
+    # Missing ids come back as placeholders without failing the batch
+    server, base_url = start_stub_server(latency=0.05, missing_ids={101, 107})
+    fetch = partial(fetch_poster, api_key='stub', session=session, base_url=base_url)
+    _, batch = run("404 responses", movie_ids, fetch, deadline=3.0)
+    assert batch[1] is None and batch[7] is None
+    server.shutdown()
+
+    # Injected 500s are retried with backoff; the deadline still bounds the page
+    server, base_url = start_stub_server(latency=0.05, error_rate=0.3)
+    fetch = partial(fetch_poster, api_key='stub', session=session, base_url=base_url)
+    start = time.perf_counter()
+    batch = fetch_posters(movie_ids, fetch, deadline=1.0)
+    elapsed = time.perf_counter() - start
+    print(f"{'30% injected 500s':<28} batch {elapsed:6.2f}s   {sum(p is not None for p in batch)}/{len(movie_ids)} posters")
+    assert elapsed < 1.5
+    server.shutdown()
+
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
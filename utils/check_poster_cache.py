@@ -0,0 +1,72 @@
+# Check the persistent poster cache: TTLs, eviction, counters and sharing
+#
+# Usage (from the repository root):
+#   python utils/check_poster_cache.py
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api_handler import create_session, fetch_poster, fetch_posters_cached
+from src.poster_cache import PosterCache
+from utils.stub_tmdb import start_stub_server
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'posters.sqlite3')
+        server, base_url = start_stub_server(latency=0.05, missing_ids={103})
+        fetch = partial(fetch_poster, api_key='stub', session=create_session(), base_url=base_url, raise_errors=True)
+        movie_ids = list(range(100, 110))
+
+        # Cold: every id goes to the API, results (including the miss) are stored
+        cache = PosterCache(path, miss_ttl=0.5)
+        posters = fetch_posters_cached(movie_ids, cache, fetch)
+        assert server.request_count == 10 and posters[3] is None
+
+        # A second process opening the same file is served from disk
+        other = PosterCache(path, miss_ttl=0.5)
+        assert fetch_posters_cached(movie_ids, other, fetch) == posters
+        assert server.request_count == 10
+        print("shared cache:", other.stats())
+
+        # Negative results expire on their own TTL and are retried
+        time.sleep(0.6)
+        fetch_posters_cached(movie_ids, other, fetch)
+        assert server.request_count == 11
+        print("after miss TTL:", other.stats())
+
+        # Failed lookups (rate limited here) get a placeholder but are not cached
+        server.throttled_ids = {120}
+        assert fetch_posters_cached([120, 121], other, fetch) == [None, f"https://image.tmdb.org/t/p/w500//121.jpg"]
+        assert not other.get(120)[0] and other.get(121)[0]
+        server.throttled_ids = set()
+        assert fetch_posters_cached([120], other, fetch)[0] is not None
+
+        # LRU cap: the least recently read ids are evicted first
+        small = PosterCache(os.path.join(tmp, 'small.sqlite3'), max_entries=50)
+        small.set_many((movie_id, f"poster-{movie_id}") for movie_id in range(60))
+        small.get_many(range(10))
+        small.set_many((movie_id, f"poster-{movie_id}") for movie_id in range(60, 100))
+        stats = small.stats()
+        print("bounded cache:", stats)
+        assert stats['entries'] == 50 and all(small.get(m)[0] for m in range(10))
+
+        # Throughput of warm lookups
+        start = time.perf_counter()
+        for _ in range(200):
+            other.get_many(movie_ids)
+        per_grid = (time.perf_counter() - start) / 200 * 1000
+        print(f"warm 10-poster grid lookup: {per_grid:.3f} ms")
+
+        for c in (cache, other, small):
+            c.close()
+        server.shutdown()
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Check the poster prefetch job against the local TMDB stub
+#
+# Usage (from the repository root):
+#   python utils/check_prefetch.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.poster_cache import PosterCache
+from utils.prefetch_posters import prefetch
+from utils.stub_tmdb import start_stub_server
+
+
+class Interrupt(Exception):
+    pass
+
+
+def main():
+    movie_ids = list(range(1000, 1500))
+    server, base_url = start_stub_server(latency=0.02, missing_ids={1001, 1002})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'posters.sqlite3')
+
+        # Interrupt after the second chunk: its results must already be on disk
+        lines = []
+        def log_then_interrupt(line):
+            lines.append(line)
+            if len(lines) == 3:
+                raise Interrupt
+        cache = PosterCache(path)
+        try:
+            prefetch(movie_ids, cache, 'stub', base_url, workers=8, rate=500, chunk_size=100, log=log_then_interrupt)
+        except Interrupt:
+            pass
+        cache.close()
+
+        # Resume: only the remaining ids are fetched
+        cache = PosterCache(path)
+        result = prefetch(movie_ids, cache, 'stub', base_url, workers=8, rate=500, chunk_size=100)
+        assert result['fetched'] == 300, result
+        assert server.request_count == 500
+
+        # Incremental: a second run has nothing to do
+        assert prefetch(movie_ids, cache, 'stub', base_url)['fetched'] == 0
+        found, poster = cache.get(1001)
+        assert found and poster is None
+        cache.close()
+
+        # Rate-limited lookups are not cached as misses: the next run fetches them again
+        server.throttled_ids = {2001, 2002}
+        cache = PosterCache(os.path.join(tmp, 'throttled.sqlite3'))
+        result = prefetch(range(2000, 2010), cache, 'stub', base_url, log=lambda line: None)
+        assert result['failed'] == 2 and not cache.get(2001)[0], result
+        server.throttled_ids = set()
+        result = prefetch(range(2000, 2010), cache, 'stub', base_url, log=lambda line: None)
+        assert result['fetched'] == 2 and cache.get(2001) == (True, 'https://image.tmdb.org/t/p/w500//2001.jpg'), result
+        cache.close()
+
+        # Rate limiting: 50 ids at 100/s take at least ~0.5s
+        cache = PosterCache(os.path.join(tmp, 'rate.sqlite3'))
+        result = prefetch(range(50), cache, 'stub', base_url, workers=16, rate=100, log=lambda line: None)
+        assert result['seconds'] >= 0.45, result
+        cache.close()
+
+    server.shutdown()
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
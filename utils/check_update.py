@@ -0,0 +1,136 @@
+# Check incremental catalog updates against a full rebuild on synthetic data
+#
+# Builds a catalog, adds new movies and changes a few existing ones with
+# src.update, then compares the patched neighbor lists with exact ones computed
+# from scratch, before and after compaction.
+# Usage (from the repository root):
+#   python utils/check_update.py [--movies 5000] [--new 50] [--changed 10]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import current_version, open_artifacts
+from src.build import write_serving_artifacts
+from src.engine import Recommender
+from src.recommender import DEFAULT_K, fit_vectorizer, vectorize_tags
+from src.similarity import build_neighbor_index, normalize_rows
+from src.update import compact, prepare_movies, update_catalog
+from utils.make_synthetic_tmdb import make_tmdb
+
+
+# Function to compare stored neighbor lists with exact ones: (scores match, ids match) fractions
+def agreement(artifacts, exact_ids, exact_scores, rows):
+    ids = np.asarray(artifacts['neighbor_ids'])[rows]
+    scores = np.asarray(artifacts['neighbor_scores'])[rows]
+    same_scores = np.isclose(scores, exact_scores[rows], atol=1e-5).all(axis=1)
+    same_ids = (ids == exact_ids[rows]).all(axis=1)
+    return same_scores.mean(), same_ids.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check incremental updates against a full rebuild.")
+    parser.add_argument('--movies', type=int, default=5000)
+    parser.add_argument('--new', type=int, default=50)
+    parser.add_argument('--changed', type=int, default=10)
+    args = parser.parse_args()
+
+    quiet = lambda line: None
+    movies_df, credits_df = make_tmdb(args.movies)
+    with tempfile.TemporaryDirectory() as tmp:
+        movies_df.to_csv(os.path.join(tmp, 'movies.csv'), index=False)
+        credits_df.to_csv(os.path.join(tmp, 'credits.csv'), index=False)
+        movies = prepare_movies(os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'credits.csv'))
+
+    # One vocabulary for everything, so the incremental and full results are comparable
+    _, vocabulary = fit_vectorizer(movies['tags'])
+    n_base = len(movies) - args.new
+    base = movies.iloc[:n_base].reset_index(drop=True)
+
+    # Changed movies get another movie's tags
+    rng = np.random.default_rng(0)
+    changed_rows = rng.choice(n_base, size=args.changed, replace=False)
+    changed = base.iloc[changed_rows].copy()
+    changed['tags'] = base['tags'].values[rng.choice(n_base, size=args.changed, replace=False)]
+    update = pd.concat([movies.iloc[n_base:], changed], ignore_index=True)
+
+    # Expected catalog after the update, scored from scratch
+    final = base.copy()
+    final.loc[changed_rows, 'tags'] = changed['tags'].values
+    final = pd.concat([final, movies.iloc[n_base:]], ignore_index=True)
+    final_vectors = normalize_rows(vectorize_tags(final['tags'], vocabulary=vocabulary))
+
+    start = time.perf_counter()
+    exact_ids, exact_scores = build_neighbor_index(final_vectors, DEFAULT_K, workers=1)
+    full_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'artifacts')
+        base_vectors = vectorize_tags(base['tags'], vocabulary=vocabulary)
+        ids, scores = build_neighbor_index(normalize_rows(base_vectors), DEFAULT_K, workers=1)
+        write_serving_artifacts(path, base, base_vectors, ids, scores, vocabulary)
+
+        # A process already serving the base version
+        engine = Recommender(open_artifacts(path))
+        served = current_version(path)
+
+        start = time.perf_counter()
+        update_catalog(path, update, log=quiet)
+        update_time = time.perf_counter() - start
+
+        artifacts = open_artifacts(path)
+        assert current_version(path) != served, "update did not publish a new version"
+        assert artifacts['manifest']['n_movies'] == len(final)
+        assert (np.asarray(artifacts['movie_id']) == final['movie_id'].values).all()
+        assert artifacts['title'].tolist() == list(final['title'])
+        assert abs(artifacts['vectors'].tocsr() - final_vectors).max() < 1e-6
+
+        # The segment is overlaid per query: the base stays memory-mapped, lookups match the merged matrix
+        vectors = artifacts['vectors']
+        data = vectors.base.data
+        while data is not None and not isinstance(data, np.memmap):
+            data = data.base
+        assert data is not None, "the base matrix was copied out of its memory map"
+        rows = np.array([0, changed_rows[0], len(final) - 1, 0])
+        assert abs(vectors[rows] - final_vectors[rows]).max() < 1e-6
+        query = final_vectors[changed_rows[0]].toarray().ravel()
+        assert np.allclose(vectors @ query, final_vectors @ query, atol=1e-6)
+
+        target_rows = np.concatenate([changed_rows, np.arange(n_base, len(final))])
+        other_rows = np.setdiff1d(np.arange(len(final)), target_rows)
+        target_scores, target_ids = agreement(artifacts, exact_ids, exact_scores, target_rows)
+        other_scores, other_ids = agreement(artifacts, exact_ids, exact_scores, other_rows)
+        print(f"update: {args.new} new + {args.changed} changed movies in {update_time:.2f}s "
+              f"(full neighbor rebuild {full_time:.2f}s)")
+        print(f"  updated rows: {target_scores:.1%} exact scores, {target_ids:.1%} exact ids")
+        print(f"  other rows:   {other_scores:.1%} exact scores, {other_ids:.1%} exact ids")
+        assert target_scores == 1.0
+
+        # The old engine still answers from its own version; a fresh one sees the new movies
+        engine.recommend(0)
+        new_row = len(final) - 1
+        rows, _ = Recommender(artifacts).recommend(new_row)
+        assert list(rows) == list(exact_ids[new_row, :5])
+
+        # A second update grows the same segment
+        update_catalog(path, movies.iloc[-1:].copy(), log=quiet)
+        assert len(open_artifacts(path)['segment_rows']) == len(target_rows) + 1
+
+        compact(path, workers=1, log=quiet)
+        artifacts = open_artifacts(path)
+        assert 'segment_vectors' not in artifacts and 'ivf_centroids' in artifacts
+        all_scores, all_ids = agreement(artifacts, exact_ids, exact_scores, np.arange(len(final)))
+        print(f"after compaction: {all_scores:.1%} exact scores, {all_ids:.1%} exact ids")
+        assert all_scores == 1.0
+
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
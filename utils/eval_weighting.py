@@ -0,0 +1,138 @@
+# Offline comparison of term weighting schemes (src/weighting.py): neighbor quality and build time
+#
+# Every scheme is built on the same catalog and judged on its top-k lists:
+#   franchise  share of a movie's franchise found in its top k (titles sharing a
+#              name before ':' or a sequel number; titles are not in the tags)
+#   genre      mean genre Jaccard between a movie and its neighbors
+#   hubs       share of all top-k slots taken by the 1% most listed movies (lower:
+#              frequent tokens dominate less)
+#   coverage   share of the catalog that appears in some top-k list
+#   overlap    top-k agreement with the first scheme (the notebook's count model)
+# Field-weighted schemes need per-field tags, i.e. raw dumps or a synthetic catalog.
+# Usage (from the repository root):
+#   python utils/eval_weighting.py                                   # real catalog (movies_df.pkl)
+#   python utils/eval_weighting.py --movies-csv m.csv --credits-csv c.csv
+#   python utils/eval_weighting.py --synthetic 20000 --field-weights genres=2,overview=0.5
+import argparse
+import os
+import pickle
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.genres import genre_lists
+from src.ingest import ingest
+from src.similarity import build_neighbor_index, normalize_rows
+from src.weighting import fit_weighting, parse_field_weights
+from utils.make_synthetic_tmdb import make_catalog
+
+# Field weights tried when none are given: the short, specific fields count for more than the overview
+FIELD_WEIGHTS = 'overview=0.5,genres=1.5,keywords=1.5,cast=1,director=2'
+
+# Larger title groups are generic names ("Movie 12" in synthetic catalogs), not franchises
+MAX_FRANCHISE = 20
+
+
+# Function to get the franchise key of a title ("Toy Story 2" -> "toy story", "X-Men: Apocalypse" -> "x-men")
+def franchise_key(title):
+    key = title.lower().split(':')[0].strip()
+    key = re.sub(r"\s+(\d+|i{1,3}|iv|vi{0,3}|part \w+)$", "", key)
+    return re.sub(r"^the\s+", "", key).strip()
+
+
+# Function to get row -> other rows of the same franchise
+def franchises(titles):
+    groups = {}
+    for row, title in enumerate(titles):
+        groups.setdefault(franchise_key(title), []).append(row)
+    return {row: [r for r in rows if r != row] for rows in groups.values()
+            if 1 < len(rows) <= MAX_FRANCHISE for row in rows}
+
+
+# Function to score a set of top-k lists
+def quality(ids, k, baseline, same_franchise, genre_sets):
+    ids = ids[:, :k]
+    n_movies = ids.shape[0]
+
+    franchise = np.mean([len(set(ids[row]) & set(others)) / min(k, len(others))
+                         for row, others in same_franchise.items()]) if same_franchise else float('nan')
+
+    jaccard = []
+    for row in range(n_movies):
+        own = genre_sets[row]
+        for other in ids[row]:
+            union = own | genre_sets[other]
+            jaccard.append(len(own & genre_sets[other]) / len(union) if union else 0.0)
+
+    listed = np.bincount(ids[ids >= 0], minlength=n_movies)
+    top = np.sort(listed)[::-1][:max(1, n_movies // 100)]
+    overlap = 1.0
+    if baseline is not None:
+        overlap = np.mean([len(set(a) & set(b[:k])) / k for a, b in zip(ids, baseline)])
+    return franchise, float(np.mean(jaccard)), top.sum() / listed.sum(), float(np.mean(listed > 0)), overlap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare term weighting schemes offline.")
+    parser.add_argument('--movies', default='movies_df.pkl', help="Processed movies dataframe")
+    parser.add_argument('--movies-csv', help="Raw TMDB movies dump (enables field weights)")
+    parser.add_argument('--credits-csv', help="Raw TMDB credits dump")
+    parser.add_argument('--synthetic', type=int, help="Use a synthetic catalog of this size instead")
+    parser.add_argument('--field-weights', default=FIELD_WEIGHTS, help="Weights for the field-weighted schemes")
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--workers', type=int, help="Similarity worker processes")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        movies = make_catalog(args.synthetic, workers=args.workers)
+    elif args.movies_csv:
+        movies = ingest(args.movies_csv, args.credits_csv, workers=args.workers)
+    else:
+        with open(args.movies, 'rb') as f:
+            movies = pickle.load(f)
+
+    # (name, scheme, max_features, field weights)
+    field_weights = parse_field_weights(args.field_weights)
+    configs = [
+        ('count 5000', 'count', 5000, None),
+        ('count full', 'count', 0, None),
+        ('tfidf 5000', 'tfidf', 5000, None),
+        ('tfidf full', 'tfidf', 0, None),
+        ('bm25 full', 'bm25', 0, None),
+    ]
+    if 'field_tags' in movies:
+        configs += [('tfidf full fields', 'tfidf', 0, field_weights), ('bm25 full fields', 'bm25', 0, field_weights)]
+
+    genre_sets = [set(names) for names in genre_lists(movies)]
+    same_franchise = franchises(movies['title'].values)
+
+    print(f"{len(movies)} movies, {len(same_franchise)} in a franchise, top-{args.k}\n")
+    print(f"{'scheme':<18} {'vocab':>7} {'MB':>6} {'vec s':>6} {'nbr s':>6} "
+          f"{'franchise':>9} {'genre':>6} {'hubs':>6} {'coverage':>8} {'overlap':>7}")
+    # Load sklearn before the first timed build
+    fit_weighting(movies['tags'][:10])
+    baseline = None
+    for name, scheme, max_features, weights in configs:
+        start = time.perf_counter()
+        vectors, vocabulary, _ = fit_weighting(movies['tags'], scheme, max_features,
+                                               movies.get('field_tags'), weights)
+        vectors = normalize_rows(vectors)
+        vectorize_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ids, _ = build_neighbor_index(vectors, args.k, workers=args.workers)
+        neighbors_s = time.perf_counter() - start
+
+        size_mb = (vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes) / 1e6
+        franchise, genre, hubs, coverage, overlap = quality(ids, args.k, baseline, same_franchise, genre_sets)
+        baseline = ids if baseline is None else baseline
+        print(f"{name:<18} {len(vocabulary):>7} {size_mb:>6.2f} {vectorize_s:>6.2f} {neighbors_s:>6.2f} "
+              f"{franchise:>9.3f} {genre:>6.3f} {hubs:>6.3f} {coverage:>8.3f} {overlap:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# Load test for the recommendation service: requests per second and tail latency per endpoint
+#
+# Starts `python -m src.service` in a subprocess unless --url points at a running one.
+# Posters are not requested, so TMDB is never contacted.
+# Usage (from the repository root):
+#   python utils/load_test_service.py [--clients 8] [--duration 10] [--batch 64]
+#   python utils/load_test_service.py --url http://127.0.0.1:8000
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.genres import GENRE_MAP
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Function to pick a free local port
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# Function to start the service in a subprocess and wait until /health answers
+def start_service(artifacts, backend):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'src.service', '--port', str(port), '--artifacts', artifacts, '--backend', backend],
+        cwd=ROOT, stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Service did not start")
+
+
+# Function to build the request mix: (endpoint, method, path, params / body) drawn at random
+def request_mix(n_movies, titles, batch, rng):
+    genres = [g for g, token in GENRE_MAP.items() if token]
+    seeds = rng.permutation(n_movies)
+
+    def zipf_row():
+        rank = int(rng.zipf(1.1))
+        return int(seeds[(rank - 1) % n_movies])
+
+    def next_request():
+        kind = rng.random()
+        if kind < 0.5:
+            return 'recommend', 'GET', '/recommend', {'row': zipf_row(), 'k': 5}
+        if kind < 0.75:
+            title = titles[int(rng.integers(n_movies))]
+            return 'search', 'GET', '/search', {'q': title[:int(rng.integers(1, 8))], 'k': 10}
+        if kind < 0.95:
+            return 'genre', 'GET', '/genre', {'genre': genres[int(rng.integers(len(genres)))],
+                                              'page': int(rng.integers(5))}
+        return 'batch', 'POST', '/recommend', {'rows': [zipf_row() for _ in range(batch)], 'k': 5}
+
+    return next_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the recommendation service.")
+    parser.add_argument('--url', help="Running service (default: start one)")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH)
+    parser.add_argument('--backend', default='precomputed')
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent client threads")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--batch', type=int, default=64, help="Seeds per POST /recommend batch")
+    args = parser.parse_args()
+
+    artifacts = open_artifacts(args.artifacts)
+    titles = artifacts['title'].tolist()
+    n_movies = artifacts['manifest']['n_movies']
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_service(args.artifacts, args.backend)
+
+    results = {}
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def client(seed):
+        session = requests.Session()
+        next_request = request_mix(n_movies, titles, args.batch, np.random.default_rng(seed))
+        local = {}
+        failed = 0
+        while time.perf_counter() < stop_at:
+            name, method, path, payload = next_request()
+            start = time.perf_counter()
+            if method == 'GET':
+                response = session.get(f"{url}{path}", params=payload, timeout=30)
+            else:
+                response = session.post(f"{url}{path}", json=payload, timeout=30)
+            local.setdefault(name, []).append(time.perf_counter() - start)
+            failed += response.status_code != 200
+        with lock:
+            for name, latencies in local.items():
+                results.setdefault(name, []).extend(latencies)
+            errors[0] += failed
+
+    try:
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        health = requests.get(f"{url}/health").json()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    total = sum(len(v) for v in results.values())
+    print(f"{args.clients} clients for {elapsed:.1f}s against {url} ({health['backend']}, build {health['build_id'][:8]})")
+    print(f"{'endpoint':<10} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in ('recommend', 'search', 'genre', 'batch'):
+        lat = np.array(results.get(name, [np.nan])) * 1e3
+        print(f"{name:<10} {len(results.get(name, [])):>9} {len(results.get(name, [])) / elapsed:>8.0f} "
+              f"{np.percentile(lat, 50):>8.2f} {np.percentile(lat, 95):>8.2f} {np.percentile(lat, 99):>8.2f}")
+    print(f"{'total':<10} {total:>9} {total / elapsed:>8.0f}   errors: {errors[0]}, "
+          f"batch seeds/s: {len(results.get('batch', [])) * args.batch / elapsed:.0f}, "
+          f"query cache hit rate: {health['query_cache']['hit_rate']:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Generate synthetic raw TMDB CSVs (same schema as tmdb_5000_*.csv) of any size
+#
+# Used to exercise the build pipeline and benchmarks at catalog sizes the real
+# dump does not reach. Usage (from the repository root):
+#   python utils/make_synthetic_tmdb.py --movies 50000 --out-dir /tmp/tmdb50k
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+    "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction",
+    "TV Movie", "Thriller", "War", "Western",
+]
+
+
+# Function to build a pool of fake multi-word names
+def name_pool(rng, words, size):
+    first = rng.choice(words, size=size)
+    last = rng.choice(words, size=size)
+    return [f"{a.title()} {b.title()}" for a, b in zip(first, last)]
+
+
+# Function to generate the movies and credits dataframes
+def make_tmdb(n_movies, seed=0):
+    rng = np.random.default_rng(seed)
+
+    # Zipf-distributed vocabulary so a few words and names dominate, as in the real data
+    words = np.array([f"w{i}" for i in range(max(2000, n_movies // 2))])
+    word_p = 1.0 / np.arange(1, len(words) + 1)
+    word_p /= word_p.sum()
+
+    people = name_pool(rng, words[:5000], max(1000, n_movies))
+    people_p = 1.0 / np.arange(1, len(people) + 1) ** 0.8
+    people_p /= people_p.sum()
+    keywords = [w.replace("w", "kw") for w in words[:max(1000, n_movies // 5)]]
+
+    movie_rows = []
+    credit_rows = []
+    for movie_id in range(1, n_movies + 1):
+        title = f"Movie {movie_id}"
+        overview = " ".join(rng.choice(words, size=rng.integers(15, 60), p=word_p))
+        genres = [{"id": int(g), "name": GENRES[g]} for g in rng.choice(len(GENRES), size=rng.integers(1, 4), replace=False)]
+        kws = [{"id": int(k), "name": keywords[k]} for k in rng.choice(len(keywords), size=rng.integers(0, 12), replace=False)]
+        cast = [{"cast_id": j, "name": people[p], "order": j} for j, p in enumerate(rng.choice(len(people), size=rng.integers(5, 25), p=people_p))]
+        crew = [{"job": "Producer", "name": people[int(rng.integers(len(people)))]},
+                {"job": "Director", "name": people[int(rng.integers(len(people)))]}]
+
+        movie_rows.append({
+            "id": movie_id,
+            "title": title,
+            "overview": overview,
+            "genres": json.dumps(genres),
+            "keywords": json.dumps(kws),
+            "popularity": float(rng.pareto(1.5) * 10),
+            "vote_average": round(float(rng.uniform(3, 9)), 1),
+            "vote_count": int(rng.pareto(1.2) * 100),
+        })
+        credit_rows.append({"movie_id": movie_id, "title": title, "cast": json.dumps(cast), "crew": json.dumps(crew)})
+
+    return pd.DataFrame(movie_rows), pd.DataFrame(credit_rows)
+
+
+# Function to run a synthetic dump through the streaming ingest (src/ingest.py), as the build does
+def make_catalog(n_movies, seed=0, workers=None):
+    from src.ingest import ingest
+
+    movies, credits = make_tmdb(n_movies, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        movies_csv, credits_csv = os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'credits.csv')
+        movies.to_csv(movies_csv, index=False)
+        credits.to_csv(credits_csv, index=False)
+        return ingest(movies_csv, credits_csv, workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic TMDB CSVs.")
+    parser.add_argument('--movies', type=int, default=5000, help="Number of movies")
+    parser.add_argument('--out-dir', default='.', help="Output directory")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    movies, credits = make_tmdb(args.movies, args.seed)
+    os.makedirs(args.out_dir, exist_ok=True)
+    movies.to_csv(os.path.join(args.out_dir, 'tmdb_5000_movies.csv'), index=False)
+    credits.to_csv(os.path.join(args.out_dir, 'tmdb_5000_credits.csv'), index=False)
+    print(f"Wrote {args.movies} movies to {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
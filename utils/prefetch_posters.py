@@ -0,0 +1,106 @@
+# Warm the poster cache for the whole catalog before users hit the app
+#
+# Resumable and incremental: results are committed chunk by chunk, and only
+# ids that are missing or stale in the cache are fetched. The ids are read from
+# the published artifacts, so movies added by src/update.py are included. Only a
+# definitive "no poster" is cached as a miss; ids whose lookup failed (timeout,
+# 5xx, rate limit) are left out and retried by the next run.
+#
+# Usage (from the repository root):
+#   python utils/prefetch_posters.py
+#   python utils/prefetch_posters.py --workers 16 --rate 40 --max-age 604800
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api_handler import TMDB_API_URL, RateLimiter, create_session, fetch_poster
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.poster_cache import POSTER_CACHE_PATH, PosterCache
+
+
+# Function to fetch every stale id and store results chunk by chunk
+def prefetch(movie_ids, cache, api_key, base_url=TMDB_API_URL, workers=8, rate=40.0,
+             chunk_size=200, max_age=None, timeout=10, log=print):
+    todo = cache.stale_ids(movie_ids, max_age=max_age)
+    total = len(todo)
+    log(f"{len(set(movie_ids)) - total} ids fresh in cache, {total} to fetch")
+    if not total:
+        return {'fetched': 0, 'found': 0, 'failed': 0, 'seconds': 0.0}
+
+    session = create_session(pool_size=workers)
+    limiter = RateLimiter(rate)
+
+    # Returns (movie_id, poster) for a definitive answer, None when the lookup failed
+    def fetch(movie_id):
+        limiter.wait()
+        try:
+            return movie_id, fetch_poster(movie_id, api_key, session, base_url=base_url, timeout=timeout,
+                                          raise_errors=True)
+        except Exception:
+            return None
+
+    start = time.perf_counter()
+    done = found = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for offset in range(0, total, chunk_size):
+            chunk = todo[offset:offset + chunk_size]
+            results = [r for r in executor.map(fetch, chunk) if r is not None]
+
+            # Committing each chunk is what makes an interrupted run resumable
+            cache.set_many(results)
+
+            done += len(chunk)
+            found += sum(poster is not None for _, poster in results)
+            failed += len(chunk) - len(results)
+            elapsed = time.perf_counter() - start
+            rate_now = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate_now if rate_now else 0.0
+            log(f"{done}/{total} ({done / total:.0%})  {rate_now:.1f} ids/s  eta {eta:.0f}s  "
+                f"posters found {found}  failed {failed}")
+
+    return {'fetched': done, 'found': found, 'failed': failed, 'seconds': time.perf_counter() - start}
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Prefetch TMDB posters into the shared cache.")
+    parser.add_argument('--artifacts', default=os.getenv("ARTIFACTS_PATH", ARTIFACTS_PATH), help="Artifact directory")
+    parser.add_argument('--cache', default=os.getenv("POSTER_CACHE_PATH", POSTER_CACHE_PATH), help="Poster cache file")
+    parser.add_argument('--api-url', default=os.getenv("TMDB_API_URL", TMDB_API_URL), help="TMDB API base URL")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent requests")
+    parser.add_argument('--rate', type=float, default=40.0, help="Max requests started per second")
+    parser.add_argument('--chunk-size', type=int, default=200, help="Ids committed per chunk")
+    parser.add_argument('--max-age', type=float, help="Also refetch entries older than this many seconds")
+    args = parser.parse_args()
+
+    api_key = os.getenv("API_KEY")
+    if not api_key:
+        sys.exit("API_KEY not found. Please check your .env file.")
+
+    movie_ids = open_artifacts(args.artifacts)['movie_id'].tolist()
+
+    cache = PosterCache(args.cache)
+    try:
+        result = prefetch(movie_ids, cache, api_key, args.api_url, args.workers,
+                          args.rate, args.chunk_size, args.max_age)
+    except KeyboardInterrupt:
+        print("Interrupted; completed chunks are saved, rerun to resume.")
+        return
+    finally:
+        cache.close()
+
+    if result['fetched']:
+        print(f"Done: {result['fetched']} ids in {result['seconds']:.1f}s "
+              f"({result['fetched'] / result['seconds']:.1f} ids/s), {result['found']} posters found")
+    if result['failed']:
+        print(f"{result['failed']} lookups failed and were not cached; rerun to retry them.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Stream "more like this" lists for the whole catalog (or given ids) to a file
+#
+# Output is JSON lines: {"movie_id", "title", "neighbors": [movie_id...], "scores": [...]}
+#
+# Usage (from the repository root):
+#   python utils/recommend_all.py --output more_like_this.jsonl
+#   python utils/recommend_all.py --backend exact -k 10 --movie-ids 19995 285
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifacts import ARTIFACTS_PATH, open_artifacts
+from src.neighbors import load_backend, recommend_batch
+from src.recommender import build_lookup, rows_for_movie_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch recommendations for many seed movies.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH, help="Artifact directory")
+    parser.add_argument('--backend', default='precomputed', choices=['precomputed', 'exact', 'ivf', 'embedding'])
+    parser.add_argument('--movie-ids', type=int, nargs='+', help="Seed TMDB ids (default: whole catalog)")
+    parser.add_argument('-k', type=int, default=5, help="Recommendations per seed")
+    parser.add_argument('--chunk-size', type=int, default=512, help="Seeds scored per vectorized call")
+    parser.add_argument('--output', default='-', help="Output JSONL file ('-' for stdout)")
+    args = parser.parse_args()
+
+    artifacts = open_artifacts(args.artifacts)
+    backend = load_backend(args.backend, artifacts)
+    titles = artifacts['title']
+    movie_ids = artifacts['movie_id']
+
+    if args.movie_ids:
+        _, id_rows = build_lookup(titles, movie_ids)
+        rows = rows_for_movie_ids(id_rows, args.movie_ids)
+    else:
+        rows = np.arange(len(movie_ids))
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    start = time.perf_counter()
+    try:
+        # Each chunk is scored in one call and written before the next starts
+        for chunk_start in range(0, len(rows), args.chunk_size):
+            chunk = rows[chunk_start:chunk_start + args.chunk_size]
+            ids, scores = recommend_batch(backend, chunk, args.k, args.chunk_size)
+            for row, row_ids, row_scores in zip(chunk, ids, scores):
+                keep = row_ids >= 0
+                out.write(json.dumps({
+                    'movie_id': int(movie_ids[row]),
+                    'title': titles[int(row)],
+                    'neighbors': movie_ids[row_ids[keep]].tolist(),
+                    'scores': [round(float(score), 4) for score in row_scores[keep]],
+                }) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(rows)} seeds with {args.backend} backend in {elapsed:.2f}s "
+          f"({len(rows) / elapsed:,.0f} movies/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Local stub of the TMDB movie endpoint with injectable latency and errors
+#
+# Usage (from the repository root):
+#   python utils/stub_tmdb.py --port 8765 --latency 0.2 --error-rate 0.1
+#   TMDB_API_URL=http://127.0.0.1:8765/3 streamlit run app.py
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        server.request_count += 1
+        path = urlparse(self.path).path.rstrip('/')
+        parts = path.split('/')
+
+        # Only /3/movie/<id> is served
+        if len(parts) != 4 or parts[1:3] != ['3', 'movie'] or not parts[3].isdigit():
+            return self._send(404, {"status_message": "Not found"})
+
+        movie_id = int(parts[3])
+        time.sleep(server.latency + server.jitter * server.rng.random())
+
+        if movie_id in server.slow_ids:
+            time.sleep(server.slow_latency)
+        if server.rng.random() < server.error_rate:
+            return self._send(500, {"status_message": "Injected error"})
+        if movie_id in server.throttled_ids:
+            return self._send(429, {"status_message": "Request count over limit"})
+        if movie_id in server.missing_ids:
+            return self._send(404, {"status_message": "Not found"})
+
+        self._send(200, {"id": movie_id, "poster_path": f"/{movie_id}.jpg"})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to start the stub in a background thread; returns (server, api base URL)
+def start_stub_server(port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                      slow_ids=(), slow_latency=5.0, missing_ids=(), throttled_ids=(), seed=0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubTMDBHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.slow_ids = set(slow_ids)
+    server.slow_latency = slow_latency
+    server.missing_ids = set(missing_ids)
+    server.throttled_ids = set(throttled_ids)
+    server.rng = random.Random(seed)
+    server.request_count = 0
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/3"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local TMDB stub.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random seconds per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 500 responses")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Stub TMDB API at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,34 @@
+import os
 import pickle
-import pandas as pd
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.genres import GENRE_MAP, build_tag_index, genre_lists, genres_from_lists, query_tags, rows_for_token
 
 try:
     movies = pickle.load(open('movies_df.pkl', 'rb'))
-    
-    genre_map = {
-        "Action": "action",
-        "Adventure": "adventur",
-        "Animation": "anim",
-        "Comedy": "comedi",
-        "Crime": "crime",
-        "Drama": "drama",
-        "Fantasy": "fantasi",
-        "Horror": "horror",
-        "Romance": "romanc",
-        "Science Fiction": "sciencefict",
-        "Thriller": "thriller"
-    }
-    
-    for genre, keyword in genre_map.items():
-        count = movies[movies['tags'].apply(lambda x: keyword in x if isinstance(x, str) else False)].shape[0]
-        print(f"{genre}: {count} movies found")
-        
-    keyword = "sciencefict"
-    filtered_movies = movies[movies['tags'].apply(lambda x: keyword in x if isinstance(x, str) else False)].head(5)
+    genres = genres_from_lists(genre_lists(movies))
+    tag_index = build_tag_index(movies['tags'].values)
+
+    # Genre field of the tags vs. the same stem anywhere in them (overview / keywords included)
+    for genre, keyword in GENRE_MAP.items():
+        if keyword is None:
+            continue
+        count = len(rows_for_token(genres, genre))
+        print(f"{genre}: {count} movies found ({len(rows_for_token(tag_index, keyword))} tags contain '{keyword}')")
+
+    filtered_movies = movies.iloc[rows_for_token(genres, "Science Fiction")[:5]]
     print("\nSample Science Fiction movies:")
     print(filtered_movies['title'].tolist())
+
+    stem_only = movies.iloc[sorted(set(rows_for_token(tag_index, "anim")) - set(rows_for_token(genres, "Animation")))[:5]]
+    print("\n'anim' in the tags but not an Animation movie:")
+    print(stem_only['title'].tolist())
+
+    both = query_tags(genres, ["Animation", "Comedy"], mode='and')
+    either = query_tags(genres, ["Animation", "Comedy"], mode='or')
+    print(f"\nAnimation AND Comedy: {len(both)} movies, Animation OR Comedy: {len(either)} movies")
     
 except Exception as e:
     print(e)